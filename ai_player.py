@@ -3,8 +3,12 @@
 from dataclasses import dataclass
 from collections import Counter
 import random
+import sys
+import time
 
 from cards import (
+    CARD_SPECS,
+    CARD_TYPES,
     AlterFutureCard,
     AttackCard,
     BombCatCard,
@@ -19,6 +23,15 @@ from cards import (
     SwapCard,
 )
 
+from blocklist import BlockList
+from events import DebugReasoning
+import profiler
+
+try:
+    import value_model
+except ImportError:  # 未安装NumPy时只使用手写评估
+    value_model = None
+
 
 LOOKAHEAD_DEPTH = 2
 FUTURE_DISCOUNT = 0.65
@@ -28,6 +41,39 @@ MULTI_PLAY_PENALTY = 2.5
 NOPE_PLAY_BONUS = 10.0
 NOPED_DRAW_BONUS = 12.0
 NOPED_INVERT_FACTOR = 0.18
+ROLLOUT_WEIGHT = 0.25
+ROLLOUT_MAX_PLIES = 6
+
+
+@dataclass(frozen=True)
+class DifficultyProfile:
+    """AI难度档位：以单次决策的计算预算定义"""
+    key: str
+    label: str
+    time_budget_ms: float  # 每次决策的时间上限
+    rollouts: int  # 每个候选行动的随机展开次数上限
+    search_depth: int  # 含当前行动在内的搜索层数
+    value_weight: float = 0.0  # 学习价值函数的权重，0表示不使用
+
+
+DIFFICULTY_PROFILES = {
+    "easy": DifficultyProfile("easy", "简单", time_budget_ms=10, rollouts=0, search_depth=1),
+    "normal": DifficultyProfile("normal", "普通", time_budget_ms=50, rollouts=0, search_depth=LOOKAHEAD_DEPTH),
+    "hard": DifficultyProfile("hard", "困难", time_budget_ms=300, rollouts=128, search_depth=4, value_weight=30.0),
+}
+DEFAULT_DIFFICULTY = "normal"
+
+
+def get_difficulty(key=None):
+    """按名称获取难度档位；None 表示默认难度。"""
+    if isinstance(key, DifficultyProfile):
+        return key
+    if key is None:
+        key = DEFAULT_DIFFICULTY
+    try:
+        return DIFFICULTY_PROFILES[key]
+    except KeyError:
+        raise ValueError(f"未知难度: {key}（可选: {', '.join(DIFFICULTY_PROFILES)}）") from None
 
 
 @dataclass
@@ -37,45 +83,93 @@ class ActionEval:
     reason: str
 
 
-def _new_unknown_entry():
-    return {"known": None}
+class _SearchTimeout(Exception):
+    """决策预算耗尽，放弃当前未完成的搜索层"""
 
 
-def _new_known_entry(card):
-    return {"known": card}
+def _bits(mask):
+    """认知位掩码拆分为单个的位"""
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
 
 
-def init_ai_knowledge(game):
-    """初始化AI的牌堆认知，初始时全部未知。"""
-    game.ai_known = [_new_unknown_entry() for _ in range(len(game.deck.cards))]
+class DeckKnowledge(BlockList):
+    """
+    AI对牌堆的认知：与牌堆逐位置对应（下标0为堆底），每个位置为None（没有AI知道）或(牌, 认知位掩码)。
+    多个AI座位共享同一份认知，掩码记录哪些AI（Player.knowledge_bit）知道这张牌；
+    分块存储并随增删按认知位维护已知牌的按类型计数，大牌堆上按位置更新与概率查询都不需要扫描整堆。
+    """
 
+    __slots__ = ("known_counts", "known_totals")
+
+    def __init__(self, entries=()):
+        self.known_counts = {}  # 认知位 -> 该AI已知的各类型张数
+        self.known_totals = {}
+        super().__init__(entries)
+
+    @classmethod
+    def unknown(cls, size):
+        return cls([None] * size)
+
+    def _added(self, entries):
+        for entry in entries:
+            if entry is not None:
+                card, mask = entry
+                for bit in _bits(mask):
+                    counts = self.known_counts.get(bit)
+                    if counts is None:
+                        counts = self.known_counts[bit] = Counter()
+                    counts[type(card)] += 1
+                    self.known_totals[bit] = self.known_totals.get(bit, 0) + 1
+
+    def _removed(self, entries):
+        for entry in entries:
+            if entry is not None:
+                card, mask = entry
+                for bit in _bits(mask):
+                    self.known_counts[bit][type(card)] -= 1
+                    self.known_totals[bit] -= 1
+
+    @staticmethod
+    def entry(card, bits):
+        return (card, bits) if bits else None
+
+    def known(self, idx, bit):
+        """认知位为bit的AI在idx处已知的牌，未知时为None"""
+        entry = self[idx]
+        return entry[0] if entry is not None and entry[1] & bit else None
+
+    def counts_for(self, bit):
+        return self.known_counts.get(bit) or Counter()
+
+    def unknown_count(self, bit):
+        return len(self) - self.known_totals.get(bit, 0)
+
+    def learn(self, idx, card, bits):
+        """认知位为bits的AI得知idx处是card"""
+        entry = self[idx]
+        if entry is not None:
+            bits |= entry[1]
+        self[idx] = self.entry(card, bits)
 
-def _normalize_knowledge(game):
-    """将game.ai_known中的条目规范化为包含"known"键的字典形式，方便后续处理。"""
-    normalized = []
-    for entry in game.ai_known:
-        if isinstance(entry, dict) and "known" in entry:
-            normalized.append(entry)
-        elif entry == "unknown":
-            normalized.append(_new_unknown_entry())
-        else:
-            normalized.append(_new_known_entry(entry))
-    game.ai_known = normalized
+
+def init_ai_knowledge(game):
+    """初始化AI的牌堆认知，初始时全部未知。"""
+    game.ai_known = DeckKnowledge.unknown(len(game.deck.cards))
 
 
 def on_shuffle(game):
-    _normalize_knowledge(game)
-    game.ai_known = [_new_unknown_entry() for _ in range(len(game.deck.cards))]
+    game.ai_known = DeckKnowledge.unknown(len(game.deck.cards))
 
 
 def on_swap_top_bottom(game):
-    _normalize_knowledge(game)
     if len(game.ai_known) > 1:
         game.ai_known[0], game.ai_known[-1] = game.ai_known[-1], game.ai_known[0]
 
 
 def on_draw(game, from_bottom=False):
-    _normalize_knowledge(game)
     if not game.ai_known:
         return
     if from_bottom:
@@ -84,96 +178,88 @@ def on_draw(game, from_bottom=False):
         game.ai_known.pop(-1)
 
 
-def on_insert_known(game, pos, card):
-    _normalize_knowledge(game)
-    game.ai_known.insert(pos, _new_known_entry(card))
+def on_insert_known(game, pos, card, player):
+    """player放回的牌只有它自己知道位置"""
+    game.ai_known.insert(pos, DeckKnowledge.entry(card, player.knowledge_bit))
 
 
 def on_insert_unknown(game, pos):
-    _normalize_knowledge(game)
-    game.ai_known.insert(pos, _new_unknown_entry())
+    game.ai_known.insert(pos, None)
 
 
-def on_see_future(game, top_cards):
+def on_see_future(game, top_cards, player):
     """top_cards should be [top -> down]."""
-    _normalize_knowledge(game)
     for i, card in enumerate(top_cards):
         idx = len(game.deck.cards) - 1 - i
         if 0 <= idx < len(game.ai_known):
-            game.ai_known[idx] = _new_known_entry(card)
+            game.ai_known.learn(idx, card, player.knowledge_bit)
 
 
 def on_remove_top(game, top_count):
-    _normalize_knowledge(game)
     if top_count <= 0:
         return
     del game.ai_known[-top_count:]
 
 
-def on_append_known(game, top_cards):
-    """在洗牌或顶底互换等操作后，将已知的 top_cards 追加到 ai_known 中，保持与现有游戏行为一致。"""
-    _normalize_knowledge(game)
-    game.ai_known.extend(_new_known_entry(card) for card in top_cards)
+def on_append_known(game, top_cards, player=None):
+    """将已知的 top_cards 追加到 ai_known 中：player为排列这些牌的AI，None表示顺序已公开、所有AI都知道。"""
+    bits = game.ai_mask if player is None else player.knowledge_bit
+    game.ai_known.extend(DeckKnowledge.entry(card, bits) for card in top_cards)
 
 
 def on_append_unknown(game, top_count):
-    _normalize_knowledge(game)
     if top_count <= 0:
         return
-    game.ai_known.extend(_new_unknown_entry() for _ in range(top_count))
+    game.ai_known.extend([None] * top_count)
 
 
-def _remaining_type_counter(game):
-    deck_counter = Counter(type(card) for card in game.deck.cards)
-    known_counter = Counter()
-    unknown_slots = 0
+def _acting_ai(game):
+    """当前做决策的AI：轮到AI座位时为该座位，否则为第一个AI"""
+    return game.current_player if game.current_player.is_ai else game.ai
 
-    for slot in game.ai_known:
-        known = slot.get("known")
-        if known is None:
-            unknown_slots += 1
-        else:
-            known_counter[type(known)] += 1
 
+def _remaining_type_counter(game, bit):
+    """牌堆中除该AI已知位置外各类型的剩余张数，以及未知位置数（按计数求得，不扫描牌堆）"""
+    known_counts = game.ai_known.counts_for(bit)
     remaining = Counter()
-    for cls, count in deck_counter.items():
-        remaining[cls] = max(0, count - known_counter.get(cls, 0))
-
-    return remaining, unknown_slots
+    for cls, count in game.deck.cards.counts.items():
+        remaining[cls] = max(0, count - known_counts.get(cls, 0))
+    return remaining, game.ai_known.unknown_count(bit)
 
 
-def card_probability_at(game, idx, card_cls):
-    """返回AI认知中牌堆索引idx处是card_cls类型的牌的概率。"""
-    _normalize_knowledge(game)
+def card_probability_at(game, idx, card_cls, player=None):
+    """返回player（默认第一个AI）的认知中牌堆索引idx处是card_cls类型的牌的概率。"""
     if not game.ai_known:
         return 0.0
 
+    bit = (player or game.ai).knowledge_bit
     idx = idx % len(game.ai_known)
-    slot = game.ai_known[idx]
-    known = slot.get("known")
+    known = game.ai_known.known(idx, bit)
     if known is not None:
         return 1.0 if isinstance(known, card_cls) else 0.0
 
-    remaining, unknown_slots = _remaining_type_counter(game)
+    remaining, unknown_slots = _remaining_type_counter(game, bit)
     if unknown_slots <= 0:
         return 0.0
     return min(1.0, remaining.get(card_cls, 0) / unknown_slots)
 
 
-def known_positions(game, card_cls):
-    _normalize_knowledge(game)
-    return [i for i, slot in enumerate(game.ai_known) if isinstance(slot.get("known"), card_cls)]
+def known_positions(game, card_cls, player=None):
+    bit = (player or game.ai).knowledge_bit
+    return [i for i, entry in enumerate(game.ai_known)
+            if entry is not None and entry[1] & bit and isinstance(entry[0], card_cls)]
 
 
-RESTRICTED_REPEAT_TYPES = (ShuffleCard, SwapCard, SeeFutureCard, AlterFutureCard)
+RESTRICTED_REPEAT_TYPES = tuple(cls for cls in CARD_TYPES if CARD_SPECS[cls].no_repeat)  # 同一回合内不连续打出的类型
 
 
-def _build_actions(game, forbidden_next_type=None):
+def _build_actions(game, forbidden_next_type=None, me=None):
+    me = me or _acting_ai(game)
     actions = []
-    if len(game.ai.hand) < game.ai.hand_limit:
+    if game.can_draw(me):
         actions.append(("draw", None))
 
-    playable = game.ai.get_specific_cards("playable")
+    playable = me.get_specific_cards("playable")
     if forbidden_next_type is not None:
         playable = [c for c in playable if not isinstance(c, forbidden_next_type)]
     for card in playable:
@@ -181,34 +267,35 @@ def _build_actions(game, forbidden_next_type=None):
     return actions
 
 
-def _state_snapshot(game, played_this_turn=0):
-    top_bomb = card_probability_at(game, -1, BombCatCard)
-    top_defuse = card_probability_at(game, -1, DefuseCard)
-    bottom_bomb = card_probability_at(game, 0, BombCatCard)
-    bottom_defuse = card_probability_at(game, 0, DefuseCard)
+def _state_snapshot(game, played_this_turn=0, me=None):
+    me = me or _acting_ai(game)
+    top_bomb = card_probability_at(game, -1, BombCatCard, me)
+    top_defuse = card_probability_at(game, -1, DefuseCard, me)
+    bottom_bomb = card_probability_at(game, 0, BombCatCard, me)
+    bottom_defuse = card_probability_at(game, 0, DefuseCard, me)
     playable_scores = [
         _card_initial_score(c)
-        for c in game.ai.get_specific_cards("playable")
+        for c in me.get_specific_cards("playable")
     ]
     min_playable_score = min(playable_scores) if playable_scores else 0.0
     max_playable_score = max(playable_scores) if playable_scores else 0.0
     return {
-        "has_defuse": game.ai.has_defuse(),
-        "hand_size": len(game.ai.hand),
-        "hand_limit": game.ai.hand_limit,
+        "has_defuse": me.has_defuse(),
+        "hand_size": len(me.hand),
+        "hand_limit": me.hand_limit,
         "remaining_turns": game.remaining_turns,
         "top_bomb": top_bomb,
         "top_defuse": top_defuse,
         "bottom_bomb": bottom_bomb,
         "bottom_defuse": bottom_defuse,
         "played_this_turn": played_this_turn,
-        "ai_is_noped": game.noped == game.ai,
-        "can_play_nope": game.noped != game.player,
+        "ai_is_noped": game.noped is me,
+        "can_play_nope": game.noped is not game.get_other(me),
         "min_playable_score": min_playable_score,
         "max_playable_score": max_playable_score,
-        "skip_count": len(game.ai.get_specific_cards(SkipCard)),
-        "super_skip_count": len(game.ai.get_specific_cards(SuperSkipCard)),
-        "shuffle_count": len(game.ai.get_specific_cards(ShuffleCard)),
+        "skip_count": me.hand.count_of(SkipCard),
+        "super_skip_count": me.hand.count_of(SuperSkipCard),
+        "shuffle_count": me.hand.count_of(ShuffleCard),
     }
 
 
@@ -220,11 +307,143 @@ def _card_initial_score(card):
     return float(getattr(card, "initial_score", 0.0))
 
 
-def _simulate_action(state, action):
-    """One-step abstract simulator for short-horizon search."""
+def _skip_reason(template, *args):
+    pass
+
+
+def _reason_writer(reason_parts):
+    """返回追加理由的函数；模板只在需要解释时才format"""
+    def note(template, *args):
+        reason_parts.append(template.format(*args) if args else template)
+    return note
+
+
+_PLAY_SIMULATORS = {}  # 卡牌类型 -> 出牌的抽象模拟函数
+
+
+def simulates(card_cls):
+    """登记某类卡牌在短视野搜索中的出牌模拟函数。
+    模拟函数签名：(state, next_state, card, score, card_score, low_risk_factor, note) -> (score, end_turn)，
+    可修改next_state中该牌带来的状态变化。"""
+    def decorator(func):
+        _PLAY_SIMULATORS[card_cls] = func
+        return func
+    return decorator
+
+
+@simulates(DrawBottomCard)
+def _simulate_draw_bottom(state, next_state, card, score, card_score, low_risk_factor, note):
+    p_bomb = state["bottom_bomb"]
+    p_def = state["bottom_defuse"]
+    death_prob = p_bomb if not state["has_defuse"] else 0.0
+    score += (1.0 - p_bomb) * 16.0
+    score += p_def * 10.0
+    score -= death_prob * 85.0
+    note("堆底炸弹概率={:.1%}", p_bomb)
+    note("堆底拆除概率={:.1%}", p_def)
+    return score, True
+
+
+@simulates(SkipCard)
+def _simulate_skip(state, next_state, card, score, card_score, low_risk_factor, note):
+    top_bomb = state["top_bomb"]
+    score += 14.0 + 26.0 * top_bomb
+    note("跳过可规避本次抽牌")
+    note("顶牌炸弹风险={:.1%}", top_bomb)
+    # 需要跳过时，倾向消耗较低价值的跳过类卡。
+    score -= 0.10 * card_score
+    return score, True
+
+
+@simulates(SuperSkipCard)
+def _simulate_super_skip(state, next_state, card, score, card_score, low_risk_factor, note):
+    top_bomb = state["top_bomb"]
+    score += 18.0 + 22.0 * top_bomb + 4.0 * max(0, state["remaining_turns"] - 1)
+    note("超级跳过可结束剩余抽牌")
+    # 超级跳过通常价值更高，非极端风险时应更谨慎使用。
+    score -= 0.15 * card_score * (1.0 - top_bomb)
+    if low_risk_factor > 0 and state.get("super_skip_count", 0) <= 1:
+        score -= 14.0 * low_risk_factor
+        note("低风险且仅剩1张超级跳过，优先保留")
+    return score, True
+
+
+@simulates(AttackCard)
+def _simulate_attack(state, next_state, card, score, card_score, low_risk_factor, note):
+    score += 16.0 + 24.0 * state["top_bomb"]
+    note("攻击可转移抽牌压力")
+    return score, True
+
+
+@simulates(ShuffleCard)
+def _simulate_shuffle(state, next_state, card, score, card_score, low_risk_factor, note):
+    # 抽象上只保留炸弹密度，清空位置信息
+    top_bomb = state["top_bomb"]
+    avg_bomb = max(top_bomb, state["bottom_bomb"])
+    next_state["top_bomb"] = avg_bomb
+    next_state["bottom_bomb"] = avg_bomb
+    score += 6.0 + 18.0 * top_bomb
+    note("洗牌重置高风险已知位置")
+    if low_risk_factor > 0:
+        score -= 12.0 * low_risk_factor
+        # note("低风险不应无必要洗牌")
+    return score, False
+
+
+@simulates(SwapCard)
+def _simulate_swap(state, next_state, card, score, card_score, low_risk_factor, note):
+    top_bomb, bottom_bomb = state["top_bomb"], state["bottom_bomb"]
+    next_state["top_bomb"], next_state["bottom_bomb"] = bottom_bomb, top_bomb
+    next_state["top_defuse"], next_state["bottom_defuse"] = state["bottom_defuse"], state["top_defuse"]
+    score += 5.0 + 20.0 * (top_bomb - bottom_bomb)
+    note("顶底互换转移顶牌风险")
+    return score, False
+
+
+@simulates(SeeFutureCard)
+def _simulate_see_future(state, next_state, card, score, card_score, low_risk_factor, note):
+    score += 8.0 + 8.0 * state["top_bomb"]
+    note("预见未来提升信息优势")
+    return score, False
+
+
+@simulates(AlterFutureCard)
+def _simulate_alter_future(state, next_state, card, score, card_score, low_risk_factor, note):
+    score += 10.0 + 12.0 * state["top_bomb"]
+    note("改变未来可主动规避炸弹")
+    return score, False
+
+
+@simulates(PersonalAttackCard)
+def _simulate_personal_attack(state, next_state, card, score, card_score, low_risk_factor, note):
+    score += -6.0 + 10.0 * (1.0 - state["top_bomb"])
+    note("自我攻击倾向在低风险时使用")
+    return score, False
+
+
+@simulates(NopeCard)
+def _simulate_nope(state, next_state, card, score, card_score, low_risk_factor, note):
+    if state.get("can_play_nope", True):
+        score += NOPE_PLAY_BONUS
+        note("提高拒绝卡使用倾向")
+    else:
+        score -= 80.0
+        note("拒绝卡不能重复打出")
+    return score, False
+
+
+def _simulate_other_play(state, next_state, card, score, card_score, low_risk_factor, note):
+    score += 1.0
+    note("出牌 {}", _card_label(card))
+    return score, False
+
+
+def _simulate_action(state, action, explain=False):
+    """One-step abstract simulator for short-horizon search. explain=False时不构造理由文字。"""
     kind, card = action
     next_state = dict(state)
     reason_parts = []
+    note = _reason_writer(reason_parts) if explain else _skip_reason
     end_turn = False
     score = 0.0
     top_bomb = state["top_bomb"]
@@ -242,18 +461,18 @@ def _simulate_action(state, action):
         score -= death_prob * 90.0
         if state.get("ai_is_noped", False):
             score += NOPED_DRAW_BONUS
-            reason_parts.append("当前被阻止，优先抽牌")
+            note("当前被阻止，优先抽牌")
         score += 9.0 * hand_low_gap
         score += 6.0 * low_risk_factor
         if low_risk_factor > 0:
-            reason_parts.append("低风险倾向补牌")
+            note("低风险倾向补牌")
         if hand_is_low:
             if hand_size == 0:
-                reason_parts.append("没手牌了")
+                note("没手牌了")
             else:
-                reason_parts.append(f"手牌少({state['hand_size']}/{state['hand_limit']})")
-        reason_parts.append(f"堆顶炸弹概率={p_bomb:.1%}")
-        reason_parts.append(f"堆顶拆除概率={p_def:.1%}")
+                note("手牌少({}/{})", state["hand_size"], state["hand_limit"])
+        note("堆顶炸弹概率={:.1%}", p_bomb)
+        note("堆顶拆除概率={:.1%}", p_def)
         end_turn = True
         next_state["hand_size"] = min(state["hand_limit"], state["hand_size"] + 1)
         next_state["played_this_turn"] = 0
@@ -263,80 +482,16 @@ def _simulate_action(state, action):
     next_state["hand_size"] = max(0, state["hand_size"] - 1)
     plays_before = state.get("played_this_turn", 0)
     next_state["played_this_turn"] = plays_before + 1
-    bottom_bomb = state["bottom_bomb"]
-    remaining_turns = state["remaining_turns"]
     card_score = _card_initial_score(card)
     if state.get("ai_is_noped", False):
         min_s = state.get("min_playable_score", card_score)
         max_s = state.get("max_playable_score", card_score)
         inverted_score = min_s + max_s - card_score
         score += NOPED_INVERT_FACTOR * inverted_score
-        reason_parts.append("被阻止态：低分牌优先消耗")
+        note("被阻止态：低分牌优先消耗")
 
-    if isinstance(card, DrawBottomCard):
-        p_bomb = state["bottom_bomb"]
-        p_def = state["bottom_defuse"]
-        death_prob = p_bomb if not state["has_defuse"] else 0.0
-        score += (1.0 - p_bomb) * 16.0
-        score += p_def * 10.0
-        score -= death_prob * 85.0
-        reason_parts.append(f"堆底炸弹概率={p_bomb:.1%}")
-        reason_parts.append(f"堆底拆除概率={p_def:.1%}")
-        end_turn = True
-    elif isinstance(card, SkipCard):
-        score += 14.0 + 26.0 * top_bomb
-        reason_parts.append("跳过可规避本次抽牌")
-        reason_parts.append(f"顶牌炸弹风险={top_bomb:.1%}")
-        end_turn = True
-        # 需要跳过时，倾向消耗较低价值的跳过类卡。
-        score -= 0.10 * card_score
-    elif isinstance(card, SuperSkipCard):
-        score += 18.0 + 22.0 * top_bomb + 4.0 * max(0, remaining_turns - 1)
-        reason_parts.append("超级跳过可结束剩余抽牌")
-        end_turn = True
-        # 超级跳过通常价值更高，非极端风险时应更谨慎使用。
-        score -= 0.15 * card_score * (1.0 - top_bomb)
-        if low_risk_factor > 0 and state.get("super_skip_count", 0) <= 1:
-            score -= 14.0 * low_risk_factor
-            reason_parts.append("低风险且仅剩1张超级跳过，优先保留")
-    elif isinstance(card, AttackCard):
-        score += 16.0 + 24.0 * top_bomb
-        reason_parts.append("攻击可转移抽牌压力")
-        end_turn = True
-    elif isinstance(card, ShuffleCard):
-        # 抽象上只保留炸弹密度，清空位置信息
-        avg_bomb = max(top_bomb, bottom_bomb)
-        next_state["top_bomb"] = avg_bomb
-        next_state["bottom_bomb"] = avg_bomb
-        score += 6.0 + 18.0 * top_bomb
-        reason_parts.append("洗牌重置高风险已知位置")
-        if low_risk_factor > 0:
-            score -= 12.0 * low_risk_factor
-            # reason_parts.append("低风险不应无必要洗牌")
-    elif isinstance(card, SwapCard):
-        next_state["top_bomb"], next_state["bottom_bomb"] = bottom_bomb, top_bomb
-        next_state["top_defuse"], next_state["bottom_defuse"] = state["bottom_defuse"], state["top_defuse"]
-        score += 5.0 + 20.0 * (top_bomb - bottom_bomb)
-        reason_parts.append("顶底互换转移顶牌风险")
-    elif isinstance(card, SeeFutureCard):
-        score += 8.0 + 8.0 * top_bomb
-        reason_parts.append("预见未来提升信息优势")
-    elif isinstance(card, AlterFutureCard):
-        score += 10.0 + 12.0 * top_bomb
-        reason_parts.append("改变未来可主动规避炸弹")
-    elif isinstance(card, PersonalAttackCard):
-        score += -6.0 + 10.0 * (1.0 - top_bomb)
-        reason_parts.append("自我攻击倾向在低风险时使用")
-    elif isinstance(card, NopeCard):
-        if state.get("can_play_nope", True):
-            score += NOPE_PLAY_BONUS
-            reason_parts.append("提高拒绝卡使用倾向")
-        else:
-            score -= 80.0
-            reason_parts.append("拒绝卡不能重复打出")
-    else:
-        score += 1.0
-        reason_parts.append(f"出牌 {_card_label(card)}")
+    simulate = _PLAY_SIMULATORS.get(type(card), _simulate_other_play)
+    score, end_turn = simulate(state, next_state, card, score, card_score, low_risk_factor, note)
 
     # 低风险时降低主动消耗后备牌的倾向；手牌少(<=3)时优先保留后备牌。
     play_consumption_penalty = (8.0 * low_risk_factor) + (6.0 * hand_low_gap * (0.5 + 0.5 * low_risk_factor))
@@ -347,116 +502,243 @@ def _simulate_action(state, action):
     preserve_weight = 0.08 + 0.16 * low_risk_factor
     score -= card_score * preserve_weight
     if low_risk_factor > 0 and card_score >= 30:
-        reason_parts.append(f"尝试保留高分牌({_card_label(card)}={card_score:.0f})")
+        note("尝试保留高分牌({}={:.0f})", _card_label(card), card_score)
 
     # 单回合内连打多张牌轻微加罚：第二张开始逐步扣分。
     if plays_before > 0:
         multi_penalty = MULTI_PLAY_PENALTY * plays_before
         score -= multi_penalty
-        reason_parts.append(f"连打{plays_before + 1}张牌轻罚={multi_penalty:.1f}")
+        note("连打{}张牌轻罚={:.1f}", plays_before + 1, multi_penalty)
 
     return score, "；".join(reason_parts), next_state, end_turn
 
 
-def _action_value(state, action, remaining_cards, depth):
-    base_score, reason, next_state, end_turn = _simulate_action(state, action)
+def _action_value(state, action, remaining_cards, depth, deadline=None, explain=False, cache=None):
+    """cache不为None时是[命中, 未命中]计数，记录展开时同类型同分值的去重情况"""
+    if deadline is not None and time.perf_counter() >= deadline:
+        raise _SearchTimeout
+    base_score, reason, next_state, end_turn = _simulate_action(state, action, explain)
 
     if depth <= 0 or end_turn:
         return base_score, reason
 
     # 抽象短期视野预测：假设我们可以选择一个更好的行动。
     future_scores = []
-    for card in remaining_cards:
-        future_scores.append(_simulate_action(next_state, ("play", card))[0])
+    seen = set()
+    for i, card in enumerate(remaining_cards):
+        # 同类型同分值的牌模拟结果相同，只展开一次。
+        key = (type(card), _card_initial_score(card))
+        if key in seen:
+            if cache is not None:
+                cache[0] += 1
+            continue
+        seen.add(key)
+        if cache is not None:
+            cache[1] += 1
+        rest = remaining_cards[:i] + remaining_cards[i + 1:]
+        future_scores.append(_action_value(next_state, ("play", card), rest, depth - 1, deadline, cache=cache)[0])
     if next_state["hand_size"] < next_state["hand_limit"]:
         future_scores.append(_simulate_action(next_state, ("draw", None))[0])
 
     if future_scores:
         lookahead = max(future_scores)
         total = base_score + FUTURE_DISCOUNT * lookahead
-        return total, f"{reason}；短视野评估={lookahead:.2f}"
+        if explain:
+            reason = f"{reason}；短视野评估={lookahead:.2f}"
+        return total, reason
 
     return base_score, reason
 
 
-def ai_control(game, played_this_turn=0, forbidden_next_type=None):
+def _rollout_value(state, action, remaining_cards, rng):
+    """随机展开：在抽象模拟器上用rng随机行动直至回合结束，返回折扣累计分。"""
+    total, _reason, current, end_turn = _simulate_action(state, action)
+    cards = list(remaining_cards)
+    discount = 1.0
+    for _ in range(ROLLOUT_MAX_PLIES):
+        if end_turn:
+            break
+        can_draw = current["hand_size"] < current["hand_limit"]
+        options = len(cards) + (1 if can_draw else 0)
+        if options == 0:
+            break
+        pick = rng.randrange(options)
+        if pick < len(cards):
+            next_action = ("play", cards.pop(pick))
+        else:
+            next_action = ("draw", None)
+        discount *= FUTURE_DISCOUNT
+        score, _reason, current, end_turn = _simulate_action(current, next_action)
+        total += discount * score
+    return total
+
+
+def _candidate_remaining(playable, action):
+    # 如果当前行动是出牌，则从未来候选中移除这张牌，以模拟手牌消耗后的情况。
+    remaining_cards = playable.copy()
+    if action[0] == "play" and action[1] in remaining_cards:
+        remaining_cards.remove(action[1])
+    return remaining_cards
+
+
+def _anytime_search(state, actions, playable, profile, rng, explain=False, cache=None):
+    """
+    在难度预算内进行随时可中断的搜索
+    先完成0层评估保证总有答案，再逐层加深；某层超时则丢弃该层，沿用上一层结果。
+    剩余时间用于随机展开（随机数来自rng），修正最大值前瞻的乐观偏差。
+    explain=False时各候选的理由为空串，只有根节点会在需要时构造理由；cache见_action_value。
+    """
+    deadline = time.perf_counter() + profile.time_budget_ms / 1000.0
+    remaining = [_candidate_remaining(playable, action) for action in actions]
+
+    results = [_action_value(state, action, rest, depth=0, explain=explain) for action, rest in zip(actions, remaining)]
+    completed_depth = 0
+    for depth in range(1, profile.search_depth):
+        try:
+            results = [
+                _action_value(state, action, rest, depth=depth, deadline=deadline, explain=explain, cache=cache)
+                for action, rest in zip(actions, remaining)
+            ]
+        except _SearchTimeout:
+            break
+        completed_depth = depth
+
+    rollout_totals = [0.0] * len(actions)
+    rollouts_done = 0
+    while rollouts_done < profile.rollouts and time.perf_counter() < deadline:
+        for i, (action, rest) in enumerate(zip(actions, remaining)):
+            rollout_totals[i] += _rollout_value(state, action, rest, rng)
+        rollouts_done += 1
+
+    evals = []
+    for action, (score, reason), rollout_total in zip(actions, results, rollout_totals):
+        if rollouts_done:
+            rollout_mean = rollout_total / rollouts_done
+            score = (1.0 - ROLLOUT_WEIGHT) * score + ROLLOUT_WEIGHT * rollout_mean
+            if explain:
+                reason = f"{reason}；随机展开均值={rollout_mean:.2f}"
+        evals.append(ActionEval(action=action, score=score, reason=reason))
+    return evals, completed_depth + 1, rollouts_done
+
+
+def ai_control(game, played_this_turn=0, forbidden_next_type=None, me=None):
     """Score-driven AI action selection with probabilistic cognition."""
-    _normalize_knowledge(game)
-    actions = _build_actions(game, forbidden_next_type=forbidden_next_type)
+    decision_started = time.perf_counter()
+    me = me or _acting_ai(game)
+    actions = _build_actions(game, forbidden_next_type=forbidden_next_type, me=me)
     if not actions:
         return "draw", None
 
-    state = _state_snapshot(game, played_this_turn=played_this_turn)
+    state = _state_snapshot(game, played_this_turn=played_this_turn, me=me)
     state["ai_known"] = game.ai_known
 
-    evals = []
-    playable = game.ai.get_specific_cards("playable")
-    for action in actions:
-        # 如果当前行动是出牌，则从未来候选中移除一张同类型的牌，以模拟手牌消耗后的情况。
-        remaining_cards = playable.copy()
-        if action[0] == "play" and action[1] in remaining_cards:
-            remaining_cards.remove(action[1])
-
-        score, reason = _action_value(state, action, remaining_cards, depth=LOOKAHEAD_DEPTH - 1)
-        evals.append(ActionEval(action=action, score=score, reason=reason))
-
+    profile = get_difficulty(getattr(game, "difficulty", None))
+    started = time.perf_counter()
+    playable = me.get_specific_cards("playable")
+    explain = game.debug_enabled  # 没有人查看调试输出时跳过全部理由文字的构造
+    metrics = getattr(game, "metrics", None)
+    cache = [0, 0] if metrics is not None else None
+    # 展开次数取决于时间预算，每次决策从对局的ai_rng取固定数量的随机数派生本次的rng，后续决策的随机流不受展开次数影响
+    search_rng = random.Random(game.ai_rng.getrandbits(64))
+    evals, searched_depth, rollouts_done = _anytime_search(state, actions, playable, profile, search_rng, explain, cache)
+
+    # 学习价值函数：所有候选行动一次矩阵运算打分，以相对均值的胜率差修正评分。
+    samples = getattr(game, "value_samples", None)
+    model = value_model.load_default_model() if value_model and profile.value_weight else None
+    features = None
+    if value_model and (model is not None or samples is not None):
+        features = value_model.encode_actions(game, state, actions, me)
+    if model is not None:
+        win_probs = model.predict(features)
+        for item, prob in zip(evals, win_probs - win_probs.mean()):
+            item.score += profile.value_weight * prob
+            if explain:
+                item.reason = f"{item.reason}；价值模型修正={profile.value_weight * prob:+.2f}"
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+    best = max(evals, key=lambda x: x.score)
+    if samples is not None:
+        # 收集训练数据时按一定概率探索随机行动
+        if game.ai_rng.random() < getattr(game, "value_explore", 0.0):
+            best = game.ai_rng.choice(evals)
+        if features is not None:
+            samples.append(features[evals.index(best)])
     evals.sort(key=lambda x: x.score, reverse=True)
-    best = evals[0]
 
-    if game.gui and game.gui.debug_mode:
-        game.gui.print(
+    if explain:
+        lines = [
             f"AI 决策: {best.action[0]} {'抽牌' if best.action[0] == 'draw' else _card_label(best.action[1])} | 评分={best.score:.2f}",
-            debug=True,
-        )
-        game.gui.print(f"理由: {best.reason}", debug=True)
+            f"理由: {best.reason}",
+        ]
         for idx, item in enumerate(evals[1:3], start=2):
             label = "抽牌" if item.action[0] == "draw" else _card_label(item.action[1])
-            game.gui.print(f"候选{idx}: {item.action[0]} {label} | 评分={item.score:.2f}", debug=True)
+            lines.append(f"候选{idx}: {item.action[0]} {label} | 评分={item.score:.2f}")
+        lines.append(
+            f"难度={profile.label} | 搜索深度={searched_depth}/{profile.search_depth} | "
+            f"随机展开={rollouts_done} | 耗时={elapsed_ms:.1f}ms/{profile.time_budget_ms:.0f}ms"
+        )
+        game.emit(DebugReasoning(me.seat, tuple(lines)))
 
+    if metrics is not None:
+        metrics.observe_decision(time.perf_counter() - decision_started, *cache)
     return best.action
 
 
-def ai_turn(game):
-    """Execute one AI turn loop."""
-    played_this_turn = 0
-    forbidden_next_type = None
-    while game.current_player.is_ai and game.ai.alive:
-        action, _card = ai_control(
-            game,
-            played_this_turn=played_this_turn,
-            forbidden_next_type=forbidden_next_type,
-        )
-        if action == "play" and _card:
-            while not game.play_card(game.ai, _card):
-                game.gui.print("一次出牌失败", debug=True)
-                playable = game.ai.get_specific_cards("playable")
-                if forbidden_next_type is not None:
-                    playable = [c for c in playable if not isinstance(c, forbidden_next_type)]
-                if not playable:
-                    action, _card = "draw", None
-                    break
-                action, _card = "play", random.choice(playable)
-
-            if action == "draw":
-                game.gui.print("🖐 AI 选择抽牌", debug=True)
-                if game.draw_card(game.ai):
-                    break
-
-            # 仅限制“紧跟的下一张”：若本次打出受限功能牌，则下一次不能同类；否则清空限制。
-            forbidden_next_type = type(_card) if isinstance(_card, RESTRICTED_REPEAT_TYPES) else None
-            played_this_turn += 1
-
-            if game.end_turn or game.end_all_turn:
+def note_ai_play(game, card):
+    """记录AI本回合成功打出的一张牌（重放对局时也由这里维护同样的出牌限制）"""
+    # 仅限制“紧跟的下一张”：若本次打出受限功能牌，则下一次不能同类；否则清空限制。
+    game.ai_forbidden_next_type = type(card) if card.spec is not None and card.spec.no_repeat else None
+    game.ai_played_this_turn += 1
+
+
+def ai_step(game):
+    """AI执行一次决策（出一张牌或抽牌），由Game.step()在AI的AWAITING_ACTION阶段调用。"""
+    me = game.current_player
+    forbidden_next_type = game.ai_forbidden_next_type
+    action, _card = ai_control(
+        game,
+        played_this_turn=game.ai_played_this_turn,
+        forbidden_next_type=forbidden_next_type,
+        me=me,
+    )
+    if action == "play" and _card:
+        failed = []
+        while not game.play_card(me, _card):
+            game.debug("一次出牌失败")
+            failed.append(_card)
+            playable = [c for c in me.get_specific_cards("playable") if c not in failed]
+            if forbidden_next_type is not None:
+                playable = [c for c in playable if not isinstance(c, forbidden_next_type)]
+            if not playable:
+                action, _card = "draw", None
                 break
-        elif action == "draw":
-            game.gui.print("🖐 AI 选择抽牌")
-            game.draw_card(game.ai)
-            break
+            action, _card = "play", game.ai_rng.choice(playable)
+
+        if action == "draw":
+            game.debug("🖐 AI 选择抽牌")
+            game.draw_card(me)
         else:
-            game.gui.print("AI 无法执行操作", debug=True)
-            break
+            note_ai_play(game, _card)
+    elif action == "draw":
+        game.gui.print("🖐 AI 选择抽牌")
+        game.draw_card(me)
+    else:
+        game.debug("AI 无法执行操作")
+
+    game.gui.update_gui(("status",))
+
+
+def ai_turn(game):
+    """连续推进状态机直到AI的当前回合结束（含结束后的换边）。"""
+    if not game.current_player.is_ai:
+        return
+    turns_played = game.turns_played
+    while game.turns_played == turns_played and game.step():
+        pass
 
-    game.gui.update_gui()
+profiler.register(sys.modules[__name__], "ai_control", "_simulate_action", "card_probability_at",
+                  "init_ai_knowledge", "on_shuffle", "on_swap_top_bottom", "on_draw", "on_insert_known",
+                  "on_insert_unknown", "on_see_future", "on_remove_top", "on_append_known", "on_append_unknown")
 
 if __name__ == "__main__":
     import main
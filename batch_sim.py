@@ -0,0 +1,383 @@
+"""
+批量数组化模拟模块
+用NumPy数组同时表示K局对局（牌堆类型编码矩阵、手牌计数、剩余回合、存活标记），
+所有对局按固定的简单策略同步推进，cards.py中的卡牌效果以带掩码的向量化操作实现，用于平衡性研究。
+validate()用同一策略驱动对象引擎，对比统计结果以确认两者一致。
+
+用法：
+    python batch_sim.py --games 100000 --validate 2000
+"""
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+import headless
+from cards import (
+    CARD_SPECS,
+    CARD_TYPES,
+    AlterFutureCard,
+    AttackCard,
+    BombCatCard,
+    DefuseCard,
+    DrawBottomCard,
+    NopeCard,
+    PersonalAttackCard,
+    SeeFutureCard,
+    ShuffleCard,
+    SkipCard,
+    SuperSkipCard,
+    SwapCard,
+)
+from main import Deck, Player
+
+
+ESCAPE_RATE = 0.5  # 未满手牌时尝试打出逃生牌的概率
+ESCAPE_ORDER = (AttackCard, SkipCard, SuperSkipCard)
+# 手牌满时必须出牌的优先顺序（改变未来放最后）。
+# 改变未来：玩家座位由headless放弃排序、保持原顺序；AI座位按AlterFutureCard.use的AI分支重排，数组模拟中同样实现（_alter_future）
+FORCED_ORDER = (SeeFutureCard, NopeCard, ShuffleCard, SwapCard, AttackCard, SkipCard, SuperSkipCard,
+                PersonalAttackCard, DrawBottomCard, AlterFutureCard)
+
+NUM_TYPES = len(CARD_TYPES)
+_CODE = {cls: i for i, cls in enumerate(CARD_TYPES)}
+BOMB = _CODE[BombCatCard]
+DEFUSE = _CODE[DefuseCard]
+NOPE = _CODE[NopeCard]
+ATTACK = _CODE[AttackCard]
+PERSONAL_ATTACK = _CODE[PersonalAttackCard]
+SKIP = _CODE[SkipCard]
+SUPER_SKIP = _CODE[SuperSkipCard]
+SHUFFLE = _CODE[ShuffleCard]
+SWAP = _CODE[SwapCard]
+DRAW_BOTTOM = _CODE[DrawBottomCard]
+ALTER_FUTURE = _CODE[AlterFutureCard]
+EMPTY = -1  # 牌堆矩阵中的空位
+DRAW = -1  # 行动编码：抽牌（其余行动为打出的卡牌类型编码）
+
+
+def _depth_tables():
+    """有深度的卡牌：默认深度的分值、另一深度的分值与出现概率（数组模拟不记录每张牌的深度，按登记表的权重抽取）"""
+    score = np.zeros(NUM_TYPES)
+    alt_score = np.zeros(NUM_TYPES)
+    alt_prob = np.zeros(NUM_TYPES)
+    for cls, code in _CODE.items():
+        spec = CARD_SPECS[cls]
+        score[code] = alt_score[code] = spec.initial_score()
+        if spec.depth_weights:
+            assert len(spec.depth_weights) == 2, "数组模拟只支持两种深度"
+            (_, w0), (depth, w1) = spec.depth_weights
+            alt_score[code] = spec.initial_score(depth)
+            alt_prob[code] = w1 / (w0 + w1)
+    return score, alt_score, alt_prob
+
+
+_SCORE, _ALT_SCORE, _ALT_PROB = _depth_tables()
+_ALTER_DEPTHS = tuple(depth for depth, _ in CARD_SPECS[AlterFutureCard].depth_weights)
+_ALTER_WINDOW = max(_ALTER_DEPTHS)
+
+_ESCAPE_CODES = np.array([_CODE[cls] for cls in ESCAPE_ORDER])
+_FORCED_CODES = np.array([_CODE[cls] for cls in FORCED_ORDER])
+
+
+def simple_policy(game, player):
+    """对象引擎版本的固定简单策略，与BatchSimulator逐条对应"""
+    if len(player.hand) >= player.hand_limit:
+        order = FORCED_ORDER
+    elif random.random() < ESCAPE_RATE:
+        order = ESCAPE_ORDER
+    else:
+        order = ()
+
+    for cls in order:
+        if cls is NopeCard and game.noped == game.get_other(player):
+            continue
+        card = player.hand.first(cls)
+        if card is not None:
+            game.play_card(player, card)
+            return
+    game.draw_card(player)
+
+
+def _first_available_table(codes):
+    """按类型位掩码预计算：codes顺序中第一个持有的类型编码，没有则为-1"""
+    masks = np.arange(1 << NUM_TYPES)
+    held = (masks[:, None] >> codes) & 1
+    return np.where(held.any(axis=1), codes[held.argmax(axis=1)], -1).astype(np.int8)
+
+
+_TYPE_BITS = (1 << np.arange(NUM_TYPES)).astype(np.int32)
+_ESCAPE_TABLE = _first_available_table(_ESCAPE_CODES)
+_FORCED_TABLE = _first_available_table(_FORCED_CODES)
+
+
+class BatchSimulator:
+    """
+    K局对局的数组化同步模拟（座位0为先手玩家，座位1为AI）
+    状态数组只保留进行中的对局，结束的对局写入结果后从数组中压缩掉，ids记录其原始编号。
+    """
+
+    def __init__(self, num_games, seed=None, escape_rate=ESCAPE_RATE):
+        self.rng = np.random.default_rng(seed)
+        self.escape_rate = escape_rate
+        self.num_games = num_games
+        template = Player("")
+        self.hand_limit = template.hand_limit
+
+        amounts = Deck().amounts
+        composition = np.repeat(np.arange(NUM_TYPES), [amounts[cls] for cls in CARD_TYPES])
+        deal_count = template.init_limit - 1
+
+        # 洗牌后按Deck.draw(refuse=...)的方式发牌：从索引0（堆底）一侧依次取非炸弹牌，
+        # 先发玩家再发AI；炸弹因此更多留在堆底附近，这里保持与对象引擎一致。
+        cards = composition[np.argsort(self.rng.random((num_games, len(composition))), axis=1)]
+        is_card = cards != BOMB
+        rank = np.cumsum(is_card, axis=1) * is_card
+        self.hands = np.zeros((num_games, 2, NUM_TYPES), dtype=np.int8)
+        self.hands[:, :, DEFUSE] = 1
+        game_offsets = np.arange(num_games)[:, None] * NUM_TYPES
+        for seat in range(2):
+            dealt = (rank > seat * deal_count) & (rank <= (seat + 1) * deal_count)
+            counts = np.bincount((game_offsets + cards)[dealt], minlength=num_games * NUM_TYPES)
+            self.hands[:, seat] += counts.reshape(num_games, NUM_TYPES).astype(np.int8)
+        self.hand_size = self.hands.sum(axis=2, dtype=np.int16)
+
+        # 牌堆：剩余牌保持原相对顺序，索引0为堆底，deck_len-1为堆顶
+        remaining = (rank == 0) | (rank > 2 * deal_count)
+        order = np.argsort(~remaining, axis=1, kind="stable")
+        self.capacity = len(composition)
+        self.deck = np.take_along_axis(cards, order, axis=1).astype(np.int8)
+        self.deck_len = remaining.sum(axis=1).astype(np.int32)
+        self.deck[np.arange(self.capacity) >= self.deck_len[:, None]] = EMPTY
+
+        self.remaining_turns = np.ones(num_games, dtype=np.int32)
+        self.current = np.zeros(num_games, dtype=np.intp)
+        self.noped = np.full(num_games, -1, dtype=np.intp)
+        self.alive = np.ones((num_games, 2), dtype=bool)
+        self.turns = np.zeros(num_games, dtype=np.int32)
+        self.ids = np.arange(num_games)
+        self.steps = 0
+
+        self.result_winner = np.full(num_games, -1, dtype=np.int8)
+        self.result_turns = np.zeros(num_games, dtype=np.int32)
+
+    def winners(self):
+        """每局胜者座位，未结束为-1"""
+        return self.result_winner
+
+    def run(self, max_steps=5000):
+        while self.steps < max_steps and self.step():
+            pass
+        return self
+
+    def step(self):
+        """所有进行中的对局各执行一次决策，返回是否仍有对局进行中"""
+        n = self.ids.size
+        if n == 0:
+            return False
+        self.steps += 1
+        rows = np.arange(n)
+        cur = self.current
+        hand = self.hands[rows, cur]
+
+        # 策略：按持有类型的位掩码查表
+        held = (hand > 0).astype(np.int32) @ _TYPE_BITS
+        held[self.noped == 1 - cur] &= ~(1 << NOPE)  # 拒绝卡不能重复打出
+        full = self.hand_size[rows, cur] >= self.hand_limit
+        try_escape = self.rng.random(n) < self.escape_rate
+        action = np.where(full, _FORCED_TABLE[held], np.where(try_escape, _ESCAPE_TABLE[held], DRAW))
+
+        end_turn = np.zeros(n, dtype=bool)
+        end_all = np.zeros(n, dtype=bool)
+
+        # 出牌：先消耗手牌；被拒绝的牌没有效果
+        play = action != DRAW
+        prow, seats, codes = rows[play], cur[play], action[play]
+        self.hands[prow, seats, codes] -= 1
+        self.hand_size[prow, seats] -= 1
+        cancelled = self.noped[prow] == seats
+        self.noped[prow[cancelled]] = -1
+        prow, seats, codes = prow[~cancelled], seats[~cancelled], codes[~cancelled]
+
+        sel = codes == NOPE
+        self.noped[prow[sel]] = 1 - seats[sel]
+        self.remaining_turns[prow[codes == PERSONAL_ATTACK]] += 2
+        sel = codes == ATTACK
+        self.remaining_turns[prow[sel]] += 2
+        self.current[prow[sel]] = 1 - seats[sel]
+        end_turn[prow[sel]] = True
+        end_turn[prow[codes == SKIP]] = True
+        end_all[prow[codes == SUPER_SKIP]] = True
+        self._shuffle(prow[codes == SHUFFLE])
+        self._swap_top_bottom(prow[codes == SWAP])
+        sel = codes == DRAW_BOTTOM
+        self._draw(prow[sel], seats[sel], from_bottom=True, end_turn=end_turn, end_all=end_all)
+        self._alter_future(prow[(codes == ALTER_FUTURE) & (seats == 1)])
+
+        sel = action == DRAW
+        self._draw(rows[sel], cur[sel], from_bottom=False, end_turn=end_turn, end_all=end_all)
+
+        # 回合结束：与Game._next_turn相同的剩余回合与换边规则
+        ended = end_turn | end_all
+        self.turns[ended] += 1
+        self.remaining_turns[end_all] = 0
+        self.remaining_turns[end_turn] -= 1
+        switch = ended & (self.remaining_turns <= 0)
+        self.remaining_turns[switch] = 1
+        self.current[switch] = 1 - self.current[switch]
+
+        finished = ~self.alive.all(axis=1)
+        if finished.any():
+            self._retire(finished)
+        return self.ids.size > 0
+
+    def _retire(self, finished):
+        """记录结束对局的结果，并把它们从状态数组中压缩掉"""
+        ids = self.ids[finished]
+        self.result_winner[ids] = np.where(self.alive[finished, 0], 0, 1)
+        self.result_turns[ids] = self.turns[finished]
+        keep = ~finished
+        for name in ("deck", "deck_len", "hands", "hand_size", "remaining_turns", "current", "noped",
+                     "alive", "turns", "ids"):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def _shuffle(self, rows):
+        if rows.size == 0:
+            return
+        keys = self.rng.random((rows.size, self.capacity))
+        keys[np.arange(self.capacity) >= self.deck_len[rows][:, None]] = 2.0  # 空位留在末尾
+        self.deck[rows] = np.take_along_axis(self.deck[rows], np.argsort(keys, axis=1), axis=1)
+
+    def _swap_top_bottom(self, rows):
+        rows = rows[self.deck_len[rows] > 1]
+        tops = self.deck_len[rows] - 1
+        bottom = self.deck[rows, 0].copy()
+        self.deck[rows, 0] = self.deck[rows, tops]
+        self.deck[rows, tops] = bottom
+
+    def _alter_future(self, rows):
+        """
+        AI打出改变未来：与AlterFutureCard.use的AI分支相同，按抽牌顺序（顶 -> 底）把非炸弹牌按分值从高到低排在前面，
+        炸弹后置；AI本回合只剩一次抽牌且有非炸弹牌时，把第一只炸弹放到第2张
+        """
+        if rows.size == 0:
+            return
+        n = rows.size
+        alt = self.rng.random(n) < _ALT_PROB[ALTER_FUTURE]
+        count = np.minimum(self.deck_len[rows], np.where(alt, _ALTER_DEPTHS[1], _ALTER_DEPTHS[0]))
+        j = np.arange(_ALTER_WINDOW)
+        valid = j < count[:, None]
+        slots = np.maximum(self.deck_len[rows][:, None] - 1 - j, 0)  # 第j张（从顶数）所在的索引
+        window = np.take_along_axis(self.deck[rows], slots, axis=1).astype(np.intp)
+
+        bomb = window == BOMB
+        score = np.where(self.rng.random(window.shape) < _ALT_PROB[window], _ALT_SCORE[window], _SCORE[window])
+        key = np.where(bomb, 1e6, -score) + j * 1e-3  # 同分保持原顺序（与稳定排序一致）
+        key[~valid] = 2e6 + j[None, :].repeat(n, axis=0)[~valid]
+        order = np.argsort(key, axis=1)
+
+        non_bombs = (valid & ~bomb).sum(axis=1)
+        special = (self.remaining_turns[rows] == 1) & (non_bombs > 0) & (valid & bomb).any(axis=1)
+        p = non_bombs[:, None]  # 第一只炸弹在排序后的位置
+        moved = np.where(j == 0, 0, np.where(j == 1, p, np.where(j <= p, j - 1, j)))
+        order = np.where(special[:, None], np.take_along_axis(order, moved, axis=1), order)
+
+        reordered = np.take_along_axis(window, order, axis=1)
+        r, c = np.nonzero(valid)
+        self.deck[rows[r], slots[r, c]] = reordered[r, c]
+
+    def _draw(self, rows, seats, from_bottom, end_turn, end_all):
+        if rows.size == 0:
+            return
+        if from_bottom:
+            cards = self.deck[rows, 0].astype(np.intp)
+            self.deck[rows, :-1] = self.deck[rows, 1:]
+            self.deck[rows, -1] = EMPTY
+        else:
+            tops = self.deck_len[rows] - 1
+            cards = self.deck[rows, tops].astype(np.intp)
+            self.deck[rows, tops] = EMPTY
+        self.deck_len[rows] -= 1
+
+        safe = cards != BOMB
+        self.hands[rows[safe], seats[safe], cards[safe]] += 1
+        self.hand_size[rows[safe], seats[safe]] += 1
+        end_turn[rows[safe]] = True
+
+        rows, seats = rows[~safe], seats[~safe]
+        defused = self.hands[rows, seats, DEFUSE] > 0
+        self.alive[rows[~defused], seats[~defused]] = False
+
+        # 拆除：消耗拆除卡，炸弹随机放回牌堆任意位置，并结束剩余所有回合
+        rows, seats = rows[defused], seats[defused]
+        self.hands[rows, seats, DEFUSE] -= 1
+        self.hand_size[rows, seats] -= 1
+        positions = self.rng.integers(0, self.deck_len[rows] + 1)
+        old = self.deck[rows]
+        shifted = np.full_like(old, EMPTY)
+        shifted[:, 1:] = old[:, :-1]
+        cols = np.arange(self.capacity)
+        pos = positions[:, None]
+        self.deck[rows] = np.where(cols < pos, old, np.where(cols == pos, BOMB, shifted))
+        self.deck_len[rows] += 1
+        end_all[rows] = True
+
+
+def _summary(winners, turns):
+    finished = winners >= 0
+    n = int(finished.sum())
+    first_wins = float((winners[finished] == 0).mean()) if n else 0.0
+    t = turns[finished].astype(np.float64)
+    return n, first_wins, float(t.mean()) if n else 0.0, float(t.var(ddof=1)) if n > 1 else 0.0
+
+
+def validate(object_games=2000, batch_games=100000, seed=0, z_limit=3.0):
+    """用同一策略比较对象引擎与数组模拟的先手胜率和平均回合数，返回是否一致"""
+    started = time.perf_counter()
+    results = [headless.run_game(seed=seed + i, player_policy=simple_policy, ai_policy=simple_policy)
+               for i in range(object_games)]
+    object_elapsed = time.perf_counter() - started
+    obj_winners = np.array([{"player": 0, "ai": 1}.get(r.winner, -1) for r in results])
+    obj_turns = np.array([r.turns for r in results])
+
+    started = time.perf_counter()
+    sim = BatchSimulator(batch_games, seed=seed).run()
+    batch_elapsed = time.perf_counter() - started
+
+    n1, p1, m1, v1 = _summary(obj_winners, obj_turns)
+    n2, p2, m2, v2 = _summary(sim.winners(), sim.result_turns)
+    pooled = (p1 * n1 + p2 * n2) / (n1 + n2)
+    z_win = (p1 - p2) / math.sqrt(max(pooled * (1 - pooled) * (1 / n1 + 1 / n2), 1e-12))
+    z_turns = (m1 - m2) / math.sqrt(max(v1 / n1 + v2 / n2, 1e-12))
+
+    print(f"{'':8}{'对局':>10}{'先手胜率':>10}{'平均回合':>10}{'局/秒':>12}")
+    print(f"{'对象引擎':8}{n1:>10}{p1:>10.3f}{m1:>10.2f}{n1 / object_elapsed:>12.0f}")
+    print(f"{'数组模拟':8}{n2:>10}{p2:>10.3f}{m2:>10.2f}{n2 / batch_elapsed:>12.0f}")
+    passed = abs(z_win) < z_limit and abs(z_turns) < z_limit
+    print(f"z(胜率)={z_win:+.2f} z(回合)={z_turns:+.2f} -> {'一致' if passed else '不一致'}")
+    return passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BombCat 批量数组化模拟")
+    parser.add_argument("--games", type=int, default=100000, help="同步模拟的对局数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--validate", type=int, default=0, metavar="N",
+                        help="额外用对象引擎跑N局进行统计一致性校验")
+    args = parser.parse_args(argv)
+
+    if args.validate:
+        raise SystemExit(0 if validate(args.validate, args.games, seed=args.seed) else 1)
+
+    started = time.perf_counter()
+    sim = BatchSimulator(args.games, seed=args.seed).run()
+    elapsed = time.perf_counter() - started
+    n, first_wins, mean_turns, _ = _summary(sim.winners(), sim.result_turns)
+    print(f"对局: {n}/{args.games} | 先手胜率: {first_wins:.3f} | 平均回合: {mean_turns:.2f} | "
+          f"{n / elapsed:.0f} 局/秒")
+
+
+if __name__ == "__main__":
+    main()
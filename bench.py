@@ -0,0 +1,382 @@
+"""
+基准测试
+覆盖牌堆操作（抽顶 / 抽底 / 带refuse的抽牌、插入）、AI牌堆认知钩子、card_probability_at、
+ai_control在对局中采样的局面上的决策、完整的无界面对局吞吐，以及隐藏Tk窗口中的日志渲染。
+每项先校准循环次数，再取多次重复中最快的一次（受其他进程干扰最小），结果为单次操作的耗时。
+基线按机器（主机名、架构、Python版本）分别保存在同一个文件中；与基线相比变慢超过阈值的项目列为退化，此时退出码为1。
+
+用法：
+    python bench.py --save              # 运行全部并存为本机基线
+    python bench.py                     # 与本机基线比较（默认阈值15%）
+    python bench.py -k deck ai_control  # 只运行名称包含这些子串的项目
+    python bench.py --quick --threshold 0.3
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import time
+from dataclasses import dataclass
+
+import ai_player as ai_behavior
+from cards import BombCatCard, DefuseCard
+from headless import HeadlessGUI, baseline_policy, run_game
+from main import DEFAULT_SEATS, Deck, Game, TurnPhase, table_seats
+
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.expanduser("~"), ".bombcat", "bench_baselines.json")
+DEFAULT_THRESHOLD = 0.15  # 比基线慢15%以上视为退化
+MIN_TIME = 0.2  # 秒，每次重复的最短耗时
+REPEATS = 5
+
+_BENCHMARKS = {}  # 名称 -> (说明, 准备函数)；准备函数返回(执行一轮的函数, 一轮包含的操作数)
+
+
+class BenchmarkSkipped(Exception):
+    """当前环境无法运行该项目（如没有图形显示）"""
+
+
+@dataclass
+class BenchResult:
+    name: str
+    seconds: float = 0.0  # 单次操作耗时
+    skipped: str = ""  # 跳过的原因
+
+
+def benchmark(name, doc):
+    def register(setup):
+        _BENCHMARKS[name] = (doc, setup)
+        return setup
+    return register
+
+
+def machine_key():
+    """区分基线的机器标识"""
+    return f"{platform.node()}/{platform.machine()}/py{platform.python_version()}"
+
+
+# 代表性局面：用固定种子的对局在AI决策点取得快照
+_STATE_CACHE = {}
+
+
+def sample_states(seats=DEFAULT_SEATS, difficulty="normal", games=3):
+    """固定种子的对局中每个AI决策点的快照（玩家座位由基线策略代打）"""
+    key = (tuple(seats), difficulty, games)
+    if key in _STATE_CACHE:
+        return _STATE_CACHE[key]
+    states = []
+    for seed in range(1, games + 1):
+        random.seed(seed)
+        game = Game(gui=HeadlessGUI(), difficulty=difficulty, seats=seats)
+        game.start()
+        steps = 0
+        while game.phase is not TurnPhase.GAME_OVER and steps < 5000:
+            steps += 1
+            if game.phase is TurnPhase.AWAITING_ACTION and game.current_player.is_ai:
+                states.append(game.snapshot())
+            if game.phase is TurnPhase.AWAITING_ACTION and not game.current_player.is_ai:
+                baseline_policy(game, game.current_player)
+            else:
+                game.step()
+    _STATE_CACHE[key] = states
+    return states
+
+
+def restore_game(snapshot, seats=DEFAULT_SEATS, difficulty="normal"):
+    game = Game(gui=HeadlessGUI(), difficulty=difficulty, seats=seats)
+    game.restore(snapshot)
+    return game
+
+
+def _mid_game(seats=DEFAULT_SEATS):
+    """牌堆认知中有已知位置的中盘局面"""
+    states = sample_states(seats)
+    return restore_game(states[len(states) // 2], seats)
+
+
+# 牌堆
+def _deck_cycle(decks, take, put_back):
+    deck = Deck(rng=random.Random(1), decks=decks)
+
+    def run():
+        put_back(deck, take(deck)[0])
+    return run, 1
+
+
+for _decks in (1, 20):
+    benchmark(f"deck.draw_top/{_decks}", f"{_decks}副牌：抽顶一张再放回顶部")(
+        lambda d=_decks: _deck_cycle(d, lambda deck: deck.draw(), lambda deck, c: deck.cards.append(c)))
+    benchmark(f"deck.draw_bottom/{_decks}", f"{_decks}副牌：抽底一张再放回底部")(
+        lambda d=_decks: _deck_cycle(d, lambda deck: deck.draw(from_bottom=True),
+                                     lambda deck, c: deck.insert_card(c, 0)))
+    benchmark(f"deck.draw_refuse/{_decks}", f"{_decks}副牌：跳过炸弹猫抽一张（发牌）再放回底部")(
+        lambda d=_decks: _deck_cycle(d, lambda deck: deck.draw(refuse=[BombCatCard]),
+                                     lambda deck, c: deck.insert_card(c, 0)))
+
+
+def _insert_cycle(decks):
+    deck = Deck(rng=random.Random(1), decks=decks)
+    rng = random.Random(2)
+    positions = [rng.randrange(len(deck.cards)) for _ in range(1024)]
+    card = deck.draw()[0]
+    cursor = [0]
+
+    def run():
+        pos = positions[cursor[0] & 1023]
+        cursor[0] += 1
+        deck.insert_card(card, pos)
+        deck.cards.pop(pos)
+    return run, 1
+
+
+for _decks in (1, 20):
+    benchmark(f"deck.insert_card/{_decks}", f"{_decks}副牌：插入任意位置再取出")(lambda d=_decks: _insert_cycle(d))
+
+
+# AI认知
+@benchmark("ai.knowledge_hooks", "中盘局面：放回一张已知牌、预见未来3张、抽顶一张对应的认知更新")
+def _bench_hooks():
+    game = _mid_game()
+    me = game.ai
+    rng = random.Random(3)
+    size = len(game.ai_known)
+    positions = [rng.randrange(size + 1) for _ in range(1024)]
+    card = DefuseCard()
+    top = [game.deck.cards[-1 - i] for i in range(3)]  # 从顶向下
+    cursor = [0]
+
+    def run():
+        pos = positions[cursor[0] & 1023]
+        cursor[0] += 1
+        ai_behavior.on_insert_known(game, pos, card, me)
+        ai_behavior.on_see_future(game, top, me)
+        ai_behavior.on_draw(game)
+    return run, 1
+
+
+@benchmark("ai.card_probability_at", "中盘局面：逐个位置求炸弹猫 / 拆除的概率")
+def _bench_probability():
+    game = _mid_game()
+    size = len(game.ai_known)
+    probability = ai_behavior.card_probability_at
+
+    def run():
+        for idx in range(size):
+            probability(game, idx, BombCatCard)
+            probability(game, idx, DefuseCard)
+    return run, 2 * size
+
+
+def _control_cycle(seats, difficulty):
+    games = [restore_game(snapshot, seats, difficulty) for snapshot in sample_states(seats, difficulty)]
+    control = ai_behavior.ai_control
+
+    def run():
+        for game in games:
+            control(game, game.ai_played_this_turn, game.ai_forbidden_next_type, game.current_player)
+    return run, len(games)
+
+
+benchmark("ai.ai_control/easy", "1v1对局中采样的AI决策点，简单难度")(lambda: _control_cycle(DEFAULT_SEATS, "easy"))
+benchmark("ai.ai_control/normal", "1v1对局中采样的AI决策点，普通难度")(lambda: _control_cycle(DEFAULT_SEATS, "normal"))
+benchmark("ai.ai_control/4p", "4人AI对局中采样的AI决策点，普通难度")(
+    lambda: _control_cycle(table_seats(4, humans=0), "normal"))
+
+
+# 整局
+def _games_cycle(difficulty, seats=DEFAULT_SEATS, count=20):
+    profile = ai_behavior.get_difficulty(difficulty)
+
+    def run():
+        for seed in range(1, count + 1):
+            run_game(difficulty=profile, seed=seed, seats=seats)
+    return run, count
+
+
+benchmark("game.headless/easy", "无界面整局（固定20个种子），简单难度")(lambda: _games_cycle("easy"))
+benchmark("game.headless/normal", "无界面整局（固定20个种子），普通难度")(lambda: _games_cycle("normal"))
+
+
+# 图形界面
+class _LogCapture(HeadlessGUI):
+    """按GUI收到的顺序记下一局的事件与文字消息"""
+
+    def __init__(self):
+        super().__init__()
+        self.items = []
+
+    def set_game(self, game):
+        super().set_game(game)
+        game.events.subscribe(self.items.append)
+
+    def print(self, message, debug=False, scroll='end', delay=0.2):
+        if message and not debug:
+            self.items.append(message)
+
+
+@benchmark("gui.render_logs", "隐藏的Tk窗口中逐条载入一整局的日志并增量渲染")
+def _bench_gui_logs():
+    import tkinter as tk
+    from events import GameEvent
+    from main import GUI
+
+    capture = _LogCapture()
+    random.seed(1)
+    game = Game(gui=capture, difficulty="normal")
+    game.start()
+    while game.phase is not TurnPhase.GAME_OVER:
+        if game.phase is TurnPhase.AWAITING_ACTION and not game.current_player.is_ai:
+            baseline_policy(game, game.current_player)
+        else:
+            game.step()
+    try:
+        root = tk.Tk()
+    except tk.TclError as exc:
+        raise BenchmarkSkipped(f"没有图形显示（{exc}）") from None
+    root.withdraw()
+    gui = GUI(root)
+    items = capture.items
+
+    def run():
+        gui._reset_log()
+        for item in items:
+            if isinstance(item, GameEvent):
+                gui._ingest_event(item)
+            else:
+                gui._ingest_log_message(item)
+            gui._render_structured_logs()
+        root.update_idletasks()
+    return run, 1
+
+
+def measure(run, inner, min_time=MIN_TIME, repeats=REPEATS):
+    """校准循环次数使每次重复至少min_time秒，返回最快一次重复中的单次操作耗时"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 4:
+            break
+        loops *= 4 if elapsed < min_time / 40 else 2
+    loops = max(1, round(loops * min_time / max(elapsed, 1e-9)))
+    best = float("inf")
+    gc_enabled = gc.isenabled()
+    gc.disable()  # 与timeit相同：计时期间不做循环垃圾回收
+    try:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for _ in range(loops):
+                run()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return best / (loops * inner)
+
+
+def run_benchmarks(patterns=(), min_time=MIN_TIME, repeats=REPEATS, progress=None):
+    results = []
+    for name, (_doc, setup) in _BENCHMARKS.items():
+        if patterns and not any(p in name for p in patterns):
+            continue
+        try:
+            run, inner = setup()
+        except BenchmarkSkipped as exc:
+            results.append(BenchResult(name, skipped=str(exc)))
+        else:
+            results.append(BenchResult(name, seconds=measure(run, inner, min_time, repeats)))
+        if progress is not None:
+            progress(results[-1])
+    return results
+
+
+def load_baselines(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(path, results, machine=None):
+    """把结果写入本机基线（只覆盖本次运行过的项目）"""
+    data = load_baselines(path)
+    entry = data.setdefault(machine or machine_key(), {"results": {}})
+    entry["results"].update({r.name: r.seconds for r in results if not r.skipped})
+    entry["saved"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """-> [(结果, 基线耗时或None, 相对变化或None, 标记)]，标记为"退化"、"提升"或空串"""
+    rows = []
+    for result in results:
+        base = baseline.get(result.name)
+        if result.skipped or not base:
+            rows.append((result, base, None, ""))
+            continue
+        change = result.seconds / base - 1.0
+        flag = "退化" if change > threshold else "提升" if change < -threshold / (1.0 + threshold) else ""
+        rows.append((result, base, change, flag))
+    return rows
+
+
+def _format_time(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.2f}µs"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BombCat 基准测试")
+    parser.add_argument("-k", dest="patterns", nargs="*", default=[], help="只运行名称包含这些子串的项目")
+    parser.add_argument("--save", action="store_true", help="把本次结果存为本机基线")
+    parser.add_argument("--baseline", metavar="PATH", default=DEFAULT_BASELINE_PATH, help="基线文件")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="判为退化的相对变慢比例")
+    parser.add_argument("--quick", action="store_true", help="缩短每项的计时（结果波动更大）")
+    parser.add_argument("--list", action="store_true", help="列出全部项目")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (doc, _setup) in _BENCHMARKS.items():
+            print(f"{name:<26}{doc}")
+        return 0
+
+    baseline = load_baselines(args.baseline).get(machine_key(), {}).get("results", {})
+    print(f"机器: {machine_key()} | 基线: {'有' if baseline else '无'}（{args.baseline}）")
+
+    def progress(result):
+        if result.skipped:
+            print(f"{result.name:<26}{'跳过':>12}  {result.skipped}")
+            return
+        (_, base, change, flag), = compare([result], baseline, args.threshold)
+        line = f"{result.name:<26}{_format_time(result.seconds):>12}"
+        if change is not None:
+            line += f"{_format_time(base):>12}{change:>+9.1%}  {flag}"
+        print(line)
+
+    min_time, repeats = (0.05, 3) if args.quick else (MIN_TIME, REPEATS)
+    print(f"{'项目':<24}{'单次耗时':>8}{'基线':>10}{'变化':>8}")
+    results = run_benchmarks(args.patterns, min_time, repeats, progress)
+
+    if args.save:
+        save_baselines(args.baseline, results)
+        print(f"已保存本机基线: {args.baseline}")
+        return 0
+    regressions = [row for row in compare(results, baseline, args.threshold) if row[3] == "退化"]
+    if regressions:
+        print(f"退化 {len(regressions)} 项（阈值 {args.threshold:.0%}）: " + ", ".join(r.name for r, *_ in regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
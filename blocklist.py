@@ -0,0 +1,252 @@
+"""
+分块列表
+BlockList把元素分段存放在若干个小列表（块）中，块长约为√n：按下标定位只需跨过块的长度，
+在任意位置插入或删除只移动一个块内的元素，因此多副牌合并后上千张的牌堆上，抽底、放回炸弹等操作仍是亚线性的；
+两端的操作与普通列表一样是O(1)。
+接口是list的常用子集（下标与切片的读取、赋值、删除，append/extend/insert/pop/remove/clear、迭代）。
+子类可重写_added/_removed，在元素进出时维护附加的统计（如按类型计数）。
+"""
+from itertools import chain
+from math import isqrt
+
+
+MIN_BLOCK_SIZE = 64  # 块长下限：小列表只有一个块，开销与普通列表接近
+
+
+class BlockList:
+    """分块存储的序列"""
+
+    __slots__ = ("_blocks", "_len", "_block_size")
+
+    def __init__(self, items=()):
+        self._len = 0
+        self._blocks = [[]]
+        self._block_size = MIN_BLOCK_SIZE
+        self._reset(list(items))
+
+    # 元素进出的钩子
+    def _added(self, items):
+        pass
+
+    def _removed(self, items):
+        pass
+
+    def _reset(self, items):
+        """整体替换为items（items为新建的列表，归本对象所有）"""
+        if self._len:
+            self._removed(list(self))
+        self._len = len(items)
+        self._block_size = size = max(MIN_BLOCK_SIZE, isqrt(self._len))
+        self._blocks = [items[i:i + size] for i in range(0, len(items), size)] or [[]]
+        self._added(items)
+
+    def _locate(self, index):
+        """已规范化的下标 -> (块序号, 块内下标)；靠近末尾时从后往前找"""
+        blocks = self._blocks
+        if index >= self._len - len(blocks[-1]):
+            return len(blocks) - 1, index - (self._len - len(blocks[-1]))
+        if index < len(blocks[0]):
+            return 0, index
+        if index * 2 < self._len:
+            for b, block in enumerate(blocks):
+                if index < len(block):
+                    return b, index
+                index -= len(block)
+        offset = self._len
+        for b in range(len(blocks) - 1, -1, -1):
+            offset -= len(blocks[b])
+            if index >= offset:
+                return b, index - offset
+        raise IndexError("BlockList index out of range")
+
+    def _normalize(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("BlockList index out of range")
+        return index
+
+    def _split(self, b):
+        """块过长时一分为二"""
+        block = self._blocks[b]
+        if len(block) > 2 * self._block_size:
+            half = len(block) // 2
+            self._blocks[b + 1:b + 1] = [block[half:]]
+            del block[half:]
+            if len(self._blocks) > 2 * self._block_size:
+                self._reset_blocks()  # 长度增长后按新的√n重新分块
+
+    def _drop_if_empty(self, b):
+        if not self._blocks[b] and len(self._blocks) > 1:
+            del self._blocks[b]
+
+    def _slice_range(self, index):
+        start, stop, step = index.indices(self._len)
+        return start, max(start, stop), step
+
+    def _take(self, start, stop):
+        """[start, stop)范围内的元素"""
+        if start >= stop:
+            return []
+        b, i = self._locate(start)
+        result = []
+        need = stop - start
+        blocks = self._blocks
+        while need > 0:
+            part = blocks[b][i:i + need]
+            result.extend(part)
+            need -= len(part)
+            b, i = b + 1, 0
+        return result
+
+    def _delete_range(self, start, stop):
+        if start >= stop:
+            return []
+        b, i = self._locate(start)
+        removed = []
+        need = stop - start
+        blocks = self._blocks
+        while need > 0:
+            block = blocks[b]
+            part = block[i:i + need]
+            del block[i:i + need]
+            removed.extend(part)
+            need -= len(part)
+            if not block and len(blocks) > 1:
+                del blocks[b]
+            else:
+                b, i = b + 1, 0
+        self._len -= len(removed)
+        return removed
+
+    def _insert_items(self, index, items):
+        if not items:
+            return
+        if index >= self._len:
+            block = self._blocks[-1]
+            block.extend(items)
+            self._len += len(items)
+            b = len(self._blocks) - 1
+        else:
+            b, i = self._locate(index)
+            self._blocks[b][i:i] = items
+            self._len += len(items)
+        if len(items) > self._block_size:
+            self._reset_blocks()
+        else:
+            self._split(b)
+
+    def _reset_blocks(self):
+        """按当前长度重新分块（不改变内容）"""
+        items = list(self)
+        self._block_size = size = max(MIN_BLOCK_SIZE, isqrt(self._len))
+        self._blocks = [items[i:i + size] for i in range(0, len(items), size)] or [[]]
+
+    # 读取
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._blocks)
+
+    def __reversed__(self):
+        return chain.from_iterable(reversed(block) for block in reversed(self._blocks))
+
+    def __contains__(self, value):
+        return any(value in block for block in self._blocks)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = self._slice_range(index)
+            if step == 1:
+                return self._take(start, stop)
+            return list(self)[index]
+        b, i = self._locate(self._normalize(index))
+        return self._blocks[b][i]
+
+    def index(self, value):
+        for i, item in enumerate(self):
+            if item is value or item == value:
+                return i
+        raise ValueError(f"{value!r} is not in BlockList")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)!r})"
+
+    # 修改
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            start, stop, step = self._slice_range(index)
+            value = list(value)
+            if step != 1:
+                items = list(self)
+                items[index] = value
+                self._reset(items)
+                return
+            self._removed(self._delete_range(start, stop))
+            self._insert_items(start, value)
+            self._added(value)
+            return
+        b, i = self._locate(self._normalize(index))
+        block = self._blocks[b]
+        old = block[i]
+        block[i] = value
+        self._removed((old,))
+        self._added((value,))
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = self._slice_range(index)
+            if step != 1:
+                items = list(self)
+                del items[index]
+                self._reset(items)
+                return
+            self._removed(self._delete_range(start, stop))
+            return
+        self.pop(index)
+
+    def append(self, value):
+        block = self._blocks[-1]
+        block.append(value)
+        self._len += 1
+        if len(block) > 2 * self._block_size:
+            self._split(len(self._blocks) - 1)
+        self._added((value,))
+
+    def extend(self, values):
+        values = list(values)
+        self._insert_items(self._len, values)
+        self._added(values)
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def insert(self, index, value):
+        if index < 0:
+            index = max(0, index + self._len)
+        if index >= self._len:
+            self.append(value)
+            return
+        b, i = self._locate(index)
+        self._blocks[b].insert(i, value)
+        self._len += 1
+        self._split(b)
+        self._added((value,))
+
+    def pop(self, index=-1):
+        if not self._len:
+            raise IndexError("pop from empty BlockList")
+        b, i = self._locate(self._normalize(index))
+        value = self._blocks[b].pop(i)
+        self._len -= 1
+        self._drop_if_empty(b)
+        self._removed((value,))
+        return value
+
+    def remove(self, value):
+        del self[self.index(value)]
+
+    def clear(self):
+        self._reset([])
@@ -1,28 +1,72 @@
 """
 炸弹猫游戏卡牌库
 
+每种卡牌用@register_card登记一次：固定编号、简称、标准牌堆中的张数、初始分值与类别。
+牌堆初始化、手牌的类别查询、Debug简称、快照编码等都通过登记表预先算好的查找表使用这些信息。
+
 新增卡牌步骤：
-   a. 创建继承自Card的子类
-   b. 在Deck._initialize_cards中添加卡牌数量
-   c. 在新的"...Card"类中重写use方法处理卡牌效果
+   a. 创建继承自Card的子类，重写use方法处理卡牌效果
+   b. 用@register_card登记（编号取下一个未使用的整数）
+   c. 如需AI针对性估值，在ai_player中用@simulates登记模拟函数（未登记时按普通出牌估值）
 """
-import tkinter as tk
-
-
-CARD_INITIAL_SCORES = {
-    "BombCat": -100,
-    "Defuse": 100,
-    "Nope": 32,
-    "Attack": 35,
-    "PersonalAttack": 20,
-    "Skip": 30,
-    "SuperSkip": 50,
-    "Shuffle": 22,
-    "Swap": 18,
-    "DrawBottom": 26,
-    "SeeFuture": {3: 24, 5: 30},
-    "AlterFuture": {3: 28, 5: 36},
-}
+from dataclasses import dataclass
+
+from decisions import CHOOSE_ORDER
+from events import CardEffect
+
+
+# 手牌类别位
+PLAYABLE = 1  # 可主动打出
+DEFENSIVE = 2  # 可应对高风险的抽牌
+ESCAPE = 4  # 可躲过本次抽牌
+CARD_CATEGORIES = {"playable": PLAYABLE, "defensive": DEFENSIVE, "escape": ESCAPE}
+
+CARD_INITIAL_SCORES = {}  # 分值表的键 -> 初始分值（有深度的卡为{深度: 分值}），由登记时填入
+CARD_SPECS = {}  # 卡牌类型 -> CardSpec
+
+
+@dataclass(frozen=True)
+class CardSpec:
+    """一种卡牌类型的登记信息"""
+    cls: type
+    type_id: int  # 固定编号：快照、存档、特征编码与数组化模拟按此编号使用类型
+    key: str  # 分值表的键
+    short_name: str  # Debug牌堆预览的简称
+    amount: int  # 标准牌堆中的张数
+    score: object  # 初始分值；有深度的卡为{深度: 分值}
+    categories: int = 0  # 类别位
+    no_repeat: bool = False  # AI在同一回合内不连续打出同类牌
+    depth_weights: tuple = ()  # 有深度的卡：((深度, 权重), ...)，第一项为默认深度
+    deck_order: int = None  # 建牌堆时的创建顺序，决定同一种子下的牌序；默认同type_id
+
+    def initial_score(self, depth=None):
+        return get_card_initial_score(self.key, depth)
+
+    def short_label(self, depth=None):
+        """简称；非默认深度的卡附上深度"""
+        if self.depth_weights and depth is not None and depth != self.depth_weights[0][0]:
+            return f"{self.short_name}{depth}"
+        return self.short_name
+
+    def create(self, rng):
+        """新建一张该类型的卡，有深度的卡按权重随机深度"""
+        if self.depth_weights:
+            depths, weights = zip(*self.depth_weights)
+            return self.cls(depth=rng.choices(depths, weights=weights)[0])
+        return self.cls()
+
+
+def register_card(type_id, key, short_name, amount, score, categories=0, **options):
+    """卡牌类型登记装饰器"""
+    def decorator(cls):
+        if any(spec.type_id == type_id for spec in CARD_SPECS.values()):
+            raise ValueError(f"卡牌编号重复: {type_id}")
+        spec = CardSpec(cls, type_id, key, short_name, amount, score, categories, **options)
+        CARD_SPECS[cls] = spec
+        CARD_INITIAL_SCORES[key] = score
+        cls.spec = spec
+        return cls
+    return decorator
 
 
 def get_card_initial_score(card_key, depth=None):
@@ -36,139 +80,164 @@ def get_card_initial_score(card_key, depth=None):
 class Card:
     """卡牌基类"""
 
-    def __init__(self, name, description, initial_score=0):
+    spec = None  # 由register_card设置
+
+    def __init__(self, name, description, initial_score=None):
         self.name = name
         self.description = description
+        depth = getattr(self, "depth", None)
+        if initial_score is None:
+            initial_score = self.spec.initial_score(depth) if self.spec is not None else 0
         self.initial_score = initial_score
+        self.short_name = self.spec.short_label(depth) if self.spec is not None else "?"
 
     def use(self, game, player, target):
         """使用卡牌效果，需在子类实现"""
         raise NotImplementedError("必须实现use方法")
 
 
+@register_card(0, "BombCat", "炸", amount=4, score=-100)
 class BombCatCard(Card):
     """炸弹猫卡"""
 
     def __init__(self):
-        super().__init__("💣炸弹猫", "抽到时必须立即拆除，否则死亡", initial_score=get_card_initial_score("BombCat"))
+        super().__init__("💣炸弹猫", "抽到时必须立即拆除，否则死亡")
 
     def use(self, game, player, target):
         # 实际处理逻辑在抽牌阶段实现
         pass
 
+@register_card(1, "Defuse", "拆", amount=4, score=100)
 class DefuseCard(Card):
     """拆除卡"""
 
     def __init__(self):
-        super().__init__("🛠拆除", "拆除炸弹猫并放回牌堆某处", initial_score=get_card_initial_score("Defuse"))
+        super().__init__("🛠拆除", "拆除炸弹猫并放回牌堆某处")
 
     def use(self, game, player, target):
         # 实际处理逻辑在抽牌阶段实现
         pass
 
+@register_card(2, "Nope", "阻", amount=3, score=32, categories=PLAYABLE)
 class NopeCard(Card):
     """拒绝卡"""
 
     def __init__(self):
-        super().__init__("🚫拒绝", "对手出的下一张牌失效", initial_score=get_card_initial_score("Nope"))
+        super().__init__("🚫拒绝", "对手出的下一张牌失效")
 
     def use(self, game, player, target):
         if player.is_ai:
-            game.gui.print(f"🚫 AI 打出拒绝，玩家 下次出牌将失效", debug=True)
+            game.debug("🚫 AI 打出拒绝，玩家 下次出牌将失效")
         else:
             game.gui.print(f"🚫 玩家 打出拒绝，AI 下次出牌将失效")
         game.noped = target
+        game.emit(CardEffect(game.seat_of(player), "nope"))
 
+@register_card(3, "Attack", "攻", amount=4, score=35, categories=PLAYABLE | DEFENSIVE | ESCAPE)
 class AttackCard(Card):
     """攻击卡"""
 
     def __init__(self):
-        super().__init__("👊攻击", "让对手执行你的所有回合", initial_score=get_card_initial_score("Attack"))
+        super().__init__("👊攻击", "让对手执行你的所有回合")
 
     def use(self, game, player, target):
         game.gui.print(f"🔥 {player.name} 发动攻击！{target.name} 将要连续行动 {game.remaining_turns + 1} 回合")
+        game.emit(CardEffect(game.seat_of(player), "attack", game.remaining_turns + 1))
         # 实际是在当前回合上加1个回合，因为原有回合会在play_card中进入if self.end_turn or self.end_all_turn，在self._end_turn()中减掉
         game.remaining_turns += 2
         game.current_player = target
         game.end_turn = True  # 注意：不能用all_end！攻击是转移回合给对手，而不是清空回合再轮到对手
 
+@register_card(4, "PersonalAttack", "自", amount=3, score=20, categories=PLAYABLE)
 class PersonalAttackCard(Card):
     """自我攻击卡"""
 
     def __init__(self):
-        super().__init__("👋自我攻击", "让自己增加2个回合", initial_score=get_card_initial_score("PersonalAttack"))
+        super().__init__("👋自我攻击", "让自己增加2个回合")
 
     def use(self, game, player, target):
         game.gui.print(f"🔥 {player.name} 发动自我攻击，将连续行动 {game.remaining_turns + 2} 回合")
+        game.emit(CardEffect(game.seat_of(player), "personal_attack", game.remaining_turns + 2))
         # 实际上就是在当前回合上加2个回合，因为没有end_turn进不去self._end_turn()
         game.remaining_turns += 2
 
+@register_card(5, "Skip", "跳", amount=3, score=30, categories=PLAYABLE | DEFENSIVE | ESCAPE)
 class SkipCard(Card):
     """跳过卡"""
 
     def __init__(self):
-        super().__init__("⏭️跳过", "跳过当前回合的抽牌阶段", initial_score=get_card_initial_score("Skip"))
+        super().__init__("⏭️跳过", "跳过当前回合的抽牌阶段")
 
     def use(self, game, player, target):
         game.gui.print(f"⏭️ {player.name} 跳过了回合")
+        game.emit(CardEffect(game.seat_of(player), "skip", 1))
         game.end_turn = True
 
+@register_card(6, "SuperSkip", "超", amount=2, score=50, categories=PLAYABLE | ESCAPE)
 class SuperSkipCard(Card):
     """超级跳过卡"""
 
     def __init__(self):
-        super().__init__("🚀超级跳过", "跳过剩余所有回合的抽牌阶段", initial_score=get_card_initial_score("SuperSkip"))
+        super().__init__("🚀超级跳过", "跳过剩余所有回合的抽牌阶段")
 
     def use(self, game, player, target):
         game.gui.print(f"🚀 {player.name} 跳过了剩余所有回合")
+        game.emit(CardEffect(game.seat_of(player), "super_skip", game.remaining_turns))
         game.end_turn = True
         game.end_all_turn = True
 
+@register_card(7, "Shuffle", "洗", amount=2, score=22, categories=PLAYABLE | DEFENSIVE, no_repeat=True)
 class ShuffleCard(Card):
     """洗牌卡"""
 
     def __init__(self):
-        super().__init__("🔀洗牌", "重新洗牌整个牌堆", initial_score=get_card_initial_score("Shuffle"))
+        super().__init__("🔀洗牌", "重新洗牌整个牌堆")
 
     def use(self, game, player, target):
         game.gui.print("🔀 牌堆被重新洗牌！")
         game.deck.shuffle()
         game.ai_on_shuffle()
+        game.emit(CardEffect(game.seat_of(player), "shuffle"))
 
+@register_card(8, "Swap", "换", amount=2, score=18, categories=PLAYABLE | DEFENSIVE, no_repeat=True,
+               deck_order=11)
 class SwapCard(Card):
     """顶底互换卡"""
 
     def __init__(self):
-        super().__init__("🔄顶底互换", "交换牌堆顶部和底部的牌", initial_score=get_card_initial_score("Swap"))
+        super().__init__("🔄顶底互换", "交换牌堆顶部和底部的牌")
 
     def use(self, game, player, target):
         if len(game.deck.cards) > 1:
             game.gui.print(f"🔄 {player.name} 交换了牌堆顶部和底部的牌")
             game.deck.cards[0], game.deck.cards[-1] = game.deck.cards[-1], game.deck.cards[0]
             game.ai_on_swap_top_bottom()
+            game.emit(CardEffect(game.seat_of(player), "swap"))
         else:
             game.gui.print("😔 牌堆中牌不足，无法进行顶底互换")
 
+@register_card(9, "DrawBottom", "底", amount=2, score=26, categories=PLAYABLE | DEFENSIVE, deck_order=10)
 class DrawBottomCard(Card):
     """抽底卡"""
 
     def __init__(self):
-        super().__init__("👇抽底", "抽取牌堆底部的牌而不是顶部", initial_score=get_card_initial_score("DrawBottom"))
+        super().__init__("👇抽底", "抽取牌堆底部的牌而不是顶部")
 
     def use(self, game, player, target):
         game.gui.print(f"👇 {player.name} 从牌堆底部抽牌")
         game.draw_card(player, from_bottom=True)  # draw_card 会自动结束回合 和 记录ai_known
 
+@register_card(10, "SeeFuture", "预", amount=2, score={3: 24, 5: 30}, categories=PLAYABLE, no_repeat=True,
+               depth_weights=((3, 4), (5, 1)), deck_order=8)
 class SeeFutureCard(Card):
     """预见未来卡"""
 
     def __init__(self, depth=3):
+        self.depth = depth
         super().__init__(
             f"👁预见未来{'-' + str(depth) if depth == 5 else ''}",
             f"查看牌堆顶的{depth}张牌",
-            initial_score=get_card_initial_score("SeeFuture", depth=depth),
         )
-        self.depth = depth
 
     def use(self, game, player, target):
         top_count = min(len(game.deck.cards), self.depth)
@@ -178,15 +247,16 @@ class SeeFutureCard(Card):
 
         top_cards = list(reversed(game.deck.cards[-top_count:]))  # 获取顶部的牌
         game.gui.print(f"🔮 {player.name} 查看了牌堆顶的{top_count}张牌")
+        game.emit(CardEffect(game.seat_of(player), "see_future", top_count))
 
         # AI：记录这 top_count 张牌的实例
         if player.is_ai:
-            game.ai_on_see_future(top_cards)
+            game.ai_on_see_future(top_cards, player)
             game.gui.print(f"🤖 AI 记录了牌堆顶{top_count}张牌的信息")
-            if game.gui.debug_mode:
-                game.gui.print("🔽 AI 看到的牌堆顶（从上到下）:", debug=True)
+            if game.debug_enabled:
+                game.debug("🔽 AI 看到的牌堆顶（从上到下）:")
                 for i, card in enumerate(top_cards):
-                    game.gui.print(f"{i + 1}. {card.name}", debug=True)
+                    game.debug("{}. {}", i + 1, card.name)
         # 玩家
         else:
             cards_info = [f"{i + 1}. {card.name}" for i, card in enumerate(top_cards)]
@@ -194,25 +264,27 @@ class SeeFutureCard(Card):
             for info in cards_info:
                 game.gui.print(info)
 
+@register_card(11, "AlterFuture", "改", amount=3, score={3: 28, 5: 36},
+               categories=PLAYABLE | DEFENSIVE, no_repeat=True, depth_weights=((3, 4), (5, 1)), deck_order=9)
 class AlterFutureCard(Card):
     """改变未来卡"""
 
     def __init__(self, depth=3):
+        self.depth = depth
         super().__init__(
             f"🔄改变未来{'-' + str(depth) if depth == 5 else ''}",
             f"查看并排序牌堆顶的{depth}张牌",
-            initial_score=get_card_initial_score("AlterFuture", depth=depth),
         )
-        self.depth = depth
 
     # noinspection SpellCheckingInspection
     def use(self, game, player, target):
         top_count = min(len(game.deck.cards), self.depth)  # 实际上看几张牌
         top_cards = list(reversed(game.deck.cards[-top_count:]))  # 反转顺序
-        game.deck.cards = game.deck.cards[:-top_count]  # 移除这些牌
+        del game.deck.cards[-top_count:]  # 移除这些牌
         game.ai_on_remove_top(top_count)
 
         game.gui.print(f"🔄 {player.name} 正在重新排列牌堆顶的{top_count}张牌")
+        game.emit(CardEffect(game.seat_of(player), "alter_future", top_count))
 
         # AI逻辑：将爆炸猫（如果有）放在第2张位置给玩家
         if player.is_ai:
@@ -241,110 +313,62 @@ class AlterFutureCard(Card):
             top_cards = list(reversed(draw_order))
             game.gui.print("🤖 AI 重新排列了牌堆顶的牌")
 
-            if game.gui.debug_mode:
-                game.gui.print("🔽 AI 改变未来前（从上到下）:", debug=True)
+            if game.debug_enabled:
+                game.debug("🔽 AI 改变未来前（从上到下）:")
                 for i, card in enumerate(reversed(before_cards)):
-                    game.gui.print(f"{i + 1}. {card.name}", debug=True)
-                game.gui.print("🔽 AI 改变未来后（从上到下）:", debug=True)
+                    game.debug("{}. {}", i + 1, card.name)
+                game.debug("🔽 AI 改变未来后（从上到下）:")
                 for i, card in enumerate(draw_order):
-                    game.gui.print(f"{i + 1}. {card.name}", debug=True)
+                    game.debug("{}. {}", i + 1, card.name)
 
             # 将排序后的牌放回牌堆
             for card in top_cards:  # 倒序添加以保持原先的顺序
                 game.deck.cards.append(card)
-            game.ai_on_append_known(top_cards)
+            game.ai_on_append_known(top_cards, player)
 
-        # 玩家逻辑：用点击界面让玩家重新排序卡牌
+        # 玩家逻辑：发起排序决策请求，回答后再放回（回答None表示取消，保持原顺序）
         else:
-            # 创建卡牌选择对话框
-            dialog = tk.Toplevel(game.gui.root)
-            dialog.title("重新排序卡牌")
-            dialog.geometry(f"300x{300 if self.depth == 3 else 400}")  # 根据看3张还是5张决定菜单高度
-            dialog.transient(game.gui.root)
-            dialog.grab_set()
-
-            # 在主窗口上居中显示对话框
-            x = game.gui.root.winfo_x() + game.gui.root.winfo_width() // 2 - 200
-            y = game.gui.root.winfo_y() + game.gui.root.winfo_height() // 2 - 150
-            dialog.geometry(f"+{x}+{y}")
-
-            tk.Label(dialog, text="🔄 点击两张卡牌互换其位置（顺序为从上到下）：").pack(pady=10)
-
-            # 创建卡牌框架
-            cards_frame = tk.Frame(dialog)
-            cards_frame.grid_columnconfigure(0, weight=1)
-            cards_frame.pack(fill="both", expand=True, padx=20, pady=10)
-
-            # 卡牌按钮和顺序
-            card_btns = []
-            selected_index = [None]  # 使用列表存储选中的索引，便于在函数间共享
-
-            # 更新卡牌显示顺序
-            def update_card_display():
-                for i, _btn in enumerate(card_btns):
-                    _btn.config(text=f"{i + 1}. {top_cards[i].name}")
-                    _btn.grid(row=i, column=0, sticky="ew", pady=2)
-
-            # 点击卡牌处理
-            def on_card_click(index):
-                first_idx = selected_index[0] if selected_index[0] is not None else index
-                if selected_index[0] is None:
-                    # 选择第一张卡
-                    selected_index[0] = index
-                    card_btns[index].config(bg="lightblue")
-                else:
-                    # 交换两张卡
-                    top_cards[first_idx], top_cards[index] = top_cards[index], top_cards[first_idx]
-                    card_btns[first_idx].config(bg="SystemButtonFace")
-                    selected_index[0] = None
-                    update_card_display()
-
-            # 创建卡牌按钮
-            for i in range(top_count):
-                btn = tk.Button(cards_frame,
-                                text=f"{i + 1}. {top_cards[i].name}",
-                                width=30, height=2,
-                                anchor="center", justify="center",
-                                command=lambda idx=i: on_card_click(idx))
-                btn.grid(row=i, column=0, sticky="ew", pady=2)
-                card_btns.append(btn)
-
-            result_var = tk.BooleanVar(value=False)
-
-            def on_confirm():
-                result_var.set(True)
-                dialog.destroy()
-
-            def on_cancel():
-                # 恢复原始顺序
-                top_cards[:] = list(reversed(game.deck.cards[-top_count:]))
-                dialog.destroy()
-
-            # 按钮框架
-            btn_frame = tk.Frame(dialog)
-            btn_frame.pack(fill="x", pady=10)
-
-            tk.Button(btn_frame, text="确认", command=on_confirm).pack(side="left", padx=20, expand=True)
-            tk.Button(btn_frame, text="取消", command=on_cancel).pack(side="right", padx=20, expand=True)
-
-            # 等待对话框关闭
-            dialog.wait_window()
-
-            # 显示最终顺序
-            if result_var.get():
-                game.gui.print("🔽 现在牌堆顶的牌（从上到下）:")
-                for i, card in enumerate(top_cards):
-                    game.gui.print(f"{i + 1}. {card.name}")
+            game.request_decision(CHOOSE_ORDER, player, lambda ordered: self._put_back(game, top_cards, ordered),
+                                  cards=top_cards)
+
+    @staticmethod
+    def _put_back(game, top_cards, ordered):
+        """按玩家的回答把牌放回牌堆顶"""
+        if ordered is not None:
+            top_cards = ordered
+            game.gui.print("🔽 现在牌堆顶的牌（从上到下）:")
+            for i, card in enumerate(top_cards):
+                game.gui.print(f"{i + 1}. {card.name}")
+
+        # 将排序后的牌放回牌堆（top_cards为从上到下，倒序追加使第一张位于堆顶）
+        bottom_to_top = list(reversed(top_cards))
+        game.deck.cards.extend(bottom_to_top)
+
+        # 更新 AI 认知：玩家确认后会公开顺序日志，所有AI都应同步为已知。
+        if ordered is not None:
+            game.ai_on_append_known(bottom_to_top)
+        else:
+            game.ai_on_append_unknown(len(top_cards))
 
-            # 将排序后的牌放回牌堆
-            for card in reversed(top_cards):
-                game.deck.cards.append(card)
 
-            # 更新 AI 认知：玩家确认后会公开顺序日志，AI应同步为已知。
-            if result_var.get():
-                game.ai_on_append_known(top_cards)
-            else:
-                game.ai_on_append_unknown(top_count)
+# 由登记表预先算好的查找表
+CARD_TYPES = tuple(sorted(CARD_SPECS, key=lambda cls: CARD_SPECS[cls].type_id))  # 按固定编号排列
+assert [CARD_SPECS[cls].type_id for cls in CARD_TYPES] == list(range(len(CARD_TYPES))), "卡牌编号必须连续"
+DECK_ORDER = tuple(sorted(CARD_TYPES, key=lambda cls: (
+    CARD_SPECS[cls].type_id if CARD_SPECS[cls].deck_order is None else CARD_SPECS[cls].deck_order)))
+CATEGORY_MASKS = {cls: spec.categories for cls, spec in CARD_SPECS.items()}
+_TYPE_CODES = {cls: spec.type_id for cls, spec in CARD_SPECS.items()}
+
+
+def card_code(card):
+    """卡牌的紧凑整数编码：类型编号*10+深度（无深度的卡为0），用于快照与存档"""
+    return _TYPE_CODES[type(card)] * 10 + getattr(card, "depth", 0)
+
+
+def card_from_code(code):
+    """card_code的逆过程，创建一张新卡"""
+    cls, depth = CARD_TYPES[code // 10], code % 10
+    return cls(depth=depth) if depth else cls()
 
 if __name__ == "__main__":
     import main
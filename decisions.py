@@ -0,0 +1,60 @@
+"""
+决策请求协议
+引擎需要行动方做选择（改变未来的排列、拆弹后炸弹的放回位置）时，不在调用栈中等待弹窗，
+而是发布一个DecisionRequest并进入AWAITING_DECISION阶段，随后由驱动方的step()恢复。
+GUI、无界面运行器、网络客户端和测试脚本都通过同一个Future回答请求；异步代码可用asyncio.wrap_future等待。
+"""
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+
+CHOOSE_ORDER = "choose_order"  # 重新排列牌堆顶的牌，回答为从上到下的新顺序
+CHOOSE_BOMB_POSITION = "choose_bomb_position"  # 选择炸弹猫放回位置，回答为0~max_pos的整数（0为堆底）
+
+
+@dataclass(eq=False)
+class DecisionRequest:
+    """一次待回答的决策；回答None表示放弃选择（保持原顺序 / 随机位置）"""
+    kind: str
+    player: object
+    cards: list = field(default_factory=list)  # CHOOSE_ORDER：从上到下的待排序牌
+    max_pos: int = 0  # CHOOSE_BOMB_POSITION：可选的最大位置
+    future: Future = field(default_factory=Future)
+    dispatched: bool = False  # 是否已交给前端
+
+    @property
+    def answered(self):
+        return self.future.done()
+
+    def answer(self, value):
+        """回答请求，重复回答时忽略；可在任意线程调用"""
+        if not self.future.done():
+            self.future.set_result(value)
+
+    def result(self):
+        """取得已校验的回答，非法回答视为放弃选择"""
+        value = self.future.result()
+        if value is None:
+            return None
+        if self.kind == CHOOSE_ORDER:
+            value = list(value)
+            if sorted(map(id, value)) != sorted(map(id, self.cards)):
+                return None
+            return value
+        if self.kind == CHOOSE_BOMB_POSITION:
+            if isinstance(value, int) and 0 <= value <= self.max_pos:
+                return value
+            return None
+        return value
+
+    def encode(self, value):
+        """把回答转为可序列化的形式：CHOOSE_ORDER记为待排序牌的下标顺序"""
+        if value is None or self.kind != CHOOSE_ORDER:
+            return value
+        return tuple(next(i for i, card in enumerate(self.cards) if card is chosen) for chosen in value)
+
+    def decode(self, value):
+        """encode()的逆过程，用于重放时回答同一请求"""
+        if value is None or self.kind != CHOOSE_ORDER:
+            return value
+        return [self.cards[i] for i in value]
@@ -0,0 +1,114 @@
+"""
+结构化游戏事件
+Game与卡牌效果在状态变化时发出类型化事件，GUI日志、统计等消费方通过EventBus订阅，
+不再从显示文字中反推对局结构。座位用"player" / "ai"表示。
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class GameEvent:
+    """所有游戏事件的基类"""
+
+
+@dataclass(frozen=True)
+class GameStarted(GameEvent):
+    first: str  # 先手座位
+
+
+@dataclass(frozen=True)
+class TurnStarted(GameEvent):
+    seat: str
+    progress: int  # 连续回合中的第几回合
+    total: int  # 连续回合总数
+
+    @property
+    def counter(self):
+        return f"{self.progress}/{self.total}"
+
+
+@dataclass(frozen=True)
+class ActionTaken(GameEvent):
+    """行动方的一次出牌或抽牌（不含效果触发的抽牌），hand_index为出牌前该牌在手牌中的下标，用于重放对局"""
+    seat: str
+    action: str  # "play" / "draw"
+    hand_index: int = -1
+
+
+@dataclass(frozen=True)
+class DecisionAnswered(GameEvent):
+    """决策请求得到的（已校验的）回答，value为DecisionRequest.encode()的结果，None表示放弃选择"""
+    seat: str
+    kind: str
+    value: object = None
+
+
+@dataclass(frozen=True)
+class CardPlayed(GameEvent):
+    seat: str
+    card_type: str  # 卡牌类名，如"AttackCard"
+    card_name: str
+    noped: bool = False  # 被拒绝卡阻止，效果未生效
+
+
+@dataclass(frozen=True)
+class CardEffect(GameEvent):
+    """卡牌效果生效（攻击、跳过、洗牌、预见未来等），amount为效果涉及的回合数或牌数"""
+    seat: str
+    effect: str
+    amount: int = 0
+
+
+@dataclass(frozen=True)
+class CardDrawn(GameEvent):
+    seat: str
+    card_type: str
+    card_name: str
+    from_bottom: bool = False
+    during_effect: bool = False  # 由卡牌效果（抽底）触发，而不是单独的抽牌行动
+
+
+@dataclass(frozen=True)
+class BombDefused(GameEvent):
+    seat: str
+    position: int  # 放回位置（0为堆底）
+
+
+@dataclass(frozen=True)
+class PlayerExploded(GameEvent):
+    seat: str
+
+
+@dataclass(frozen=True)
+class GameOver(GameEvent):
+    winner: str  # "player" / "ai" / "draw"
+
+
+@dataclass(frozen=True)
+class DebugReasoning(GameEvent):
+    """AI决策过程的调试说明，仅在有人关心时展示"""
+    seat: str
+    lines: tuple
+
+
+class EventBus:
+    """同步分发事件；订阅者为接收单个事件的可调用对象"""
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def emit(self, event):
+        for callback in self._subscribers:
+            callback(event)
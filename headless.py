@@ -0,0 +1,214 @@
+"""
+无界面对局运行器
+用与GUI接口兼容的HeadlessGUI驱动Game，玩家座位由基线策略代打，用于批量模拟与AI难度评估。
+对局是一个平铺的循环：每次迭代推进回合状态机一步，调用栈深度不随对局长度增长，并记录每步耗时。
+
+用法：
+    python headless.py --games 200 --difficulty hard --seed 1
+    python headless.py --games 100 --seats 6 --all-ai    # 6个AI座位的多人对局
+    python headless.py --games 200 --profile prof.json   # 输出热点计时汇总并写出JSON
+    python headless.py --games 5000 --metrics-dir metrics --metrics-port 9464   # 运行指标（见metrics.py）
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+import ai_player as ai_behavior
+import metrics as run_metrics
+import profiler
+from cards import NopeCard
+from events import DebugReasoning, GameOver, TurnStarted
+from main import DEFAULT_SEATS, Game, TurnPhase, seat_display_name, table_seats
+from recorder import GameRecorder
+
+
+BASELINE_PLAY_RATE = 0.35  # 基线策略在未满手牌时主动出牌的概率
+
+
+class _NullWidget:
+    """无界面时代替按钮控件，吞掉config调用"""
+
+    def config(self, **kwargs):
+        pass
+
+
+class HeadlessGUI:
+    """与GUI接口兼容的无界面前端"""
+
+    def __init__(self, verbose=False, debug_mode=False):
+        self.verbose = verbose
+        self.debug_mode = debug_mode
+        self.game = None
+        self.draw_button = _NullWidget()
+        self.play_button = _NullWidget()
+
+    def set_game(self, game):
+        self.game = game
+        if self.verbose:
+            game.events.subscribe(self._print_event)
+
+    def _print_event(self, event):
+        if isinstance(event, TurnStarted):
+            icon = "🤖" if self.game.by_seat[event.seat].is_ai else "👤"
+            print(f"\n────────── {icon} {seat_display_name(event.seat)}回合 {event.counter} ──────────")
+        elif isinstance(event, GameOver):
+            print("\n────────── 🎮 游戏结束 ──────────")
+        elif isinstance(event, DebugReasoning) and self.debug_mode:
+            for line in event.lines:
+                print(f"[Debug] {line}")
+
+    def print(self, message, debug=False, scroll='end', delay=0.2):
+        if debug and not self.debug_mode:
+            return
+        if self.verbose and message:
+            print(f"[Debug] {message}" if debug else message)
+
+    def update_gui(self, parts=None):
+        pass
+
+    def request_decision(self, request):
+        request.answer(None)  # 放弃选择：炸弹随机放回，改变未来保持原顺序
+
+    def game_end(self):
+        pass
+
+
+@dataclass
+class GameResult:
+    winner: str  # 获胜座位（"ai" / "player" / "ai2"...）、"draw"，或达到max_steps仍未结束时为"stalled"
+    turns: int
+    steps: int
+    elapsed: float
+    max_step_ms: float = 0.0  # 单步最大耗时
+
+
+def baseline_policy(game, player):
+    """基线策略：手牌满时必须出牌，否则按固定概率随机出一张可用牌，其余情况抽牌。"""
+    playable = player.get_specific_cards("playable")
+    if game.noped == game.get_other(player):
+        playable = [c for c in playable if not isinstance(c, NopeCard)]
+    must_play = len(player.hand) >= player.hand_limit
+    if playable and (must_play or random.random() < BASELINE_PLAY_RATE):
+        if game.play_card(player, random.choice(playable)):
+            return
+    game.draw_card(player)
+
+
+def run_game(difficulty=None, seed=None, player_policy=baseline_policy, max_steps=5000, verbose=False, setup=None,
+             ai_policy=None, recorder=None, decks=1, seats=DEFAULT_SEATS, metrics=None):
+    """
+    运行一局无界面对局，返回GameResult
+    setup(game)可在开局前对Game做额外配置；ai_policy不为None时AI座位也由该策略逐步代打；
+    recorder为GameRecorder时把这局写入对局档案；decks为合并的牌副数；seats为按行动顺序排列的座位；
+    metrics为GameMetrics时这局计入运行指标。
+    """
+    if seed is not None:
+        random.seed(seed)
+    started = time.perf_counter()
+    gui = HeadlessGUI(verbose=verbose)
+    game = Game(gui=gui, difficulty=difficulty, decks=decks, seats=seats)
+    if setup is not None:
+        setup(game)
+    if recorder is not None:
+        recorder.attach(game)
+    if metrics is not None:
+        metrics.attach(game)
+    game.start()
+
+    steps = 0
+    max_step = 0.0
+    while game.phase is not TurnPhase.GAME_OVER and steps < max_steps:
+        steps += 1
+        step_started = time.perf_counter()
+        if game.phase is not TurnPhase.AWAITING_ACTION:
+            game.step()
+        elif not game.current_player.is_ai:
+            player_policy(game, game.current_player)
+        elif ai_policy is not None:
+            ai_policy(game, game.current_player)
+        else:
+            game.step()
+        max_step = max(max_step, time.perf_counter() - step_started)
+
+    if game.phase is not TurnPhase.GAME_OVER:
+        winner = "stalled"
+    else:
+        winner = game.winner.seat if game.winner is not None else "draw"
+    profiler.PROFILER.note_game()
+    return GameResult(winner=winner, turns=game.turns_played, steps=steps, elapsed=time.perf_counter() - started,
+                      max_step_ms=max_step * 1000.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BombCat 无界面批量对局")
+    parser.add_argument("--games", type=int, default=100, help="对局数量")
+    parser.add_argument("--difficulty", choices=list(ai_behavior.DIFFICULTY_PROFILES),
+                        default=ai_behavior.DEFAULT_DIFFICULTY, help="AI难度")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（第i局使用seed+i）")
+    parser.add_argument("--verbose", action="store_true", help="输出对局日志")
+    parser.add_argument("--record", metavar="DIR", default=None, help="把对局写入档案目录")
+    parser.add_argument("--compress", action="store_true", help="档案使用gzip压缩")
+    parser.add_argument("--decks", type=int, default=1, help="合并几副牌（大牌堆压力测试）")
+    parser.add_argument("--seats", type=int, default=2, help="座位数（第一个为基线策略代打的玩家，其余为AI）")
+    parser.add_argument("--all-ai", action="store_true", help="全部座位由AI控制")
+    parser.add_argument("--metrics-dir", metavar="DIR", default=None, help="定期把运行指标写入目录（多个进程可共用）")
+    parser.add_argument("--metrics-port", type=int, default=None, help="在本机该端口提供Prometheus文本接口")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="JSON",
+                        help="开启热点计时，结束后输出汇总；给出路径时同时写出JSON")
+    args = parser.parse_args(argv)
+    seats = table_seats(max(2, args.seats), humans=0 if args.all_ai else 1)
+
+    profile = ai_behavior.get_difficulty(args.difficulty)
+    recorder = GameRecorder(args.record, compress=args.compress) if args.record else None
+    results = []
+    metrics = None
+    if args.metrics_dir or args.metrics_port is not None:
+        metrics = run_metrics.GameMetrics(args.metrics_dir)
+    httpd = run_metrics.serve(args.metrics_port, metrics) if args.metrics_port is not None else None
+    if args.profile is not None:
+        profiler.PROFILER.enable()
+    try:
+        for i in range(args.games):
+            seed = None if args.seed is None else args.seed + i
+            results.append(run_game(difficulty=profile, seed=seed, verbose=args.verbose, recorder=recorder,
+                                    decks=max(1, args.decks), seats=seats, metrics=metrics))
+    finally:
+        if recorder is not None:
+            recorder.close()
+        if metrics is not None:
+            metrics.close()
+        if httpd is not None:
+            httpd.shutdown()
+
+    total_time = sum(r.elapsed for r in results)
+    print(f"难度: {profile.label} (每步 {profile.time_budget_ms:.0f}ms, 展开 {profile.rollouts}, 深度 {profile.search_depth})")
+    if tuple(seats) == DEFAULT_SEATS:
+        ai_wins = sum(r.winner == "ai" for r in results)
+        print(f"对局: {len(results)} | AI胜率: {ai_wins / max(1, len(results)):.1%}")
+    else:
+        wins = Counter(r.winner for r in results)
+        print(f"对局: {len(results)} | 座位: {len(seats)} | 胜率: " + " ".join(
+            f"{'平局' if seat == 'draw' else seat_display_name(seat)} {wins[seat] / max(1, len(results)):.1%}"
+            for seat in (*seats, "draw") if seat != "draw" or wins[seat]))
+    print(f"平均回合: {sum(r.turns for r in results) / max(1, len(results)):.1f} | "
+          f"平均耗时: {total_time / max(1, len(results)) * 1000:.1f}ms/局")
+    total_steps = sum(r.steps for r in results)
+    print(f"平均单步: {total_time / max(1, total_steps) * 1000:.2f}ms | "
+          f"最大单步: {max((r.max_step_ms for r in results), default=0.0):.1f}ms")
+    if args.profile is not None:
+        profiler.PROFILER.disable()
+        print("\n".join(profiler.PROFILER.report()))
+        if args.profile:
+            profiler.PROFILER.dump(args.profile)
+            print(f"计时数据已写入 {args.profile}")
+    stalled = [i for i, r in enumerate(results) if r.winner == "stalled"]
+    if stalled:
+        print(f"❌ {len(stalled)} 局达到步数上限仍未结束（第 {', '.join(map(str, stalled[:10]))} 局）")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
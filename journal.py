@@ -0,0 +1,127 @@
+"""
+存档与读档
+GameJournal把进行中的对局写成只追加的行动日志：每个行动（ActionTaken / DecisionAnswered）追加一行，
+每隔snapshot_interval个回合在回合开始时追加一个紧凑快照（Game.snapshot()）。
+每次保存只是一次追加写入，进程崩溃时最多丢失正在写的一行；读档时从最后一个快照恢复，
+再重新执行其后的少量行动即可回到存档时的状态。
+"""
+import base64
+import json
+import os
+from array import array
+from dataclasses import dataclass, field
+
+from events import ActionTaken, DecisionAnswered, GameOver, TurnStarted
+from recorder import decode_event, encode_event
+
+
+SNAPSHOT_INTERVAL = 6  # 每隔多少个回合写一个快照
+DEFAULT_SAVE_PATH = os.path.join(os.path.expanduser("~"), ".bombcat", "autosave.jsonl")
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _pack_snapshot(snapshot):
+    """rng内部状态（625个整数）打包为base64，快照体积约为直接写JSON的一半"""
+    version, internal, gauss = snapshot["rng"]
+    packed = base64.b64encode(array("I", internal).tobytes()).decode("ascii")
+    return {**snapshot, "rng": [version, packed, gauss]}
+
+
+def _unpack_snapshot(snapshot):
+    version, packed, gauss = snapshot["rng"]
+    internal = array("I")
+    internal.frombytes(base64.b64decode(packed))
+    return {**snapshot, "rng": (version, tuple(internal), gauss)}
+
+
+@dataclass
+class SavedGame:
+    """读档结果：对局头、最后一个快照及其后的行动"""
+    meta: dict
+    snapshot: dict
+    actions: list = field(default_factory=list)
+
+
+class GameJournal:
+    """进行中对局的行动日志；一个文件只保存一局，开始新的一局时覆盖"""
+
+    def __init__(self, path=DEFAULT_SAVE_PATH, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self._file = None
+        self._game = None
+        self._callback = None
+        self._turns_since_snapshot = 0
+
+    def attach(self, game):
+        """开始记录一局新对局（覆盖旧存档），应在game.start()之前调用"""
+        self.detach()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8", buffering=1)  # 行缓冲：每行写完即交给操作系统
+        self._write(["Game", {"seed": game.seed, "difficulty": game.difficulty.key, "decks": game.decks,
+                              "seats": list(game.seats)}])
+        self._turns_since_snapshot = None  # 第一个回合开始时写入快照
+        self._subscribe(game)
+
+    def resume(self, game):
+        """读档完成后继续在原存档后追加"""
+        self.detach()
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._turns_since_snapshot = 0
+        self._subscribe(game)
+
+    def _subscribe(self, game):
+        self._game = game
+        self._callback = game.events.subscribe(self._on_event)
+
+    def detach(self):
+        if self._game is not None:
+            self._game.events.unsubscribe(self._callback)
+            self._game = self._callback = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    close = detach
+
+    def _write(self, row):
+        self._file.write(_ENCODER.encode(row) + "\n")
+
+    def _on_event(self, event):
+        if isinstance(event, (ActionTaken, DecisionAnswered)):
+            self._write(encode_event(event))
+        elif isinstance(event, TurnStarted):
+            # 回合开始时没有进行中的结算，快照与之后的行动一起即可还原对局
+            if self._turns_since_snapshot is None or self._turns_since_snapshot + 1 >= self.snapshot_interval:
+                self._write(["Snapshot", _pack_snapshot(self._game.snapshot())])
+                self._turns_since_snapshot = 0
+            else:
+                self._turns_since_snapshot += 1
+        elif isinstance(event, GameOver):
+            self._write(encode_event(event))
+            self.detach()  # 已结束的对局不再可读档
+
+    def load(self):
+        """读取存档，返回SavedGame；没有可继续的对局（不存在、已结束或没有快照）时返回None"""
+        if not os.path.exists(self.path):
+            return None
+        meta = snapshot = None
+        actions = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    break  # 崩溃时写了一半的最后一行
+                if row[0] == "Game":
+                    meta = row[1]
+                elif row[0] == "Snapshot":
+                    snapshot, actions = row[1], []
+                elif row[0] == "GameOver":
+                    return None
+                elif (event := decode_event(row)) is not None:
+                    actions.append(event)
+        if meta is None or snapshot is None:
+            return None
+        return SavedGame(meta, _unpack_snapshot(snapshot), actions)
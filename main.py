@@ -1,74 +1,130 @@
 """
 炸弹猫游戏的图形界面实现
 """
-import queue
+import argparse
 import random
 import re
+import time
+from collections import Counter, deque, namedtuple
+import tkinter as tk
+from enum import Enum
 from tkinter import ttk, messagebox
 from cards import *
+from decisions import CHOOSE_BOMB_POSITION, CHOOSE_ORDER, DecisionRequest
+from events import (ActionTaken, BombDefused, CardDrawn, CardPlayed, DebugReasoning, DecisionAnswered, EventBus,
+                    GameEvent, GameOver, GameStarted, PlayerExploded, TurnStarted)
 import ai_player as ai_behavior
+from blocklist import BlockList
+from journal import DEFAULT_SAVE_PATH, GameJournal
+from recorder import GameRecorder
+import profiler
+
+
+class CardPile(BlockList):
+    """
+    带类型计数的卡牌序列（牌堆 / 弃牌堆）
+    分块存储，多副牌合并后的大牌堆上抽底、插入也是亚线性的；所有增删都同步更新counts（卡牌类型 -> 张数），
+    按类型计数不必扫描整堆。
+    """
+
+    __slots__ = ("counts",)
+
+    def __init__(self, cards=()):
+        self.counts = Counter()
+        super().__init__(cards)
+
+    def _added(self, cards):
+        counts = self.counts
+        for card in cards:
+            counts[type(card)] += 1
+
+    def _removed(self, cards):
+        counts = self.counts
+        for card in cards:
+            counts[type(card)] -= 1
+
+    def count_of(self, card_type):
+        """某类型（或类型元组）的张数"""
+        if card_type in self.counts:
+            return self.counts[card_type]
+        return sum(n for cls, n in self.counts.items() if issubclass(cls, card_type))
+
+    def shuffle(self, rng):
+        """洗牌，不改变计数（与rng.shuffle(list)消耗相同的随机数）"""
+        cards = list(self)
+        rng.shuffle(cards)
+        self._reset(cards)
 
 
 class Deck:
     """牌堆管理器"""
 
-    def __init__(self):
-        self.cards = []
-        self.discard_pile = []
-        self.amounts = {
-            BombCatCard: 4, DefuseCard: 4, NopeCard: 3, AttackCard: 4, PersonalAttackCard: 3,
-            SkipCard: 3, SuperSkipCard: 2, ShuffleCard: 2, SeeFutureCard: 2, AlterFutureCard: 3,
-            DrawBottomCard: 2, SwapCard: 2
-        }
+    def __init__(self, rng=None, decks=1):
+        self.rng = rng if rng is not None else random.Random()  # 牌堆的随机源，由Game按种子提供
+        self.decks = decks  # 合并几副标准牌（聚会 / 压力测试玩法）
+        self.cards = CardPile()
+        self.discard_pile = CardPile()
+        # 各类型的张数（来自卡牌登记表，按副数放大）
+        self.amounts = {cls: CARD_SPECS[cls].amount * decks for cls in DECK_ORDER}
         self._initialize_cards()
         self.shuffle()
 
     def _initialize_cards(self):
-        # 卡牌配置区（可在此添加新卡牌）
-        cards = [
-            *[BombCatCard() for _ in range(self.amounts[BombCatCard])],  # 炸弹猫
-            *[DefuseCard() for _ in range(self.amounts[DefuseCard])],  # 拆除卡
-            *[NopeCard() for _ in range(self.amounts[NopeCard])],  # 拒绝卡
-            *[AttackCard() for _ in range(self.amounts[AttackCard])],  # 攻击卡
-            *[PersonalAttackCard () for _ in range(self.amounts[PersonalAttackCard])],  # 自我攻击卡
-            *[SkipCard() for _ in range(self.amounts[SkipCard])],  # 跳过卡
-            *[SuperSkipCard() for _ in range(self.amounts[SuperSkipCard])],  # 超级跳过卡
-            *[ShuffleCard() for _ in range(self.amounts[ShuffleCard])],  # 洗牌卡
-            *[SeeFutureCard(depth=random.choices([3, 5], weights=[4, 1])[0])
-                  for _ in range(self.amounts[SeeFutureCard])],  # 预见未来卡
-            *[AlterFutureCard(depth=random.choices([3, 5], weights=[4, 1])[0])
-                  for _ in range(self.amounts[AlterFutureCard])],  # 改变未来卡
-            *[DrawBottomCard() for _ in range(self.amounts[DrawBottomCard])],  # 抽底卡
-            *[SwapCard() for _ in range(self.amounts[SwapCard])],  # 顶底互换卡
-        ]
-        self.cards = cards
+        self.cards = [CARD_SPECS[cls].create(self.rng) for cls in DECK_ORDER for _ in range(self.amounts[cls])]
+
+    @property
+    def cards(self):
+        return self._cards
+
+    @cards.setter
+    def cards(self, cards):
+        self._cards = cards if isinstance(cards, CardPile) else CardPile(cards)
+
+    @property
+    def discard_pile(self):
+        return self._discard_pile
+
+    @discard_pile.setter
+    def discard_pile(self, cards):
+        self._discard_pile = cards if isinstance(cards, CardPile) else CardPile(cards)
+
+    @property
+    def bomb_count(self):
+        """牌堆中实际剩余的炸弹猫数量"""
+        return self._cards.counts[BombCatCard]
 
     def shuffle(self):
         """洗牌操作"""
-        random.shuffle(self.cards)
+        self._cards.shuffle(self.rng)
 
     def draw(self, num=1, from_bottom=False, refuse=None):
-        """抽牌操作"""
+        """
+        抽牌操作
+        refuse为不接受的卡牌类型（或实例）：跳过这些牌取最近的一张。
+        注意带refuse时的扫描方向与普通抽牌相反（不指定from_bottom时从堆底一侧取），开局发牌依赖这一点。
+        """
+        refused = tuple(r if isinstance(r, type) else type(r) for r in refuse) if refuse else ()
         drawn = []
         for _ in range(num):
-            if not self.cards:
+            if not self._cards:
                 self.refill_from_discard()
-            if self.cards:
-                if refuse:
-                    for card in self.cards if not from_bottom else reversed(self.cards):
-                        if not any(isinstance(card, type(r)) for r in refuse):
-                            drawn.append(card)
-                            self.cards.remove(card)
-                            break
-                else:
-                    drawn.append(self.cards.pop(-1 if not from_bottom else 0))
+            cards = self._cards
+            if not cards:
+                continue
+            bottom_side = from_bottom != bool(refused)
+            refused_count = cards.count_of(refused) if refused else 0
+            if not refused_count:
+                drawn.append(cards.pop(0 if bottom_side else -1))
+            elif refused_count < len(cards):
+                indexes = range(len(cards)) if bottom_side else range(len(cards) - 1, -1, -1)
+                drawn.append(cards.pop(next(i for i in indexes if not isinstance(cards[i], refused))))
         return drawn
 
     def refill_from_discard(self):
-        """用弃牌堆补充牌堆"""
+        """用弃牌堆补充牌堆：两堆直接交换（连同计数），不复制"""
         print("♻️ 弃牌堆洗入牌堆")
-        self.cards = self.discard_pile.copy()
-        self.discard_pile.clear()
+        self._cards, self._discard_pile = self._discard_pile, self._cards
+        self._discard_pile.clear()
         self.shuffle()
 
     def insert_card(self, card, position):
@@ -76,113 +132,321 @@ class Deck:
         self.cards.insert(position, card)
 
 
+class Hand:
+    """
+    手牌：按出牌顺序保存的卡牌列表（行动记录中的hand_index依赖该顺序），
+    同时按类型维护实例桶、按类别维护计数、按名称维护数量，增删时同步更新；
+    类别查询的结果与手牌文字缓存到下一次增删。
+    """
+
+    __slots__ = ("_cards", "_buckets", "_category_counts", "_name_counts", "_views", "_text")
+
+    def __init__(self, cards=()):
+        self._cards = []
+        self._buckets = {}  # 卡牌类型 -> 实例列表
+        self._category_counts = dict.fromkeys(CARD_CATEGORIES, 0)
+        self._name_counts = {}
+        self._views = {}
+        self._text = None
+        self.extend(cards)
+
+    def _added(self, card):
+        cls = type(card)
+        self._buckets.setdefault(cls, []).append(card)
+        mask = CATEGORY_MASKS.get(cls, 0)
+        for name, bit in CARD_CATEGORIES.items():
+            if mask & bit:
+                self._category_counts[name] += 1
+        self._name_counts[card.name] = self._name_counts.get(card.name, 0) + 1
+        self._views.clear()
+        self._text = None
+
+    def _removed(self, card):
+        cls = type(card)
+        bucket = self._buckets[cls]
+        bucket.remove(card)
+        if not bucket:
+            del self._buckets[cls]
+        mask = CATEGORY_MASKS.get(cls, 0)
+        for name, bit in CARD_CATEGORIES.items():
+            if mask & bit:
+                self._category_counts[name] -= 1
+        self._name_counts[card.name] -= 1
+        if not self._name_counts[card.name]:
+            del self._name_counts[card.name]
+        self._views.clear()
+        self._text = None
+
+    # 列表接口
+    def append(self, card):
+        self._cards.append(card)
+        self._added(card)
+
+    def extend(self, cards):
+        for card in cards:
+            self.append(card)
+
+    def remove(self, card):
+        self._cards.remove(card)
+        self._removed(card)
+
+    def pop(self, index=-1):
+        card = self._cards.pop(index)
+        self._removed(card)
+        return card
+
+    def index(self, card):
+        return self._cards.index(card)
+
+    def __len__(self):
+        return len(self._cards)
+
+    def __iter__(self):
+        return iter(self._cards)
+
+    def __getitem__(self, index):
+        return self._cards[index]
+
+    def __contains__(self, card):
+        return card in self._cards
+
+    def __repr__(self):
+        return f"Hand({self._cards!r})"
+
+    # 按类型与类别查询
+    def count_of(self, card_type):
+        """某类型（或类型元组）的张数"""
+        if card_type in self._buckets:
+            return len(self._buckets[card_type])
+        return sum(len(bucket) for cls, bucket in self._buckets.items() if issubclass(cls, card_type))
+
+    def type_counts(self):
+        """(卡牌类型, 张数)"""
+        return [(cls, len(bucket)) for cls, bucket in self._buckets.items()]
+
+    def first(self, card_type):
+        """最早加入手牌的某类型卡牌，没有时返回None"""
+        bucket = self._buckets.get(card_type)
+        if bucket is not None:
+            return bucket[0]
+        return next((c for c in self._cards if isinstance(c, card_type)), None)
+
+    def has_category(self, category):
+        return self._category_counts[category] > 0
+
+    def cards_of(self, selector):
+        """类别名或类型（元组）对应的卡牌，按手牌顺序；返回新列表，调用方可随意修改"""
+        view = self._views.get(selector)
+        if view is None:
+            if selector in CARD_CATEGORIES:
+                if not self._category_counts[selector]:
+                    return []
+                bit = CARD_CATEGORIES[selector]
+                view = [c for c in self._cards if CATEGORY_MASKS.get(type(c), 0) & bit]
+            elif isinstance(selector, (type, tuple)):
+                if not self.count_of(selector):
+                    return []
+                view = [c for c in self._cards if isinstance(c, selector)]
+            else:
+                return []
+            self._views[selector] = view
+        return view.copy()
+
+    def summary(self):
+        """手牌文字：按名称汇总数量，拆除卡在前"""
+        if self._text is None:
+            items = sorted(self._name_counts.items(), key=lambda item: (item[0] != _DEFUSE_NAME, item[0]))
+            self._text = " | ".join(f"{name} ×{amount}" for name, amount in items)
+        return self._text
+
+
+_DEFUSE_NAME = DefuseCard().name
+
+
 class Player:
     """玩家类"""
 
-    def __init__(self, name, is_ai=False):
+    def __init__(self, name, is_ai=False, seat=None):
         self.name = name
-        self.hand = []
+        self.seat = seat if seat is not None else ("ai" if is_ai else "player")  # 事件与存档中使用的座位名
+        self.hand = Hand()
         self.hand_limit = 9  # 设置手牌上限
         self.init_limit = 6  # 设置初始手牌上限
         self.is_ai = is_ai
         self.alive = True
+        self.knowledge_bit = 0  # AI座位在共享牌堆认知中的位，由Game分配
+
+    @property
+    def hand(self):
+        return self._hand
+
+    @hand.setter
+    def hand(self, cards):
+        self._hand = cards if isinstance(cards, Hand) else Hand(cards)
 
     def has_defuse(self):
         """检查是否有拆除卡"""
-        return any(isinstance(c, DefuseCard) for c in self.hand)
+        return self._hand.count_of(DefuseCard) > 0
 
     def get_specific_cards(self, card_type):
-        """获取手牌中指定卡牌"""
-        if card_type == "playable":
-            return [c for c in self.hand if not isinstance(c, (DefuseCard, BombCatCard))]
-        elif card_type == "defensive":
-            return [c for c in self.hand if isinstance(c, (SkipCard, AttackCard, ShuffleCard, DrawBottomCard, SwapCard, AlterFutureCard))]
-        elif card_type == "escape":
-            return [c for c in self.hand if isinstance(c, (SkipCard, SuperSkipCard, AttackCard))]
-        else:
-            return [c for c in self.hand if isinstance(c, card_type)] if isinstance(card_type, (type, tuple)) else []
+        """获取手牌中指定卡牌：类别名（playable / defensive / escape）或卡牌类型"""
+        return self._hand.cards_of(card_type)
 
     def hand_text(self):
         """获取手牌文本"""
-        hand_tmp = {c.name: len([x for x in self.hand if x.name == c.name]) for c in self.hand}
-        hand_tmp = sorted(hand_tmp.items(), key=lambda item: (0 if item[0] == DefuseCard().name else 1, item[0]))
-        text = ""
-        for name, amt in hand_tmp:
-            text += f"{name} ×{amt} | "
-        return text[:-3]  # 去掉最后的[-3~-1] " | "
+        return self._hand.summary()
+
+
+DEFAULT_SEATS = ("player", "ai")
+
+
+def table_seats(count, humans=1):
+    """count个座位的牌桌：前humans个为人类玩家，其余为AI（player, ai, ai2, ai3...）"""
+    def numbered(base, n):
+        return [base + (str(i + 1) if i else "") for i in range(n)]
+    humans = max(0, min(humans, count))
+    return (*numbered("player", humans), *numbered("ai", count - humans))
+
+
+def seat_is_ai(seat):
+    """座位名以ai开头的由AI控制（ai、ai2、ai3...），其余为人类玩家（player、player2...）"""
+    return seat.startswith("ai")
+
+
+def seat_display_name(seat):
+    base, index = re.fullmatch(r"(\D+)(\d*)", seat).groups()
+    return ("AI" if base == "ai" else "玩家" if base == "player" else base) + index
+
+
+class TurnRing:
+    """
+    行动顺序环：按座位顺序循环的双向链表，取下家 / 上家与淘汰出局都是O(1)
+    出局者保留自己的后继指针，从出局者出发取下家仍然可用（出局者的回合结束时据此换人）。
+    """
+
+    def __init__(self, players):
+        self._next = {}
+        self._prev = {}
+        self._members = set(players)
+        count = len(players)
+        for i, player in enumerate(players):
+            self._next[player] = players[(i + 1) % count]
+            self._prev[player] = players[i - 1]
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, player):
+        return player in self._members
+
+    def next(self, player):
+        """player的下家（跳过已出局者）"""
+        following = self._next[player]
+        while following not in self._members:
+            following = self._next[following]
+        return following
+
+    def prev(self, player):
+        preceding = self._prev[player]
+        while preceding not in self._members:
+            preceding = self._prev[preceding]
+        return preceding
+
+    def remove(self, player):
+        """淘汰出局"""
+        if player not in self._members:
+            return
+        self._members.discard(player)
+        if self._members:
+            prev, following = self.prev(player), self.next(player)
+            self._next[prev] = following
+            self._prev[following] = prev
+
+
+class TurnPhase(Enum):
+    """回合状态机的阶段"""
+    AWAITING_ACTION = "awaiting_action"  # 等待当前行动方出牌或抽牌
+    RESOLVING_EFFECT = "resolving_effect"  # 正在结算卡牌效果
+    AWAITING_DECISION = "awaiting_decision"  # 等待行动方回答决策请求（如拆弹后的放回位置）
+    SWITCHING_TURN = "switching_turn"  # 当前回合已结束，等待推进到下一回合
+    GAME_OVER = "game_over"
 
 
 class Game:
     """
     游戏控制器
-    没有显式主循环，游戏循环实际上由_next_turn()推动
+    回合推进是一个显式状态机：出牌/抽牌只改变phase，由驱动方反复调用step()推进，
+    引擎内部不再递归进入下一回合或AI回合。
     """
 
-    def __init__(self, gui=None):
-        self.deck = Deck()  # 创建Deck(牌堆)实例
-        self.player = Player("玩家")  # 创建Player(玩家)实例
-        self.ai = Player("AI", is_ai=True)  # 创建Player(AI)实例
+    def __init__(self, gui=None, difficulty=None, seed=None, decks=1, seats=DEFAULT_SEATS):
+        # 引擎的随机性（牌序、洗牌、炸弹随机放回）全部来自按种子创建的rng，同一种子加同一行动序列可完整重现对局
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        # AI决策的随机性（随机展开、出牌失败后的替代）使用独立的rng：不影响牌序，也不与其他牌桌共用全局随机流
+        self.ai_rng = random.Random(f"{self.seed}:ai")
+        # 座位：按行动顺序排列，人类与AI可以混合；player / ai为第一个人类 / AI座位（1v1时即双方）
+        if len(seats) < 2 or len(set(seats)) != len(seats):
+            raise ValueError(f"座位至少两个且不能重复: {seats}")
+        # 每两个座位至少一副牌，人均牌量与1v1相同（否则多人开局发牌不够、牌全部压在手里）
+        self.decks = decks = max(decks, (len(seats) + 1) // 2)
+        self.deck = Deck(self.rng, decks)  # 创建Deck(牌堆)实例
+        self.seats = tuple(seats)
+        self.players = [Player(seat_display_name(seat), is_ai=seat_is_ai(seat), seat=seat) for seat in seats]
+        self.by_seat = {p.seat: p for p in self.players}
+        self.player = next((p for p in self.players if not p.is_ai), None)
+        self.ai = next((p for p in self.players if p.is_ai), None)
+        self.ai_mask = 0  # 全部AI座位的认知位
+        for i, p in enumerate(p for p in self.players if p.is_ai):
+            p.knowledge_bit = 1 << i
+            self.ai_mask |= p.knowledge_bit
+        self.ring = TurnRing(self.players)
         self.gui = gui  # 保存GUI引用，用于更新界面
+        self.difficulty = ai_behavior.get_difficulty(difficulty)  # AI难度档位（计算预算）
+        self.metrics = None  # 运行指标（metrics.GameMetrics），由其attach()挂载
 
         # 有关回合
         self._init_hands()
         self.remaining_turns = 1
-        self.current_player = self.player
+        self.current_player = self.players[0]
         self.end_turn = False
         self.end_all_turn = False
         self.game_running = False  # Game初始化的时候游戏未开始，在start_game()中才设置为True
         self.turn_owner = self.current_player
         self.turn_progress = 1
         self.turn_total = self.remaining_turns
-
-        self.ai_known = []
+        self.turns_played = 0  # 已结束的回合数，用于统计
+        self.phase = TurnPhase.AWAITING_ACTION
+        self.pending_decision = None  # 当前等待回答的DecisionRequest
+        self._decision_callback = None  # 回答后恢复结算的回调
+        self.ai_played_this_turn = 0  # AI本回合已出牌数
+        self.ai_forbidden_next_type = None  # AI下一张不能连续打出的受限类型
+
+        self.ai_known = ai_behavior.DeckKnowledge()
         self.ai_init_knowledge()
-        self.noped = None  # =None 无人被Nope | self.player 对玩家生效 | self.ai 对AI生效
+        self.noped = None  # 下一张出牌会被拒绝的玩家，None表示无人被Nope
+        self.events = EventBus()  # 结构化事件，GUI日志等通过订阅获取对局进展
 
         gui.set_game(self)  # 设置GUI内部对game的引用
 
     def _init_hands(self):
-        """初始化双方手牌"""
-        for p in [self.player, self.ai]:
+        """初始化各座位的手牌"""
+        for p in self.players:
             p.hand.append(DefuseCard())  # 强制加入一张拆除卡
-            p.hand.extend(self.deck.draw(p.init_limit - 1 , refuse=[BombCatCard()]))  # 再抽5张牌 6-1=5
+            p.hand.extend(self.deck.draw(p.init_limit - 1 , refuse=[BombCatCard]))  # 再抽5张牌 6-1=5
 
     @staticmethod
     def _card_short_name(card):
         """用于Debug牌堆预览的卡牌简称。"""
-        if isinstance(card, BombCatCard):
-            return "炸"
-        if isinstance(card, DefuseCard):
-            return "拆"
-        if isinstance(card, NopeCard):
-            return "阻"
-        if isinstance(card, AttackCard):
-            return "攻"
-        if isinstance(card, PersonalAttackCard):
-            return "自"
-        if isinstance(card, SkipCard):
-            return "跳"
-        if isinstance(card, SuperSkipCard):
-            return "超"
-        if isinstance(card, ShuffleCard):
-            return "洗"
-        if isinstance(card, SwapCard):
-            return "换"
-        if isinstance(card, DrawBottomCard):
-            return "底"
-        if isinstance(card, SeeFutureCard):
-            return "预5" if getattr(card, "depth", 3) == 5 else "预"
-        if isinstance(card, AlterFutureCard):
-            return "改5" if getattr(card, "depth", 3) == 5 else "改"
-        return "?"
+        return card.short_name
 
     def print_debug_deck_snapshot(self, top_n=6, bottom_n=3):
         """Debug模式下输出牌堆顶N张和底N张（用简称）。"""
-        if not self.gui.debug_mode:
+        if not self.debug_enabled:
             return
 
         if not self.deck.cards:
-            self.gui.print("牌堆：(空)", debug=True)
+            self.debug("牌堆：(空)")
             return
 
         top_count = min(top_n, len(self.deck.cards))
@@ -194,7 +458,7 @@ class Game:
         top_text = " ".join(self._card_short_name(c) for c in top_cards)
         bottom_text = " ".join(self._card_short_name(c) for c in bottom_cards)
         separator = "..." if (top_count + bottom_count) < len(self.deck.cards) else " "
-        self.gui.print(f"牌堆：{top_text}{separator}{bottom_text}", debug=True)
+        self.debug("牌堆：{}{}{}", top_text, separator, bottom_text)
 
     def ai_control(self):
         """将 AI 决策委托给独立模块。"""
@@ -204,6 +468,216 @@ class Game:
         """将 AI 回合执行委托给独立模块。"""
         ai_behavior.ai_turn(self)
 
+    @staticmethod
+    def seat_of(player):
+        """事件中使用的座位名"""
+        return player.seat
+
+    def emit(self, event):
+        self.events.emit(event)
+
+    @property
+    def debug_enabled(self):
+        """调试输出是否有人查看；构造调试文字前先用它短路"""
+        return self.gui is not None and self.gui.debug_mode
+
+    def debug(self, message, *args):
+        """
+        惰性调试输出，关闭调试时不做任何字符串工作
+        message可以是模板（由args延迟format）或返回文字的无参可调用对象
+        """
+        if not self.debug_enabled:
+            return
+        if callable(message):
+            message = message()
+        elif args:
+            message = message.format(*args)
+        self.gui.print(message, debug=True)
+
+    def snapshot(self):
+        """
+        对局状态的紧凑快照（只含基本类型与rng状态），用于重放关键帧与存档
+        只能在没有待回答决策时取得（等待行动、换边或结束阶段）
+        """
+        if self.pending_decision is not None:
+            raise RuntimeError("等待决策时不能取得快照")
+        seat = lambda p: None if p is None else self.seat_of(p)
+        forbidden = self.ai_forbidden_next_type
+        return {
+            "seed": self.seed,
+            "rng": self.rng.getstate(),
+            "deck": [card_code(c) for c in self.deck.cards],
+            "discard": [card_code(c) for c in self.deck.discard_pile],
+            "hands": {seat(p): [card_code(c) for c in p.hand] for p in self.players},
+            "alive": {seat(p): p.alive for p in self.players},
+            "ai_known": [self._encode_known(entry) for entry in self.ai_known],
+            "phase": self.phase.value,
+            "game_running": self.game_running,
+            "current": seat(self.current_player),
+            "remaining_turns": self.remaining_turns,
+            "end_turn": self.end_turn,
+            "end_all_turn": self.end_all_turn,
+            "turn_owner": seat(self.turn_owner),
+            "turn_progress": self.turn_progress,
+            "turn_total": self.turn_total,
+            "turns_played": self.turns_played,
+            "noped": seat(self.noped),
+            "ai_played_this_turn": self.ai_played_this_turn,
+            "ai_forbidden_next_type": None if forbidden is None else CARD_TYPES.index(forbidden),
+        }
+
+    def _encode_known(self, entry):
+        """认知条目 -> 快照：未知为None，全部AI都知道时为卡牌编码，否则为[卡牌编码, 认知位]"""
+        if entry is None:
+            return None
+        card, mask = entry
+        return card_code(card) if mask == self.ai_mask else [card_code(card), mask]
+
+    def _decode_known(self, card, code):
+        """快照中的认知条目 -> (卡牌, 认知位)，已知的牌指向牌堆中同一位置的牌实例"""
+        if code is None:
+            return None
+        code, mask = (code, self.ai_mask) if isinstance(code, int) else code
+        return (card if card_code(card) == code else card_from_code(code)), mask
+
+    def restore(self, snapshot):
+        """从snapshot()的结果恢复对局状态（不发出事件）；快照经过JSON往返后同样可用"""
+        by_seat = {**self.by_seat, None: None}
+        version, internal, gauss = snapshot["rng"]
+        self.seed = snapshot["seed"]
+        self.rng.setstate((version, tuple(internal), gauss))
+        self.ai_rng = random.Random(f"{self.seed}:ai:{snapshot['turns_played']}")  # 不在快照中，按种子与回合数重建
+        self.deck.cards = [card_from_code(code) for code in snapshot["deck"]]
+        self.deck.discard_pile = [card_from_code(code) for code in snapshot["discard"]]
+        for seat, codes in snapshot["hands"].items():
+            by_seat[seat].hand = [card_from_code(code) for code in codes]
+            by_seat[seat].alive = snapshot["alive"][seat]
+        self.ring = TurnRing([p for p in self.players if p.alive])
+        self.ai_known = ai_behavior.DeckKnowledge(
+            self._decode_known(card, code) for card, code in zip(self.deck.cards, snapshot["ai_known"]))
+        self.phase = TurnPhase(snapshot["phase"])
+        self.game_running = snapshot["game_running"]
+        self.current_player = by_seat[snapshot["current"]]
+        self.remaining_turns = snapshot["remaining_turns"]
+        self.end_turn = snapshot["end_turn"]
+        self.end_all_turn = snapshot["end_all_turn"]
+        self.turn_owner = by_seat[snapshot["turn_owner"]]
+        self.turn_progress = snapshot["turn_progress"]
+        self.turn_total = snapshot["turn_total"]
+        self.turns_played = snapshot["turns_played"]
+        self.noped = by_seat[snapshot["noped"]]
+        self.ai_played_this_turn = snapshot["ai_played_this_turn"]
+        forbidden = snapshot["ai_forbidden_next_type"]
+        self.ai_forbidden_next_type = None if forbidden is None else CARD_TYPES[forbidden]
+        self.pending_decision = None
+        self._decision_callback = None
+
+    def start(self):
+        """开始对局：发出开局事件并进入第一个回合"""
+        self.game_running = True
+        self.emit(GameStarted(self.seat_of(self.current_player)))
+        self._announce_turn()
+
+    def step(self):
+        """
+        推进状态机一步，返回是否有推进
+        换边、AI决策、决策请求的分发与恢复由这里完成；等待玩家行动、等待前端回答或游戏已结束时返回False。
+        """
+        if self.phase is TurnPhase.SWITCHING_TURN:
+            self._next_turn()
+        elif self.phase is TurnPhase.AWAITING_DECISION:
+            request = self.pending_decision
+            if request.answered:
+                self._resume_decision()
+            elif not request.dispatched:
+                request.dispatched = True
+                self.gui.request_decision(request)  # 前端可以立即回答，也可以稍后回答
+            else:
+                return False
+        elif self.phase is TurnPhase.AWAITING_ACTION and self.current_player.is_ai and self.game_running:
+            ai_behavior.ai_step(self)
+        else:
+            return False
+        return True
+
+    def apply_action(self, action):
+        """
+        执行一条记录下来的行动：ActionTaken出牌或抽牌，DecisionAnswered回答当前的决策请求
+        用于重放与读档；行动与当前状态不符时返回False
+        """
+        player = self.by_seat.get(action.seat)
+        if player is None:
+            return False
+        if isinstance(action, DecisionAnswered):
+            request = self.pending_decision
+            if request is None or request.kind != action.kind or request.player is not player:
+                return False
+            request.answer(request.decode(action.value))
+            self._resume_decision()
+            return True
+
+        if self.phase is not TurnPhase.AWAITING_ACTION or player is not self.current_player:
+            return False
+        if action.action == "draw":
+            return self.draw_card(player)
+        if not 0 <= action.hand_index < len(player.hand):
+            return False
+        card = player.hand[action.hand_index]
+        if not self.play_card(player, card):
+            return False
+        if player.is_ai:
+            ai_behavior.note_ai_play(self, card)
+        return True
+
+    def replay(self, actions):
+        """依次执行记录下来的行动直到用尽、出错或对局结束（换边也在这里推进），返回成功执行的条数"""
+        done = 0
+        while self.phase is not TurnPhase.GAME_OVER:
+            if self.phase is TurnPhase.SWITCHING_TURN:
+                self._next_turn()
+            elif done < len(actions) and self.apply_action(actions[done]):
+                done += 1
+            else:
+                break
+        return done
+
+    def awaiting_player(self):
+        """是否正在等待人类玩家出牌或抽牌"""
+        return (self.game_running and self.phase is TurnPhase.AWAITING_ACTION
+                and not self.current_player.is_ai)
+
+    def request_decision(self, kind, player, on_answer, **payload):
+        """
+        在结算效果途中发布决策请求并暂停结算
+        回答后on_answer(value)在step()中被调用以继续结算，value为None表示放弃选择。
+        """
+        request = DecisionRequest(kind, player, **payload)
+        self.pending_decision = request
+        self._decision_callback = on_answer
+        self.phase = TurnPhase.AWAITING_DECISION
+        return request
+
+    def _resume_decision(self):
+        """用已回答的决策继续被暂停的结算"""
+        request, on_answer = self.pending_decision, self._decision_callback
+        self.pending_decision = None
+        self._decision_callback = None
+        self.phase = TurnPhase.RESOLVING_EFFECT
+        value = request.result()
+        self.emit(DecisionAnswered(self.seat_of(request.player), request.kind, request.encode(value)))
+        on_answer(value)
+        self._settle_effect()
+        self.gui.update_gui(("status",))
+
+    def _settle_effect(self):
+        """效果结算完毕后决定下一阶段；效果内已切换阶段（抽牌、发起决策、游戏结束）时保持不变"""
+        if self.phase is not TurnPhase.RESOLVING_EFFECT:
+            return
+        if self.end_turn or self.end_all_turn:
+            self.phase = TurnPhase.SWITCHING_TURN
+        else:
+            self.phase = TurnPhase.AWAITING_ACTION
+
     # AI 牌堆认知的统一入口（由 ai_player.py 提供实现）
     def ai_init_knowledge(self):
         ai_behavior.init_ai_knowledge(self)
@@ -217,20 +691,20 @@ class Game:
     def ai_on_draw(self, from_bottom=False):
         ai_behavior.on_draw(self, from_bottom=from_bottom)
 
-    def ai_on_insert_known(self, pos, card):
-        ai_behavior.on_insert_known(self, pos, card)
+    def ai_on_insert_known(self, pos, card, player):
+        ai_behavior.on_insert_known(self, pos, card, player)
 
     def ai_on_insert_unknown(self, pos):
         ai_behavior.on_insert_unknown(self, pos)
 
-    def ai_on_see_future(self, top_cards):
-        ai_behavior.on_see_future(self, top_cards)
+    def ai_on_see_future(self, top_cards, player):
+        ai_behavior.on_see_future(self, top_cards, player)
 
     def ai_on_remove_top(self, top_count):
         ai_behavior.on_remove_top(self, top_count)
 
-    def ai_on_append_known(self, top_cards):
-        ai_behavior.on_append_known(self, top_cards)
+    def ai_on_append_known(self, top_cards, player=None):
+        ai_behavior.on_append_known(self, top_cards, player)
 
     def ai_on_append_unknown(self, top_count):
         ai_behavior.on_append_unknown(self, top_count)
@@ -243,53 +717,62 @@ class Game:
         else:
             card = _card  # 这个时候_card就是单个卡牌
 
+        if self.phase is not TurnPhase.AWAITING_ACTION:
+            return False
+
         # player打出来的牌被Nope
         if self.noped == player:
             self.noped = None
-            self.gui.print(f"🚫 {player.name} 打出的 {card.name} 被 {self.get_other(player).name} 的拒绝卡阻止")
+            self.emit(ActionTaken(self.seat_of(player), "play", player.hand.index(card)))
+            self.emit(CardPlayed(self.seat_of(player), type(card).__name__, card.name, noped=True))
+            self.gui.print(f"🚫 {player.name} 打出的 {card.name} 被 {self.ring.prev(player).name} 的拒绝卡阻止")
             # 被Nope的牌也要消耗
             player.hand.remove(card)
             self.deck.discard_pile.append(card)
-            self.gui.update_gui()
+            self.gui.update_gui(("hands", "status"))
             return True
 
         self.end_all_turn = False
         if (player == self.current_player or card is NopeCard) and card in player.hand:
             if isinstance(card, NopeCard) and self.noped == self.get_other(player):  # 阻止重复用Nope卡
                 if player.is_ai:
-                    self.gui.print(f"❌ 已存在 AI 打出的拒绝卡，无法重复打出", debug=True)  # 理论上不会触发
+                    self.debug("❌ 已存在 AI 打出的拒绝卡，无法重复打出")  # 理论上不会触发
                 else:
                     self.gui.print(f"❌ 已存在 玩家 打出的拒绝卡，请勿重复打出")
                 return False
             else:
+                self.emit(ActionTaken(self.seat_of(player), "play", player.hand.index(card)))
+                self.emit(CardPlayed(self.seat_of(player), type(card).__name__, card.name))
                 self.gui.print(f"🎴 {player.name} 使用了 {card.name}")
 
             player.hand.remove(card)  # 卡牌先消耗手牌再执行效果，针对满牌时用抽底
+            self.phase = TurnPhase.RESOLVING_EFFECT
             card.use(self, player, self.get_other(player))
             self.deck.discard_pile.append(card)
-            self.gui.update_gui()
-
-            if self.end_turn or self.end_all_turn:
-                # 如果是玩家回合，打开回合结束标记，结束阻塞循环
-                if not player.is_ai:
-                    self.player_turn_done = True
-                self._next_turn()  # 出牌部分的回合结束
-
-            elif not (isinstance(card, NopeCard) and player.is_ai):
-                # 间隔下一部分出牌/抽牌文字（都在同一个回合内）
-                # 回合只剩1的抽牌/end_turn/end_all_turn为True 不需要间隔，因为回合结束有回合分界线
-                self.gui.print("───────/───────")
+            self.gui.update_gui(("hands", "status"))
+
+            self._settle_effect()
             return True
 
         return False
 
+    def can_draw(self, player):
+        """手牌未满时可以抽牌；手牌已满但没有能打出的牌时（如多副牌时攒满拆除）也允许超过上限抽牌，否则这个座位无法行动"""
+        if len(player.hand) < player.hand_limit:
+            return True
+        nope_blocked = self.noped == self.get_other(player) and self.noped != player
+        return not any(not (nope_blocked and isinstance(card, NopeCard))
+                       for card in player.get_specific_cards("playable"))
+
     def draw_card(self, player, from_bottom=False):
         """处理双方抽牌的底层函数"""
         if player != self.current_player:
             return False
+        if self.phase not in (TurnPhase.AWAITING_ACTION, TurnPhase.RESOLVING_EFFECT):
+            return False
 
-        if len(player.hand) >= player.hand_limit:
-            self.gui.print(f"🈵 {player.name}手牌已满 (上限为{self.player.hand_limit}张)，请先出牌！")
+        if not self.can_draw(player):
+            self.gui.print(f"🈵 {player.name}手牌已满 (上限为{player.hand_limit}张)，请先出牌！")
             return False
 
         # 从牌堆中抽得drawn列表
@@ -297,23 +780,24 @@ class Game:
             self.ai_on_draw(from_bottom=from_bottom)
 
             card = drawn[0]
+            during_effect = self.phase is TurnPhase.RESOLVING_EFFECT
+            if not during_effect:
+                self.emit(ActionTaken(self.seat_of(player), "draw"))
+            self.emit(CardDrawn(self.seat_of(player), type(card).__name__, card.name, from_bottom=from_bottom,
+                                during_effect=during_effect))
             if isinstance(card, BombCatCard):
                 # 炸弹流程内部会自行结束回合或结束游戏，避免在此重复推进回合
                 self._handle_bomb_cat(player, card)
-                self.gui.update_gui()
+                self.gui.update_gui(("hands", "status"))
                 return True
             else:
                 player.hand.append(card)
-                if player.is_ai and not self.gui.debug_mode:
+                if player.is_ai and not self.debug_enabled:
                     self.gui.print(f"🤖 AI 完成抽牌")
                 else:
                     self.gui.print(f"🖐 {player.name} 抽到了 {card.name}")
-            self.gui.update_gui()
-
-            # 玩家回合结束，结束game._next_turn中的阻塞循环
-            if not player.is_ai:
-                self.player_turn_done = True
-            self._next_turn()  # 抽牌部分的回合结束
+            self.gui.update_gui(("hands", "status"))
+            self.phase = TurnPhase.SWITCHING_TURN  # 抽牌部分的回合结束
             return True
         else:
             self.gui.print("牌堆已空！")
@@ -327,46 +811,63 @@ class Game:
         if player.has_defuse():
             self.gui.print(f"🛠 {player.name} 使用拆除卡...")
 
-            defuse_card = next(c for c in player.hand if isinstance(c, DefuseCard))
+            defuse_card = player.hand.first(DefuseCard)
             player.hand.remove(defuse_card)
             self.deck.discard_pile.append(defuse_card)
 
             # 处理放回位置选择
             if player.is_ai:
-                pos = random.randint(0, len(self.deck.cards))
-                if not self.gui.debug_mode:
+                pos = self.rng.randint(0, len(self.deck.cards))
+                if not self.debug_enabled:
                     self.gui.print(f"🤖 AI 将炸弹猫放回牌堆某个位置")
                 else:
                     self.gui.print(f"[Debug] AI 将炸弹猫放回第 {pos} 位 (0~{len(self.deck.cards)})")
                 self.deck.insert_card(bomb_card, pos)
-                self.ai_on_insert_known(pos, bomb_card)
+                self.ai_on_insert_known(pos, bomb_card, player)
+                self.emit(BombDefused(self.seat_of(player), pos))
+                self._finish_defuse(player)
             else:
-                # GUI处理玩家选择
-                pos = self.gui.prompt_bomb_position(len(self.deck.cards))
-                if pos is not None:
-                    self.deck.insert_card(bomb_card, pos)
-                    self.ai_on_insert_unknown(pos)
-                else:
-                    # 默认放在随机位置
-                    pos = random.randint(0, len(self.deck.cards))
-                    self.gui.print(f"📌 随机将炸弹猫放回第 {pos} 位 (0~{len(self.deck.cards)})")
-                    self.deck.insert_card(bomb_card, pos)
-                    self.ai_on_insert_unknown(pos)
-
-            if self.remaining_turns >= 2:
-                self.gui.print(f"💣⏭️ {player.name} 剩余的 {self.remaining_turns - 1} 个回合立即结束")
-            self.end_turn = True
-            self.end_all_turn = True
-            self._next_turn()  # 拆炸弹后一定结束回合
+                # 玩家的选择通过决策请求异步回答
+                self.request_decision(CHOOSE_BOMB_POSITION, player,
+                                      lambda pos: self._return_bomb(player, bomb_card, pos),
+                                      max_pos=len(self.deck.cards))
 
         else:
             self.gui.print(f"💥 {player.name} 没有拆除卡！爆炸了！")
             player.alive = False  # 唯一的死亡入口
-            self.check_game_end()
+            self.ring.remove(player)
+            if self.noped is player:
+                self.noped = None
+            self.emit(PlayerExploded(self.seat_of(player)))
+            if not self.check_game_end():
+                # 多人对局：出局者剩余的回合作废，轮到下家
+                self.end_turn = True
+                self.end_all_turn = True
+                self.phase = TurnPhase.SWITCHING_TURN
+
+    def _return_bomb(self, player, bomb_card, pos):
+        """玩家拆弹后放回炸弹猫，pos为None时随机放回"""
+        if pos is None:
+            # 默认放在随机位置
+            pos = self.rng.randint(0, len(self.deck.cards))
+            self.gui.print(f"📌 随机将炸弹猫放回第 {pos} 位 (0~{len(self.deck.cards)})")
+        self.deck.insert_card(bomb_card, pos)
+        self.ai_on_insert_unknown(pos)
+        self.emit(BombDefused(self.seat_of(player), pos))
+        self._finish_defuse(player)
+
+    def _finish_defuse(self, player):
+        """拆炸弹后一定结束回合（包括剩余的所有回合）"""
+        if self.remaining_turns >= 2:
+            self.gui.print(f"💣⏭️ {player.name} 剩余的 {self.remaining_turns - 1} 个回合立即结束")
+        self.end_turn = True
+        self.end_all_turn = True
+        self.phase = TurnPhase.SWITCHING_TURN
 
     def _next_turn(self):
-        """结束回合，启动下一个回合"""
+        """结束回合，启动下一个回合（SWITCHING_TURN阶段的处理）"""
         prev_player = self.current_player
+        self.turns_played += 1
         self.end_turn = False
         # 抽到炸弹猫拆掉/打出SuperSkip 等，结束所有回合
         if self.end_all_turn:
@@ -379,30 +880,38 @@ class Game:
         # 消耗回合数后，检查是否换边
         if self.remaining_turns <= 0:
             self.remaining_turns = 1
-            self.current_player = self.get_other(self.current_player)
+            self.current_player = self.ring.next(self.current_player)
 
         self._advance_turn_counter(switched_player=(self.current_player != prev_player))
+        self.ai_played_this_turn = 0
+        self.ai_forbidden_next_type = None
+        self.phase = TurnPhase.AWAITING_ACTION
 
         # 先检查游戏是否已经结束！游戏已结束但多输出"─👤玩家回合─"的问题在这
         self.check_game_end()
-        self.gui.update_gui()
+        self.gui.update_gui(("status",))
 
 
 
-        # 如果游戏还在进行，切换到下一个玩家
-        # 如果游戏结束了，上面check_game_end其实不会拦截，只会显示游戏结束信息和禁用按钮，靠这里复核来截停AI回合（即不开始schedule_ai_turn）
-        if self.game_running and self.ai.alive and self.player.alive:
-            if self.current_player.is_ai:
-                self.gui.draw_button.config(state=tk.DISABLED)  # 这两个按钮在schedule_player_turn再中启用
-                self.gui.play_button.config(state=tk.DISABLED)
-                self.gui.print(f"\n────────── 🤖 AI回合 {self.get_turn_counter_text()} ──────────\n💡 AI 正在思考...")
-                self.print_debug_deck_snapshot()
-                self.gui.schedule_ai_turn()  # 唯一接入点！
-            else:
-                self.gui.print(f"\n────────── 👤 玩家回合 {self.get_turn_counter_text()} ──────────\n🧠 请出牌或抽牌...")
-                self.print_debug_deck_snapshot()
-                self.gui.draw_button.config(state=tk.NORMAL)
-                self.gui.play_button.config(state=tk.NORMAL)
+        # 如果游戏还在进行，宣布下一个行动方的回合；AI决策由驱动方通过step()执行
+        if self.game_running:
+            self._announce_turn()
+
+    def _announce_turn(self):
+        """发出回合开始事件并切换操作按钮"""
+        self._sync_turn_counter()
+        self.emit(TurnStarted(self.seat_of(self.current_player), max(1, self.turn_progress),
+                              max(self.turn_progress, self.turn_total)))
+        if self.current_player.is_ai:
+            self.gui.draw_button.config(state=tk.DISABLED)  # 这两个按钮在玩家回合开始时再启用
+            self.gui.play_button.config(state=tk.DISABLED)
+            self.gui.print("💡 AI 正在思考...")
+            self.print_debug_deck_snapshot()
+        else:
+            self.gui.print("🧠 请出牌或抽牌...")
+            self.print_debug_deck_snapshot()
+            self.gui.draw_button.config(state=tk.NORMAL)
+            self.gui.play_button.config(state=tk.NORMAL)
 
     def _sync_turn_counter(self):
         """同步回合计数器，确保回合内加回合时总回合数实时更新"""
@@ -433,25 +942,61 @@ class Game:
 
     def check_game_end(self):
         """检查游戏是否结束"""
-        # 用game_running来保证只能进来一次
-        if (not self.player.alive or not self.ai.alive) and self.game_running:
+        # 用game_running来保证只能进来一次；只剩一个（或没有）存活者时结束
+        if len(self.ring) <= 1 and self.game_running:
             self.game_running = False  # 停止game_running在前，否则在game_end中会被拦截！
+            self.phase = TurnPhase.GAME_OVER
+            survivor = self.winner
+            self.emit(GameOver(survivor.seat if survivor is not None else "draw"))
             self.gui.game_end()
             return True
         return False
 
+    @property
+    def winner(self):
+        """唯一的存活者；对局未分出胜负时为None"""
+        alive = [p for p in self.players if p.alive]
+        return alive[0] if len(alive) == 1 else None
+
     def get_other(self, player):
-        """获取对手实例"""
-        return self.ai if player == self.player else self.player
+        """获取对手实例：行动顺序中的下家（攻击、拒绝的目标）"""
+        return self.ring.next(player)
+
+
+REFRESH_PARTS = ("hands", "status", "log")  # update_gui可分别标记重绘的显示部分；日志通常由输出队列渲染，引擎只标记手牌与状态
+TURN_LOG_TITLES = {"player": "👤 玩家回合", "ai": "🤖 AI回合"}
+PRINT_BACKLOG_LIMIT = 1.5  # 日志节奏最多落后的秒数，超过后新消息不再追加间隔
+LOG_PAGE_TURNS = 5  # 日志栏滚动到顶部时一次载入的更早回合数
+BOMB_POSITION_WINDOW = 5  # 放回炸弹弹窗中随滑块移动的附近位置按钮数
+
+# 已结束回合的紧凑记录：blocks为((块标题, (行, ...)), ...)，只保留会显示的内容
+LogTurnRecord = namedtuple("LogTurnRecord", "role title blocks")
 
 
 class GUI:
     """图形用户界面类"""
 
-    def __init__(self, _root, debug_mode=False):
+    def __init__(self, _root, debug_mode=False, difficulty=None, recorder=None, journal=None, decks=1, profile=False):
         # 设置窗口属性
         self.root = _root
         self.debug_mode = debug_mode
+        self.profile_panel = None  # 热点计时汇总窗口
+        if profile:
+            profiler.PROFILER.enable()
+        self.difficulty = ai_behavior.get_difficulty(difficulty)
+        self.decks = decks  # 每局合并的牌副数
+        self.recorder = recorder  # 不为None时把每局写入对局档案
+        self.journal = journal  # 不为None时自动存档，下次启动可继续未完成的对局
+
+        # 合并刷新：被标记为需要重绘的部分、是否已安排空闲重绘、各控件上次设置的值
+        self._dirty = set()
+        self._refresh_scheduled = False
+        self._widget_state = {}
+
+        # 日志输出队列：(显示时刻, 消息, 滚动位置)，显示时刻单调不减；只在有待显示消息时安排刷新
+        self.print_queue = deque()
+        self._print_ready_at = 0.0  # 下一条消息最早的显示时刻
+        self._print_flush_id = None
 
         # UI组件
         self.player_cards = None  # 手牌文字所在的Label，是Label对象
@@ -466,15 +1011,21 @@ class GUI:
         self.player_status = None
         self.ai_status = None
         self.log_text = None
-        self.max_turn_logs = 10 if self.debug_mode else 5
-        self.log_turns = []
-        self.current_turn_log = None
+        self.max_turn_logs = 10 if self.debug_mode else 5  # 跟随最新日志时日志栏中保留的回合数
+        self.log_history = []  # 本局全部已结束回合的LogTurnRecord，不设上限
+        self.current_turn_log = None  # 进行中的回合，结束时压缩进log_history
+        self._log_view_start = 0  # 日志栏中第一个回合在log_history中的下标
+        self._log_view_end = 0  # 已写入日志栏的已结束回合数
+        self._rendered_live = None  # 已写入日志栏、仍可能追加内容的回合
+        self._log_scrollbar = None
+        self._log_loading = False
 
         # 按钮
         self.start_button = None
         self.quit_button = None
         self.draw_button = None
         self.play_button = None
+        self.difficulty_box = None
 
         # 初始化窗口
         self.window_width = 800
@@ -482,11 +1033,7 @@ class GUI:
         self.init_window()
 
         # 游戏引用
-        self.game = Game(gui=self)
-
-        # 初始化输出队列，启动线程
-        self.print_queue = queue.Queue()
-        self.root.after(50, self._process_print_queue)
+        self.game = Game(gui=self, difficulty=self.difficulty, decks=self.decks)
 
         # 欢迎文字
         welcome_text = (
@@ -514,10 +1061,19 @@ class GUI:
         """设置游戏引用"""
         # 解决Game和GUI类交叉依赖的解决方法！
         self.game = game
+        game.events.subscribe(lambda event: self._on_game_event(game, event))
         self.update_gui()
 
+    def _on_game_event(self, game, event):
+        """游戏事件与文字消息进入同一个输出队列，保证日志结构与文字的先后顺序一致"""
+        if game is not self.game:
+            return  # 已被替换的旧对局
+        if isinstance(event, DebugReasoning) and not self.debug_mode:
+            return
+        self._enqueue_output(event, 'end', delay=0)
+
     def print(self, message, debug=False, scroll='end', delay=0.2):
-        """提交输出申请到输出缓存池"""
+        """提交输出申请到输出缓存池，delay为这条消息显示后到下一条消息显示的间隔（秒）"""
         # 调试信息只在调试模式下输出
         if debug:
             if self.debug_mode:
@@ -526,7 +1082,16 @@ class GUI:
                 return
 
         if message:
-            self.print_queue.put((message, debug, scroll, delay))
+            self._enqueue_output(message, scroll, delay)
+
+    def _enqueue_output(self, item, scroll, delay):
+        """节奏调度：按delay错开显示时刻，不阻塞引擎；积压过多时不再追加间隔，避免日志越落越远"""
+        now = time.monotonic()
+        due = max(now, self._print_ready_at)
+        self._print_ready_at = due + delay if due - now < PRINT_BACKLOG_LIMIT else due
+        self.print_queue.append((due, item, scroll))
+        if self._print_flush_id is None:
+            self._schedule_print_flush(due - now)
 
         # self.log_text.config(state="normal")
         # self.log_text.tag_configure("center", justify="center")  # 定义居中标签
@@ -534,29 +1099,39 @@ class GUI:
         # self.log_text.see(scroll)
         # self.log_text.config(state="disabled")
 
+    def _schedule_print_flush(self, wait):
+        self._print_flush_id = self.root.after(max(0, int(wait * 1000)), self._process_print_queue)
+
+    def _clear_print_queue(self):
+        """丢弃尚未显示的消息（重新开始游戏时）"""
+        self.print_queue.clear()
+        self._print_ready_at = 0.0
+        if self._print_flush_id is not None:
+            self.root.after_cancel(self._print_flush_id)
+            self._print_flush_id = None
+
     def _process_print_queue(self):
-        """在主线程轮询输出队列并刷新日志栏"""
+        """显示已到显示时刻的消息并刷新日志栏，队列中还有消息时按下一条的显示时刻再次安排"""
+        self._print_flush_id = None
         need_render = False
         last_scroll = 'end'
-        while not self.print_queue.empty():
-            message, debug, scroll, delay = self.print_queue.get()
+        now = time.monotonic()
+        while self.print_queue and self.print_queue[0][0] <= now + 0.001:
+            _, item, scroll = self.print_queue.popleft()
             last_scroll = scroll
 
-            # 仅在终端输出系统级消息，避免刷出完整游戏日志
-            if self.debug_mode:
-                self._print_system_message_to_console(message)
-
             if hasattr(self, 'log_text') and self.log_text:
-                self._ingest_log_message(message)
+                if isinstance(item, GameEvent):
+                    self._ingest_event(item)
+                else:
+                    self._ingest_log_message(item)
                 need_render = True
 
-            self.print_queue.task_done()
-
         if need_render:
             self._render_structured_logs(scroll=last_scroll)
 
-        # 保持轮询，确保所有UI写操作都在Tk主线程执行
-        self.root.after(50, self._process_print_queue)
+        if self.print_queue:
+            self._schedule_print_flush(self.print_queue[0][0] - now)
 
     def _configure_log_tags(self):
         """配置结构化日志样式标签"""
@@ -580,32 +1155,27 @@ class GUI:
         self.log_text.tag_configure("system_body", foreground="#1B4332", font=("Microsoft YaHei", 11))
         self.log_text.tag_configure("system_section", foreground="#0E7A3F", font=("Microsoft YaHei", 11, "bold"))
 
-    @staticmethod
-    def _is_block_separator(line):
-        stripped = line.strip()
-        return bool(stripped) and "/" in stripped and all(c in "─-/" for c in stripped)
-
-    @staticmethod
-    def _parse_turn_header(line):
-        if "玩家回合" in line:
-            return "player", "👤 玩家回合"
-        if "AI回合" in line:
-            return "ai", "🤖 AI回合"
-        if "游戏结束" in line:
-            return "end", "🎮 游戏结束"
-        return None, None
-
-    def _start_turn_log(self, role, title):
+    def _start_turn_log(self, role, title, counter=None):
         turn = {
             "role": role,
             "title": title,
-            "counter_snapshot": self._get_role_counter_text(role),
-            "blocks": [[]]
+            "counter_snapshot": counter,
+            "blocks": [self._new_log_block()]
         }
-        self.log_turns.append(turn)
-        self.current_turn_log = turn
-        if len(self.log_turns) > self.max_turn_logs:
-            self.log_turns = self.log_turns[-self.max_turn_logs:]
+        previous, self.current_turn_log = self.current_turn_log, turn
+        if previous is not None:
+            self.log_history.append(self._compact_turn(previous))
+
+    def _compact_turn(self, turn):
+        """把结束的回合压缩为只读记录，之后只用于重新载入日志栏"""
+        blocks = tuple((self._get_block_title(block), tuple(block["lines"]))
+                       for block in turn["blocks"] if block["lines"])
+        return LogTurnRecord(turn["role"], self._render_turn_title(turn), blocks)
+
+    @staticmethod
+    def _new_log_block():
+        # 一个块对应一次出牌/抽牌行动，title由行动事件给出
+        return {"title": None, "action": False, "lines": []}
 
     def _get_role_counter_text(self, role):
         if not self.game:
@@ -634,109 +1204,217 @@ class GUI:
     def _append_log_line(self, line):
         if not self.current_turn_log:
             self._start_turn_log("system", "📣 系统消息")
+        self.current_turn_log["blocks"][-1]["lines"].append(line)
 
-        if not self.current_turn_log["blocks"]:
-            self.current_turn_log["blocks"].append([])
-
-        self.current_turn_log["blocks"][-1].append(line)
-
-    def _start_log_block(self):
+    def _begin_log_action(self, title=None):
+        """新的行动（或AI的新一轮思考）开始：当前块已有行动时另起一块"""
         if not self.current_turn_log:
-            return
-        if not self.current_turn_log["blocks"]:
-            self.current_turn_log["blocks"].append([])
-            return
-        if self.current_turn_log["blocks"][-1]:
-            self.current_turn_log["blocks"].append([])
+            self._start_turn_log("system", "📣 系统消息")
+        blocks = self.current_turn_log["blocks"]
+        if blocks[-1]["action"]:
+            blocks.append(self._new_log_block())
+        if title is not None:
+            blocks[-1]["title"] = title
+            blocks[-1]["action"] = True
+        return blocks[-1]
 
     def _ingest_log_message(self, message):
-        lines = [line.strip() for line in message.splitlines() if line.strip()]
-        for line in lines:
-            role, title = self._parse_turn_header(line)
-            if role:
-                self._start_turn_log(role, title)
-                continue
-
-            if self._is_block_separator(line):
-                self._start_log_block()
-                continue
-
-            self._append_log_line(line)
+        for line in message.splitlines():
+            if line.strip():
+                self._append_log_line(line.strip())
+
+    def _ingest_event(self, event):
+        """根据结构化事件组织回合与块，不解析显示文字"""
+        if isinstance(event, TurnStarted):
+            self._start_turn_log(event.seat, TURN_LOG_TITLES[event.seat], counter=event.counter)
+        elif isinstance(event, GameOver):
+            self._start_turn_log("end", "🎮 游戏结束")
+            if self.debug_mode:
+                print("[SYSTEM] 游戏结束")
+        elif isinstance(event, GameStarted):
+            if self.debug_mode:
+                print("[SYSTEM] 游戏开始")
+        elif isinstance(event, CardPlayed):
+            self._begin_log_action(self._clean_card_name(event.card_name))
+        elif isinstance(event, CardDrawn):
+            if not event.during_effect:
+                self._begin_log_action("抽牌")
+        elif isinstance(event, BombDefused):
+            if self.current_turn_log:
+                self.current_turn_log["blocks"][-1]["title"] = "拆弹"
+        elif isinstance(event, DebugReasoning):
+            block = self._begin_log_action()
+            block["lines"].extend(f"[Debug] {line}" for line in event.lines)
 
     @staticmethod
     def _clean_card_name(name):
         # 去掉卡名前面的emoji或符号，仅保留语义文字
         return re.sub(r"^[^\u4e00-\u9fffA-Za-z0-9]+", "", name).strip()
 
-    def _get_block_title(self, block):
-        if not block:
-            return "常规阶段"
-
-        block_text = "\n".join(block)
-
-        # 规则3：抽炸弹-拆除-放回优先归类为拆弹
-        if ("炸弹猫" in block_text and "使用拆除卡" in block_text and
-                ("将炸弹猫放回" in block_text or "默认将炸弹猫放回" in block_text)):
-            return "拆弹"
-
-
-        # 规则2.5：检测抽牌操作
-        if "抽到了" in block_text or "完成抽牌" in block_text:
-            return "抽牌"
-        # 规则2：有"使用了 某卡牌"时，标题取卡牌名
-        for line in block:
-            if "使用了" in line:
-                name = line.split("使用了", 1)[1].strip()
-                cleaned = self._clean_card_name(name)
-                if cleaned:
-                    return cleaned
-
-        # 规则1：其余都归常规阶段
-        return "常规阶段"
+    @staticmethod
+    def _get_block_title(block):
+        return block["title"] or "常规阶段"
 
     def _render_structured_logs(self, scroll='end'):
+        """
+        增量渲染日志：日志栏只保存视口附近的回合，已结束的回合不再重绘，只追加新行、新块和新回合，
+        并原地修补当前回合标题；跟随最新日志时从顶部裁掉超出max_turn_logs的回合，更早的回合在滚动到顶部时载入
+        """
+        following = self._log_following()
         self.log_text.config(state="normal")
-        self.log_text.delete("1.0", tk.END)
 
-        visible_turns = self.log_turns[-self.max_turn_logs:]
-        for idx, turn in enumerate(visible_turns):
-            role = turn["role"]
-            self.log_text.insert("end", f"{self._render_turn_title(turn)}\n", f"{role}_header")
-
-            for block in turn["blocks"]:
-                if not block:
-                    continue
-
-                if role == "system" or role == "end":
-                    for content in block:
-                        tag = "debug_body" if content.startswith("[Debug]") else f"{role}_body"
-                        if content in ("规则：", "说明：", "卡牌："):
-                            self.log_text.insert("end", f"  │ {content}\n", "system_section")
-                        else:
-                            self.log_text.insert("end", f"  │ {content}\n", tag)
-                    self.log_text.insert("end", "  └────────────────\n", f"{role}_block")
-                else:
-                    block_title = self._get_block_title(block)
-                    self.log_text.insert("end", f"  ├─ {block_title}\n", f"{role}_block")
-                    for content in block:
-                        tag = "debug_body" if content.startswith("[Debug]") else f"{role}_body"
-                        self.log_text.insert("end", f"  │ {content}\n", tag)
-                    self.log_text.insert("end", "  └────────────────\n", f"{role}_block")
-
-            # if idx < len(visible_turns) - 1:
-            #     self.log_text.insert("end", "\n✦──────────────✦\n\n", "turn_sep")
+        live = self._rendered_live
+        if live is not None and live is not self.current_turn_log:
+            # 上一个进行中的回合已结束：补完剩余内容，它在log_history中的记录即视为已写入
+            self._render_turn_increment(live, is_new=False)
+            self._rendered_live = None
+            self._log_view_end += 1
+        for index in range(self._log_view_end, len(self.log_history)):
+            self.log_text.mark_set(self._log_turn_mark(index), "end-1c")
+            self.log_text.mark_gravity(self._log_turn_mark(index), "left")
+            self._materialize_turn(self.log_history[index], "end")
+        self._log_view_end = len(self.log_history)
+        if self.current_turn_log is not None:
+            self._render_turn_increment(self.current_turn_log, is_new=self._rendered_live is None)
+            self._rendered_live = self.current_turn_log
+
+        if following:
+            self._trim_log_view()
+        if scroll != 'end' or following:
+            self.log_text.see(scroll)
+        self.log_text.config(state="disabled")
 
-        self.log_text.see(scroll)
+    @staticmethod
+    def _log_turn_mark(index):
+        return f"log_turn_{index}"
+
+    def _log_following(self):
+        """日志栏是否停在末尾；玩家向上翻看历史时不自动滚动也不裁剪"""
+        return self.log_text.yview()[1] >= 0.999
+
+    def _trim_log_view(self):
+        """从顶部删除超出max_turn_logs的回合（只删除其所占的文本段）"""
+        shown = self._log_view_end - self._log_view_start + (self._rendered_live is not None)
+        drop = min(shown - self.max_turn_logs, self._log_view_end - self._log_view_start)
+        if drop <= 0:
+            return
+        first = self._log_view_start + drop
+        self.log_text.delete("1.0", self._log_turn_mark(first))
+        self.log_text.mark_unset(*(self._log_turn_mark(i) for i in range(self._log_view_start, first)))
+        self._log_view_start = first
+
+    def _on_log_scroll(self, first, last):
+        """日志栏滚动回调：更新滚动条，滚动到顶部且还有更早的回合时安排载入"""
+        self._log_scrollbar.set(first, last)
+        if float(first) <= 0.0 and float(last) < 1.0 and self._log_view_start > 0 and not self._log_loading:
+            self._log_loading = True
+            self.root.after_idle(self._load_earlier_logs)
+
+    def _on_log_scroll_up(self):
+        """日志栏中向上滚动：已在顶部且还有更早的回合时安排载入"""
+        if self.log_text.yview()[0] <= 0.0 and self._log_view_start > 0 and not self._log_loading:
+            self._log_loading = True
+            self.root.after_idle(self._load_earlier_logs)
+
+    def _load_earlier_logs(self):
+        """在日志栏顶部载入更早的LOG_PAGE_TURNS个回合，并保持原先顶部的内容停在视口顶部"""
+        self._log_loading = False
+        if self._log_view_start <= 0:
+            return
+        start = max(0, self._log_view_start - LOG_PAGE_TURNS)
+        anchor = self._log_turn_mark(self._log_view_start)
+        self.log_text.config(state="normal")
+        self.log_text.mark_gravity(anchor, "right")  # 让载入的文字插在原先第一个回合之前
+        self.log_text.mark_set("log_insert", "1.0")
+        self.log_text.mark_gravity("log_insert", "right")
+        for index in range(start, self._log_view_start):
+            self.log_text.mark_set(self._log_turn_mark(index), "log_insert")
+            self.log_text.mark_gravity(self._log_turn_mark(index), "left")
+            self._materialize_turn(self.log_history[index], "log_insert")
+        self.log_text.mark_gravity(anchor, "left")
+        self.log_text.mark_unset("log_insert")
+        self._log_view_start = start
+        self.log_text.yview(anchor)
         self.log_text.config(state="disabled")
 
-    def _print_system_message_to_console(self, message):
-        """仅将关键系统消息输出到终端。"""
-        if "游戏开始！" in message:
-            print("[SYSTEM] 游戏开始")
-        elif "🎮 游戏结束" in message:
-            print("[SYSTEM] 游戏结束")
-        elif "感谢游玩" in message:
-            print("[SYSTEM] 感谢游玩")
+    def _materialize_turn(self, record, index):
+        """把一个已结束回合的记录写入日志栏的index处"""
+        role = record.role
+        self.log_text.insert(index, f"{record.title}\n", f"{role}_header")
+        for block_title, lines in record.blocks:
+            if role not in ("system", "end"):
+                self.log_text.insert(index, f"  ├─ {block_title}\n", f"{role}_block")
+            for content in lines:
+                self._insert_log_content(role, content, index)
+            self.log_text.insert(index, "  └────────────────\n", f"{role}_block")
+
+    def _render_turn_increment(self, turn, is_new):
+        """把一个回合尚未渲染的部分写入日志栏"""
+        role = turn["role"]
+        title = self._render_turn_title(turn)
+        if is_new:
+            turn["mark"] = self._log_turn_mark(len(self.log_history))  # 结束后在log_history中的下标
+            turn["rendered_title"] = title
+            turn["open_block"] = None  # 当前已写入日志栏、仍可能追加内容的块
+            turn["next_block"] = 0
+            self.log_text.mark_set(turn["mark"], "end-1c")
+            self.log_text.mark_gravity(turn["mark"], "left")
+            self.log_text.insert("end", f"{title}\n", f"{role}_header")
+        elif title != turn["rendered_title"]:
+            # 原地修补回合计数
+            turn["rendered_title"] = title
+            self.log_text.delete(turn["mark"], f"{turn['mark']} lineend")
+            self.log_text.insert(turn["mark"], title, f"{role}_header")
+
+        blocks = turn["blocks"]
+        if turn["open_block"] is not None:
+            block = blocks[turn["open_block"]]
+            lines = block["lines"]
+            if len(lines) > turn["open_lines"]:
+                for content in lines[turn["open_lines"]:]:
+                    self._insert_log_content(role, content, "log_block_tail")
+                turn["open_lines"] = len(lines)
+            if role not in ("system", "end"):
+                block_title = self._get_block_title(block)
+                if block_title != turn["open_title"]:
+                    turn["open_title"] = block_title
+                    self.log_text.delete("log_block_title", "log_block_title lineend")
+                    self.log_text.insert("log_block_title", f"  ├─ {block_title}", f"{role}_block")
+
+        index = turn["next_block"]
+        while index < len(blocks):
+            block = blocks[index]
+            if not block["lines"]:
+                if index == len(blocks) - 1:
+                    break  # 末尾的空块之后可能还会追加内容
+                index += 1
+                continue
+            self._open_log_block(turn, block)
+            turn["open_block"] = index
+            index += 1
+        turn["next_block"] = index
+
+    def _open_log_block(self, turn, block):
+        """在日志栏末尾写入一个新块，并记录其标题行与结尾线的位置以便后续追加"""
+        role = turn["role"]
+        if role not in ("system", "end"):
+            turn["open_title"] = self._get_block_title(block)
+            self.log_text.mark_set("log_block_title", "end-1c")
+            self.log_text.mark_gravity("log_block_title", "left")
+            self.log_text.insert("end", f"  ├─ {turn['open_title']}\n", f"{role}_block")
+        for content in block["lines"]:
+            self._insert_log_content(role, content, "end")
+        tail = self.log_text.index("end-1c")
+        self.log_text.insert("end", "  └────────────────\n", f"{role}_block")
+        self.log_text.mark_set("log_block_tail", tail)  # 默认右重力：在此处插入的内容位于结尾线之前
+        turn["open_lines"] = len(block["lines"])
+
+    def _insert_log_content(self, role, content, index):
+        if role in ("system", "end") and content in ("规则：", "说明：", "卡牌："):
+            tag = "system_section"
+        else:
+            tag = "debug_body" if content.startswith("[Debug]") else f"{role}_body"
+        self.log_text.insert(index, f"  │ {content}\n", tag)
 
     # noinspection SpellCheckingInspection
     def init_window(self):
@@ -777,7 +1455,11 @@ class GUI:
         scrollbar = ttk.Scrollbar(log_frame, command=self.log_text.yview)
         self.log_text.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
-        self.log_text.config(yscrollcommand=scrollbar.set, state="disabled")
+        self._log_scrollbar = scrollbar
+        self.log_text.config(yscrollcommand=self._on_log_scroll, state="disabled")
+        # 裁剪后的日志不足一屏时不会再有滚动回调，在顶部向上滚动滚轮时同样载入更早的回合
+        self.log_text.bind("<MouseWheel>", lambda e: self._on_log_scroll_up() if e.delta > 0 else None)
+        self.log_text.bind("<Button-4>", lambda e: self._on_log_scroll_up())  # X11的滚轮向上
         self._configure_log_tags()
 
         # 手牌区域
@@ -820,6 +1502,14 @@ class GUI:
                 btn = ttk.Button(frame, text=text, command=cmd, **opts)
                 setattr(self, attr, btn)
                 btn.pack(side="left", padx=5, expand=True)
+            if title == "游戏控制":
+                # AI难度选择放在游戏控制区
+                labels = [profile.label for profile in ai_behavior.DIFFICULTY_PROFILES.values()]
+                self.difficulty_box = ttk.Combobox(frame, values=labels, state="readonly", width=6)
+                self.difficulty_box.set(self.difficulty.label)
+                self.difficulty_box.bind("<<ComboboxSelected>>", lambda e: self.set_difficulty(self.difficulty_box.current()))
+                ttk.Label(frame, text="AI难度").pack(side="left", padx=(10, 2))
+                self.difficulty_box.pack(side="left", padx=5)
 
         def restart_game(event):
             """重启游戏"""
@@ -830,69 +1520,125 @@ class GUI:
             return event
         self.start_button.bind('<Button-3>', restart_game)  # 绑定右键单击开始键为重开游戏（仅在debug模式下有效）
         self.quit_button.bind('<Button-3>', lambda e: self.toggle_debug_mode())  # 绑定右键单击退出键为切换调试模式
-
-    def update_gui(self):
-        """更新所有显示"""
+        self.quit_button.bind('<Shift-Button-3>', lambda e: self.toggle_profiling() or "break")  # Shift+右键开关热点计时
+        self.root.bind('<F9>', lambda e: self.show_profile_panel())  # F9打开计时汇总
+
+    def update_gui(self, parts=REFRESH_PARTS):
+        """
+        标记需要刷新的显示部分，并合并到下一次空闲时统一重绘
+        引擎各处都会调用这里，实际重绘每帧最多一次，且不会在游戏逻辑中途重入事件循环
+        """
+        self._dirty.update(parts)
+        if not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            self.root.after_idle(self._refresh)
+
+    def _refresh(self):
+        """重绘被标记的部分，只改动内容发生变化的控件"""
+        self._refresh_scheduled = False
+        dirty, self._dirty = self._dirty, set()
         if not self.game:
             return
 
-        # 更新玩家和AI手牌
-        self.player_cards.configure(wraplength=680 if not self.debug_mode else 400)  # 规定玩家手牌区文字的强制换行长度 800//2=400
-        self.ai_cards.configure(wraplength=0 if not self.debug_mode else 350)  # 规定AI手牌区文字的强制换行长度
-
-        self.player_cards_var.set(f"数量: {len(self.game.player.hand)}张\n{self.game.player.hand_text()}")
-        self.ai_cards_var.set(f"数量: {len(self.game.ai.hand)}张{'\n'+self.game.ai.hand_text() if self.debug_mode else ""}")
-
-        # 更新游戏状态区的标签
-        current = "玩家" if self.game.current_player == self.game.player else "AI"
-        color = "blue" if self.game.current_player == self.game.player else "black"  # 红色字体表示玩家回合
-        self.turn_label.config(foreground=color, text=f"当前回合: {current} (剩余{self.game.remaining_turns}回合)")
-        self.deck_label.config(text=f"牌堆剩余: {len(self.game.deck.cards)}张")
-
-        bomb_prob = self.game.deck.amounts[BombCatCard] / len(self.game.deck.cards)
-        color = "darkred" if bomb_prob > 0.5 else "red" if bomb_prob > 0.4 else "orange" if bomb_prob > 0.3 else "green"
-        self.bomb_label.config(foreground=color, text=f"💣 {bomb_prob if bomb_prob <= 1 else 1:.1%}")
-
-        self.mode_label.config(text=f"游戏模式: {'Debug' if self.debug_mode else '正常'}")
-        player_status = "存活" if self.game.player.alive else "死亡"
-        ai_status = "存活" if self.game.ai.alive else "死亡"
-
-        self.player_status.config(text=f"玩家状态: {player_status}")
-        self.ai_status.config(text=f"AI状态: {ai_status}")
-
-        if self.current_turn_log:
+        if "hands" in dirty:
+            # 更新玩家和AI手牌
+            self._set_widget(self.player_cards, wraplength=680 if not self.debug_mode else 400)  # 规定玩家手牌区文字的强制换行长度 800//2=400
+            self._set_widget(self.ai_cards, wraplength=0 if not self.debug_mode else 350)  # 规定AI手牌区文字的强制换行长度
+            self._set_var(self.player_cards_var, f"数量: {len(self.game.player.hand)}张\n{self.game.player.hand_text()}")
+            ai_hand_text = "\n" + self.game.ai.hand_text() if self.debug_mode else ""
+            self._set_var(self.ai_cards_var, f"数量: {len(self.game.ai.hand)}张{ai_hand_text}")
+
+        if "status" in dirty:
+            # 更新游戏状态区的标签
+            current = "玩家" if self.game.current_player == self.game.player else "AI"
+            color = "blue" if self.game.current_player == self.game.player else "black"  # 红色字体表示玩家回合
+            self._set_widget(self.turn_label, foreground=color, text=f"当前回合: {current} (剩余{self.game.remaining_turns}回合)")
+            self._set_widget(self.deck_label, text=f"牌堆剩余: {len(self.game.deck.cards)}张")
+
+            bomb_prob = self.game.deck.bomb_count / max(1, len(self.game.deck.cards))
+            color = "darkred" if bomb_prob > 0.5 else "red" if bomb_prob > 0.4 else "orange" if bomb_prob > 0.3 else "green"
+            self._set_widget(self.bomb_label, foreground=color, text=f"💣 {bomb_prob if bomb_prob <= 1 else 1:.1%}")
+
+            self._set_widget(self.mode_label, text=f"游戏模式: {'Debug' if self.debug_mode else '正常'}")
+            player_status = "存活" if self.game.player.alive else "死亡"
+            ai_status = "存活" if self.game.ai.alive else "死亡"
+            self._set_widget(self.player_status, text=f"玩家状态: {player_status}")
+            self._set_widget(self.ai_status, text=f"AI状态: {ai_status}")
+
+        if "log" in dirty and self.current_turn_log:
             self._render_structured_logs()
 
-        self.root.update()
+    def _set_widget(self, widget, **options):
+        """仅在选项值变化时调用config"""
+        cached = self._widget_state.setdefault(str(widget), {})
+        changed = {key: value for key, value in options.items() if cached.get(key) != value}
+        if changed:
+            widget.config(**changed)
+            cached.update(changed)
+
+    def _set_var(self, var, value):
+        if self._widget_state.get(str(var)) != value:
+            var.set(value)
+            self._widget_state[str(var)] = value
 
     def start_game(self, no_ask=False):
         """启动新游戏/重新启动游戏"""
         if self.game.game_running:
             if no_ask or messagebox.askyesno("确认", "游戏正在进行，是否重新开始？"):
-                self.game = Game(gui=self)  # 初始化，但不重新创建GUI
+                self.game = Game(gui=self, difficulty=self.difficulty, decks=self.decks)  # 初始化，但不重新创建GUI
             else:
                 return
         elif not self.game.ai.alive or not self.game.player.alive:
-            self.game = Game(gui=self)
-
-        self.game.game_running = True  # 游戏这时才开始
+            self.game = Game(gui=self, difficulty=self.difficulty, decks=self.decks)
+        elif self.journal is not None and (saved := self.journal.load()) is not None:
+            if messagebox.askyesno("继续游戏", "发现上次未完成的对局，是否继续？"):
+                self.resume_game(saved)
+                return
 
-        # 清空日志
+        self._reset_log()
+
+        # 游戏这时才开始（game.start()会宣布第一个回合并启用玩家操作按钮）
+        if self.recorder is not None:
+            self.recorder.attach(self.game)
+        if self.journal is not None:
+            self.journal.attach(self.game)
+        self.print("[🐱 BombCat 炸弹猫]\n游戏开始！")
+        self.game.start()
+        self.update_gui(("hands", "status"))
+
+    def resume_game(self, saved):
+        """读档：从存档的最后一个快照恢复，再重新执行其后的行动，然后从存档时的位置继续驱动"""
+        # 按存档时的难度继续，难度选择框随之切换
+        self.difficulty = ai_behavior.get_difficulty(saved.meta.get("difficulty", self.difficulty.key))
+        if self.difficulty_box is not None:
+            self.difficulty_box.set(self.difficulty.label)
+        game = Game(gui=self, difficulty=self.difficulty, seed=saved.meta["seed"], decks=saved.meta.get("decks", 1),
+                    seats=tuple(saved.meta.get("seats", DEFAULT_SEATS)))
+        game.restore(saved.snapshot)
+        if self.recorder is not None:
+            # 档案中这局从存档快照开始，之后的行动（包括下面追赶的部分）照常记录，重放时从快照继续
+            self.recorder.attach(game, snapshot=saved.snapshot)
+        game.replay(saved.actions)
+        self._reset_log()  # 追赶存档期间产生的输出不再显示
+        self.journal.resume(game)
+        self.print("[🐱 BombCat 炸弹猫]\n已恢复上次未完成的对局！")
+        state = tk.NORMAL if game.awaiting_player() else tk.DISABLED
+        self.draw_button.config(state=state)
+        self.play_button.config(state=state)
+        self.update_gui(("hands", "status"))
+        self.drive_game()
+
+    def _reset_log(self):
+        """清空日志（包括尚未显示的消息）"""
+        self._clear_print_queue()
         self.log_text.config(state="normal")
         self.log_text.delete("1.0", tk.END)
+        self.log_text.mark_unset(*(self._log_turn_mark(i) for i in range(self._log_view_start, self._log_view_end + 1)))
         self.log_text.config(state="disabled")
-        self.log_turns = []
+        self.log_history = []
         self.current_turn_log = None
-
-        # 启用玩家操作按钮
-        self.draw_button.config(state=tk.NORMAL)
-        self.play_button.config(state=tk.NORMAL)
-        # self.start_button.config(state=tk.DISABLED)
-
-        # 更新初始界面
-        self.print(f"[🐱 BombCat 炸弹猫]\n游戏开始！\n\n────────── 👤 玩家回合 {self.game.get_turn_counter_text()} ──────────\n🧠 请出牌或抽牌...")
-        self.game.print_debug_deck_snapshot()
-        self.update_gui()
+        self._log_view_start = self._log_view_end = 0
+        self._rendered_live = None
 
     def player_draw(self):
         """处理玩家抽牌"""
@@ -903,11 +1649,12 @@ class GUI:
             messagebox.showinfo("提示", "❌ 现在不是你的回合！")
             return
 
-        if len(self.game.player.hand) >= self.game.player.hand_limit:
+        if not self.game.can_draw(self.game.player):
             messagebox.showinfo("提示", f"🈵 手牌已满 (上限为{self.game.player.hand_limit}张)，请先出牌！")
             return
 
         self.game.draw_card(self.game.player)
+        self.drive_game()
 
     def player_play(self):
         """处理玩家出牌"""
@@ -959,10 +1706,10 @@ class GUI:
 
             # 先关闭“选择卡牌”窗口，再执行出牌。
             # 避免抽底触发炸弹时，后续“选择位置”弹窗被前一个grab_set窗口阻塞。
-            self.root.after_idle(lambda: self.game.play_card(self.game.player, selected_card))
-
-            # 成功出卡、用卡不一定表示玩家回合结束，不能在这里结束game._next_turn中的阻塞循环
-            # 所以在game.play_card中结束game._next_turn中的阻塞循环
+            def play():
+                self.game.play_card(self.game.player, selected_card)
+                self.drive_game()
+            self.root.after_idle(play)
 
         # 绑定双击列表的事件
         card_list.bind('<Double-1>', lambda e: use_selected_card())
@@ -973,6 +1720,13 @@ class GUI:
         tk.Button(btn_frame, text="确认", command=use_selected_card, width=10, height=5).pack(side="left", padx=10, expand=True)
         tk.Button(btn_frame, text="取消", command=dialog.destroy, width=10, height=5).pack(side="right", padx=10, expand=True)
 
+    def set_difficulty(self, index):
+        """切换AI难度，立即作用于当前对局"""
+        self.difficulty = list(ai_behavior.DIFFICULTY_PROFILES.values())[index]
+        if self.game:
+            self.game.difficulty = self.difficulty
+        self.print(f"⚙️ AI 难度切换为 {self.difficulty.label}（每步 {self.difficulty.time_budget_ms:.0f}ms）")
+
     def toggle_debug_mode(self, config=None):
         """切换调试模式"""
         if config is not None:
@@ -980,18 +1734,95 @@ class GUI:
         else:
             self.debug_mode = not self.debug_mode
         self.max_turn_logs = 10 if self.debug_mode else 5
-        if len(self.log_turns) > self.max_turn_logs:
-            self.log_turns = self.log_turns[-self.max_turn_logs:]
-        self.update_gui()
+        self.update_gui(("hands", "status"))
         print(f"[Debug] Debug模式{'开启' if self.debug_mode else '关闭'}")
         messagebox.showinfo("Debug模式", f"Debug模式{'开启' if self.debug_mode else '关闭'}")
 
-    def prompt_bomb_position(self, max_pos):
-        """提示玩家选择炸弹猫放回位置"""
+    def toggle_profiling(self):
+        """开关热点计时，开启时同时打开汇总面板"""
+        enabled = profiler.PROFILER.toggle()
+        self.print(f"⏱️ 热点计时{'开启' if enabled else '关闭'}（F9 查看汇总）")
+        if enabled:
+            self.show_profile_panel()
+
+    def show_profile_panel(self):
+        """计时汇总面板：每秒刷新一次，按自身耗时排序"""
+        if self.profile_panel is not None and self.profile_panel.winfo_exists():
+            self.profile_panel.lift()
+            return
+        prof = profiler.PROFILER
+        panel = self.profile_panel = tk.Toplevel(self.root)
+        panel.title("热点计时")
+        panel.geometry("760x360")
+
+        summary_var = tk.StringVar()
+        tk.Label(panel, textvariable=summary_var, anchor="w").pack(fill="x", padx=10, pady=(8, 2))
+        columns = (("calls", "调用", 70), ("total", "累计ms", 90), ("own", "自身ms", 90),
+                   ("mean", "平均ms", 80), ("max", "最大ms", 80), ("share", "占比", 60))
+        tree = ttk.Treeview(panel, columns=[key for key, _, _ in columns], height=12)
+        tree.heading("#0", text="函数")
+        tree.column("#0", width=260)
+        for key, text, width in columns:
+            tree.heading(key, text=text)
+            tree.column(key, width=width, anchor="e")
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
+
+        def export():
+            path = f"profile-{time.strftime('%Y%m%d-%H%M%S')}.json"
+            prof.dump(path)
+            self.print(f"⏱️ 计时数据已导出到 {path}")
+
+        btn_frame = tk.Frame(panel)
+        btn_frame.pack(fill="x", pady=5)
+        toggle_button = tk.Button(btn_frame, width=10, command=lambda: (prof.toggle(), refresh(reschedule=False)))
+        toggle_button.pack(side="left", padx=10)
+        tk.Button(btn_frame, text="重置", width=10, command=lambda: (prof.reset(), refresh(reschedule=False))).pack(side="left", padx=10)
+        tk.Button(btn_frame, text="导出", width=10, command=export).pack(side="left", padx=10)
+        tk.Button(btn_frame, text="关闭", width=10, command=panel.destroy).pack(side="right", padx=10)
+
+        def refresh(reschedule=True):
+            if not panel.winfo_exists():
+                return
+            wall = prof.wall_time
+            summary_var.set(f"{'计时中' if prof.enabled else '已暂停'} | 计时 {wall:.1f}s"
+                            + ("" if prof.enabled else "（Shift+右键 [退出游戏] 或下方按钮开启）"))
+            toggle_button.config(text="暂停" if prof.enabled else "开始")
+            tree.delete(*tree.get_children())
+            for stat in prof.stats():
+                tree.insert("", tk.END, text=stat.name, values=(
+                    stat.calls, f"{stat.total * 1e3:.1f}", f"{stat.own * 1e3:.1f}", f"{stat.mean * 1e3:.3f}",
+                    f"{stat.max * 1e3:.2f}", f"{stat.own / wall:.1%}" if wall else "-"))
+            if reschedule:
+                panel.after(1000, refresh)
+
+        refresh()
+
+    def request_decision(self, request):
+        """回答引擎的决策请求：打开对应的非阻塞对话框，确认或取消时回答请求并继续驱动"""
+        if request.kind == CHOOSE_BOMB_POSITION:
+            self.prompt_bomb_position(request)
+        elif request.kind == CHOOSE_ORDER:
+            self.prompt_alter_future(request)
+        else:
+            request.answer(None)
+            self.drive_game()
+
+    def _answer_decision(self, request, value, dialog=None):
+        """回答请求并关闭对话框，随后继续推进状态机"""
+        if dialog is not None:
+            dialog.destroy()
+        if request.answered:
+            return
+        request.answer(value)
+        self.drive_game()
+
+    def prompt_bomb_position(self, request):
+        """提示玩家选择炸弹猫放回位置（不阻塞，选择结果通过request回答）"""
+        max_pos = request.max_pos
         total_positions = max_pos + 1
-        result = {"pos": None, "rank": None}
         selected_rank = {"value": None}
         position_buttons = []
+        window_buttons = []  # 滑块附近的几个位置：同一组按钮随滑块移动改写，不按牌堆大小创建
         rank_entry = None
 
         def rank_to_pos(rank):
@@ -1014,13 +1845,22 @@ class GUI:
             selected_rank["value"] = rank
             if rank_entry is not None:
                 rank_entry.delete(0, tk.END)
-            for btn_rank, btn in position_buttons:
+            for btn_rank, btn in position_buttons + window_buttons:
                 btn.config(bg="lightblue" if btn_rank == rank else "SystemButtonFace")
 
+        def show_window(center):
+            """把附近位置按钮移到以center为中心的一段"""
+            first = max(1, min(center - len(window_buttons) // 2, total_positions - len(window_buttons) + 1))
+            for i, (_, btn) in enumerate(window_buttons):
+                rank = first + i
+                window_buttons[i] = (rank, btn)
+                btn.config(text=rank_label(rank), command=lambda r=rank: select_rank(r),
+                           bg="lightblue" if rank == selected_rank["value"] else "SystemButtonFace")
+
+
         def confirm_rank(rank):
-            result["rank"] = rank
-            result["pos"] = rank_to_pos(rank)
-            dialog.destroy()
+            self.print(f"📌 将炸弹猫放回从上到下{rank_label(rank)}")
+            self._answer_decision(request, rank_to_pos(rank), dialog)
 
         def confirm_selection(event=None):
             value = rank_entry.get().strip() if rank_entry is not None else ""
@@ -1054,7 +1894,7 @@ class GUI:
         dialog.transient(self.root)
         dialog.grab_set()
 
-        height = 350 if max_pos > 6 else max(250, 145 + total_positions * 34)
+        height = 350 + 50 + BOMB_POSITION_WINDOW * 34 if max_pos > 6 else max(250, 145 + total_positions * 34)
         dialog.geometry(f"360x{height}")
 
         self.root.update_idletasks()
@@ -1097,6 +1937,18 @@ class GUI:
             rank_entry.bind("<Return>", confirm_selection)
             rank_entry.focus_set()
 
+            # 大牌堆：拖动滑块移动附近位置按钮，松开时选中滑块所指的位置
+            slider_var = tk.IntVar(value=(total_positions + 1) // 2)
+            slider = tk.Scale(deck_frame, from_=1, to=total_positions, orient="horizontal", variable=slider_var,
+                              command=lambda value: show_window(int(float(value))))
+            slider.grid(row=deck_frame.grid_size()[1], column=0, sticky="ew")
+            slider.bind("<ButtonRelease-1>", lambda event: select_rank(slider_var.get()))
+            for _ in range(BOMB_POSITION_WINDOW):
+                btn = tk.Button(deck_frame, width=32, height=1, anchor="center", justify="center")
+                btn.grid(row=deck_frame.grid_size()[1], column=0, sticky="ew", pady=2)
+                window_buttons.append((None, btn))
+            show_window(slider_var.get())
+
             for rank in range(total_positions - 2, total_positions + 1):
                 add_position_button(rank)
         else:
@@ -1106,28 +1958,115 @@ class GUI:
         btn_frame = tk.Frame(dialog)
         btn_frame.pack(fill="x", pady=(2, 10))
         tk.Button(btn_frame, text="确认", command=confirm_selection, width=12, height=1).pack(side="left", padx=(24, 8), expand=True)
-        tk.Button(btn_frame, text="随机位置", command=dialog.destroy, width=12, height=1).pack(side="right", padx=(8, 24), expand=True)
+        def choose_random():
+            self._answer_decision(request, None, dialog)
+
+        tk.Button(btn_frame, text="随机位置", command=choose_random, width=12, height=1).pack(side="right", padx=(8, 24), expand=True)
+
+        dialog.bind("<Escape>", lambda event: choose_random())
+        dialog.protocol("WM_DELETE_WINDOW", choose_random)
+
+    def prompt_alter_future(self, request):
+        """提示玩家重新排列牌堆顶的牌（从上到下，不阻塞），取消时回答None"""
+        top_cards = list(request.cards)
+        top_count = len(top_cards)
+
+        # 创建卡牌选择对话框
+        dialog = tk.Toplevel(self.root)
+        dialog.title("重新排序卡牌")
+        dialog.geometry(f"300x{300 if top_count <= 3 else 400}")  # 根据看3张还是5张决定菜单高度
+        dialog.transient(self.root)
+        dialog.grab_set()
 
-        dialog.bind("<Escape>", lambda event: dialog.destroy())
-        dialog.wait_window()
+        # 在主窗口上居中显示对话框
+        x = self.root.winfo_x() + self.root.winfo_width() // 2 - 200
+        y = self.root.winfo_y() + self.root.winfo_height() // 2 - 150
+        dialog.geometry(f"+{x}+{y}")
 
-        if result["pos"] is not None:
-            self.print(f"📌 将炸弹猫放回从上到下{rank_label(result['rank'])}")
-        return result["pos"]
+        tk.Label(dialog, text="🔄 点击两张卡牌互换其位置（顺序为从上到下）：").pack(pady=10)
+
+        # 创建卡牌框架
+        cards_frame = tk.Frame(dialog)
+        cards_frame.grid_columnconfigure(0, weight=1)
+        cards_frame.pack(fill="both", expand=True, padx=20, pady=10)
+
+        # 卡牌按钮和顺序
+        card_btns = []
+        selected_index = [None]  # 使用列表存储选中的索引，便于在函数间共享
+
+        # 更新卡牌显示顺序
+        def update_card_display():
+            for i, _btn in enumerate(card_btns):
+                _btn.config(text=f"{i + 1}. {top_cards[i].name}")
+                _btn.grid(row=i, column=0, sticky="ew", pady=2)
+
+        # 点击卡牌处理
+        def on_card_click(index):
+            first_idx = selected_index[0] if selected_index[0] is not None else index
+            if selected_index[0] is None:
+                # 选择第一张卡
+                selected_index[0] = index
+                card_btns[index].config(bg="lightblue")
+            else:
+                # 交换两张卡
+                top_cards[first_idx], top_cards[index] = top_cards[index], top_cards[first_idx]
+                card_btns[first_idx].config(bg="SystemButtonFace")
+                selected_index[0] = None
+                update_card_display()
+
+        # 创建卡牌按钮
+        for i in range(top_count):
+            btn = tk.Button(cards_frame,
+                            text=f"{i + 1}. {top_cards[i].name}",
+                            width=30, height=2,
+                            anchor="center", justify="center",
+                            command=lambda idx=i: on_card_click(idx))
+            btn.grid(row=i, column=0, sticky="ew", pady=2)
+            card_btns.append(btn)
+
+        def on_confirm():
+            self._answer_decision(request, top_cards, dialog)
+
+        def on_cancel():
+            self._answer_decision(request, None, dialog)
+
+        # 按钮框架
+        btn_frame = tk.Frame(dialog)
+        btn_frame.pack(fill="x", pady=10)
+
+        tk.Button(btn_frame, text="确认", command=on_confirm).pack(side="left", padx=20, expand=True)
+        tk.Button(btn_frame, text="取消", command=on_cancel).pack(side="right", padx=20, expand=True)
+        dialog.protocol("WM_DELETE_WINDOW", on_cancel)
+
+    def drive_game(self):
+        """
+        驱动回合状态机：立即推进换边与决策请求，轮到AI时延迟调度其决策，
+        轮到玩家行动、等待对话框回答或游戏结束时停下，等待按钮事件再次驱动
+        """
+        game = self.game
+        while not (game.phase is TurnPhase.AWAITING_ACTION and game.current_player.is_ai):
+            if not game.step():
+                return
+        if game.game_running:
+            self.schedule_ai_turn()
 
     def schedule_ai_turn(self):
-        """安排AI回合"""
+        """安排AI的下一次决策：回合开始时延迟2秒，同一回合内的后续出牌紧接执行"""
+        game = self.game
+        delay = 2000 if game.ai_played_this_turn == 0 else 300
 
-        self.root.after(2000, self.game.ai_turn)  # 延迟后执行AI回合
-        # self.game.run_ai_turn()
+        def run():
+            if game is not self.game:
+                return  # 期间已重新开始游戏
+            game.step()
+            self.drive_game()
+        self.root.after(delay, run)
 
     def game_end(self):
         """游戏结束处理"""
         if not self.game or self.game.game_running:
             return
 
-        self.print("\n────────── 🎮 游戏结束 ──────────")
-
         if self.game.player.alive and not self.game.ai.alive:
             self.print("🎉 恭喜！玩家获胜！")
             messagebox.showinfo("游戏结束", "你赢了！")
@@ -1139,13 +2078,15 @@ class GUI:
             messagebox.showinfo("游戏结束", "平局！")
 
         self.print("🎉 感谢游玩！按 [开始游戏] 重新开始或 [退出游戏] 退出...")
+        if self.debug_mode:
+            print("[SYSTEM] 感谢游玩")
 
         # 禁用游戏操作按钮
         self.draw_button.config(state=tk.DISABLED)
         self.play_button.config(state=tk.DISABLED)
         self.start_button.config(state=tk.NORMAL)
         # 禁用操作按钮之后，如果是玩家回合已经无法进行；
-        # 如果是AI回合，则会因为game_running=False导致_end_turn最后的schedule_ai_turn执行不到，也无法进行
+        # 如果是AI回合，则状态机已进入GAME_OVER，drive_game不会再调度AI决策
 
     def quit_game(self):
         """退出游戏"""
@@ -1153,11 +2094,31 @@ class GUI:
             self.root.destroy()
 
 
-def main():
+profiler.register(Game, "play_card", "draw_card", "_next_turn")
+profiler.register(GUI, "update_gui", "_refresh", "_render_structured_logs")
+
+
+def main(argv=None):
     """主函数"""
+    parser = argparse.ArgumentParser(description="BombCat 炸弹猫")
+    parser.add_argument("--record", metavar="DIR", default=None, help="把每局写入对局档案目录")
+    parser.add_argument("--save", metavar="PATH", default=DEFAULT_SAVE_PATH, help="自动存档文件")
+    parser.add_argument("--no-save", action="store_true", help="不自动存档")
+    parser.add_argument("--decks", type=int, default=1, help="合并几副牌（聚会 / 大牌堆玩法）")
+    parser.add_argument("--profile", action="store_true", help="启动时开启热点计时（F9 查看汇总）")
+    args = parser.parse_args(argv)
+
+    recorder = GameRecorder(args.record) if args.record else None
+    journal = None if args.no_save else GameJournal(args.save)
     root = tk.Tk()
-    GUI(root, debug_mode=False)
-    root.mainloop()
+    GUI(root, debug_mode=False, recorder=recorder, journal=journal, decks=max(1, args.decks), profile=args.profile)
+    try:
+        root.mainloop()
+    finally:
+        if recorder is not None:
+            recorder.close()
+        if journal is not None:
+            journal.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,306 @@
+"""
+运行指标
+GameMetrics挂到Game上（game.metrics），从事件流统计对局数、每局回合数、炸弹淘汰发生的回合，
+AI在ai_control结束时上报决策耗时与搜索去重（同类型同分值的牌只展开一次）的命中 / 未命中次数；没挂载时引擎与AI只多一次属性判断。
+每个进程由后台线程定期把自己的快照原子写入指标目录（metrics-<主机>-<进程号>.json），对局事件与事件循环中不做文件读写；汇总时合并目录下全部快照：
+计数与直方图各桶相加，再导出为Prometheus文本格式，附局/秒与决策耗时分位数等派生值。
+
+用法：
+    python headless.py --games 5000 --metrics-dir metrics &     # 可同时启动多个工作进程
+    python server.py serve --metrics-dir metrics --metrics-port 9464
+    python metrics.py serve metrics --port 9464                 # 汇总目录下全部进程，http://127.0.0.1:9464/metrics
+    python metrics.py show metrics                              # 输出一次汇总
+"""
+import argparse
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from events import GameOver, PlayerExploded
+
+
+FLUSH_INTERVAL = 5.0  # 秒，后台线程写出快照的间隔
+STALE_FLUSHES = 3  # 快照超过这么多个写出间隔没有更新时视为进程已退出，不计入进程数与局/秒
+PREFIX = "bombcat_"
+TURN_BUCKETS = (5, 10, 15, 20, 25, 30, 40, 50, 75, 100, 150, 200)
+DECISION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUANTILES = (0.5, 0.9, 0.99)
+
+# 名称 -> (类型, 说明)；直方图的桶见_BUCKETS
+_METRICS = {
+    "games_total": ("counter", "结束的对局数"),
+    "ai_decisions_total": ("counter", "AI决策次数"),
+    "search_cache_hits_total": ("counter", "搜索展开时同类型同分值的牌被去重跳过的次数"),
+    "search_cache_misses_total": ("counter", "搜索展开时实际模拟的次数"),
+    "turns_per_game": ("histogram", "每局回合数"),
+    "ai_decision_seconds": ("histogram", "一次AI决策（ai_control）的耗时"),
+    "bomb_death_turn": ("histogram", "玩家被炸弹淘汰时处于第几回合"),
+}
+_BUCKETS = {"turns_per_game": TURN_BUCKETS, "ai_decision_seconds": DECISION_BUCKETS,
+            "bomb_death_turn": TURN_BUCKETS}
+
+
+def _empty_histogram(bounds):
+    return {"buckets": list(bounds), "counts": [0] * (len(bounds) + 1), "sum": 0.0, "count": 0}
+
+
+class GameMetrics:
+    """一个进程的指标；AI决策可能在服务器的线程池中上报，全部更新在锁内进行"""
+
+    def __init__(self, directory=None, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.path = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.path = os.path.join(directory, f"metrics-{socket.gethostname()}-{os.getpid()}.json")
+        self.started = time.time()
+        self.counters = {name: 0 for name, (kind, _) in _METRICS.items() if kind == "counter"}
+        self.histograms = {name: _empty_histogram(bounds) for name, bounds in _BUCKETS.items()}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 后台线程与close()的最后一次写出可能同时进行
+        self._stopped = threading.Event()
+        self._flusher = None
+        if self.path:
+            self._flusher = threading.Thread(target=self._flush_loop, name="bombcat-metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def attach(self, game):
+        """挂到一局Game上：之后这局的对局结束、炸弹淘汰与AI决策都计入本进程指标"""
+        game.metrics = self
+        game.events.subscribe(lambda event: self._on_event(game, event))
+
+    def _on_event(self, game, event):
+        if isinstance(event, PlayerExploded):
+            with self._lock:
+                self._observe("bomb_death_turn", game.turns_played + 1)
+        elif isinstance(event, GameOver):
+            with self._lock:
+                self.counters["games_total"] += 1
+                self._observe("turns_per_game", game.turns_played)
+
+    def observe_decision(self, seconds, cache_hits=0, cache_misses=0):
+        """ai_control的上报点"""
+        with self._lock:
+            self.counters["ai_decisions_total"] += 1
+            self.counters["search_cache_hits_total"] += cache_hits
+            self.counters["search_cache_misses_total"] += cache_misses
+            self._observe("ai_decision_seconds", seconds)
+
+    def _observe(self, name, value):
+        hist = self.histograms[name]
+        hist["counts"][bisect_left(hist["buckets"], value)] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "host": socket.gethostname(),
+                "pid": os.getpid(),
+                "started": self.started,
+                "updated": time.time(),
+                "flush_interval": self.flush_interval,
+                "counters": dict(self.counters),
+                "histograms": {name: {**hist, "counts": list(hist["counts"])} for name, hist in self.histograms.items()},
+            }
+
+    def _flush_loop(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                pass  # 目录暂时不可写时下一轮再试
+
+    def close(self):
+        """停止后台写出并写出最后一次快照"""
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def flush(self):
+        """把快照原子写入指标目录：每次写入独立的临时文件再替换，汇总方不会读到半个文件"""
+        if not self.path:
+            return
+        with self._flush_lock:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".metrics-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self.snapshot(), f)
+                os.chmod(tmp, 0o644)  # mkstemp建立的文件只有本用户可读，汇总方可能以其他用户运行
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+
+def load_snapshots(directory, exclude=None):
+    """读取目录下各进程写出的快照；exclude为需要跳过的文件（进程自己的快照以内存中的为准）"""
+    snapshots = []
+    if not directory or not os.path.isdir(directory):
+        return snapshots
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not (name.startswith("metrics-") and name.endswith(".json")) or path == exclude:
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # 正在被替换或已损坏的文件下次再读
+    return snapshots
+
+
+def is_live(snap, now=None):
+    """快照在最近几个写出间隔内更新过：对应的进程仍在运行"""
+    now = time.time() if now is None else now
+    return now - snap["updated"] <= STALE_FLUSHES * snap.get("flush_interval", FLUSH_INTERVAL)
+
+
+def merge(snapshots, now=None):
+    """
+    合并多个进程的快照：计数与各桶相加（已退出进程的对局仍计入总数）；
+    进程数与局/秒只统计仍在运行的进程，局/秒为各进程自身启动以来的平均值之和
+    """
+    merged = {"processes": 0, "games_per_second": 0.0, "started": None, "updated": None,
+              "counters": {name: 0 for name, (kind, _) in _METRICS.items() if kind == "counter"},
+              "histograms": {name: _empty_histogram(bounds) for name, bounds in _BUCKETS.items()}}
+    for snap in snapshots:
+        merged["started"] = min(filter(None, (merged["started"], snap["started"])))
+        merged["updated"] = max(filter(None, (merged["updated"], snap["updated"])))
+        if is_live(snap, now):
+            merged["processes"] += 1
+            elapsed = snap["updated"] - snap["started"]
+            if elapsed > 0:
+                merged["games_per_second"] += snap["counters"].get("games_total", 0) / elapsed
+        for name, value in snap["counters"].items():
+            if name in merged["counters"]:
+                merged["counters"][name] += value
+        for name, hist in snap["histograms"].items():
+            target = merged["histograms"].get(name)
+            if target is None or target["buckets"] != hist["buckets"]:
+                continue  # 桶边界不同的旧版本快照无法相加
+            target["counts"] = [a + b for a, b in zip(target["counts"], hist["counts"])]
+            target["sum"] += hist["sum"]
+            target["count"] += hist["count"]
+    return merged
+
+
+def histogram_quantile(hist, q):
+    """按桶内线性插值估计分位数（与Prometheus的histogram_quantile相同的估计方式）"""
+    if not hist["count"]:
+        return 0.0
+    rank = q * hist["count"]
+    seen = 0
+    lower = 0.0
+    for bound, count in zip((*hist["buckets"], None), hist["counts"]):
+        if seen + count >= rank and count:
+            if bound is None:
+                return lower  # 落在+Inf桶，只能给出最大的有限边界
+            return lower + (bound - lower) * (rank - seen) / count
+        seen += count
+        lower = bound if bound is not None else lower
+    return lower
+
+
+def _format_bound(bound):
+    return f"{bound:g}"
+
+
+def render(merged):
+    """合并后的指标 -> Prometheus文本格式"""
+    lines = []
+
+    def header(name, kind, text):
+        lines.append(f"# HELP {PREFIX}{name} {text}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    for name, (kind, text) in _METRICS.items():
+        header(name, kind, text)
+        if kind == "counter":
+            lines.append(f"{PREFIX}{name} {merged['counters'][name]}")
+            continue
+        hist = merged["histograms"][name]
+        cumulative = 0
+        for bound, count in zip(hist["buckets"], hist["counts"]):
+            cumulative += count
+            lines.append(f'{PREFIX}{name}_bucket{{le="{_format_bound(bound)}"}} {cumulative}')
+        lines.append(f'{PREFIX}{name}_bucket{{le="+Inf"}} {hist["count"]}')
+        lines.append(f"{PREFIX}{name}_sum {hist['sum']:.6f}")
+        lines.append(f"{PREFIX}{name}_count {hist['count']}")
+
+    # 派生值：便于不经查询语言直接读取
+    counters = merged["counters"]
+    lookups = counters["search_cache_hits_total"] + counters["search_cache_misses_total"]
+    header("processes", "gauge", "仍在运行（快照最近有更新）的进程数")
+    lines.append(f"{PREFIX}processes {merged['processes']}")
+    header("games_per_second", "gauge", "仍在运行的各进程自身启动以来平均局/秒之和")
+    lines.append(f"{PREFIX}games_per_second {merged['games_per_second']:.3f}")
+    header("search_cache_hit_ratio", "gauge", "搜索去重命中率")
+    lines.append(f"{PREFIX}search_cache_hit_ratio {counters['search_cache_hits_total'] / lookups if lookups else 0.0:.4f}")
+    header("ai_decision_latency_seconds", "gauge", "由直方图估计的AI决策耗时分位数")
+    for q in QUANTILES:
+        value = histogram_quantile(merged["histograms"]["ai_decision_seconds"], q)
+        lines.append(f'{PREFIX}ai_decision_latency_seconds{{quantile="{q:g}"}} {value:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+def collect(metrics=None, directory=None):
+    """本进程的实时指标与目录中其他进程的快照合并后导出"""
+    own = metrics.path if metrics is not None else None
+    snapshots = load_snapshots(directory or (metrics.directory if metrics is not None else None), exclude=own)
+    if metrics is not None:
+        snapshots.append(metrics.snapshot())
+    return render(merge(snapshots))
+
+
+def serve(port, metrics=None, directory=None, host="127.0.0.1"):
+    """在后台线程提供/metrics文本接口，默认只监听本机；返回HTTP服务器对象（shutdown()停止）"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = collect(metrics, directory).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="bombcat-metrics", daemon=True).start()
+    return httpd
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BombCat 运行指标汇总")
+    parser.add_argument("command", choices=["show", "serve"], help="show：输出一次汇总；serve：提供HTTP文本接口")
+    parser.add_argument("directory", help="各进程写出快照的指标目录")
+    parser.add_argument("--port", type=int, default=9464, help="serve：监听端口（只监听本机）")
+    args = parser.parse_args(argv)
+    if args.command == "show":
+        print(collect(directory=args.directory), end="")
+        return
+    httpd = serve(args.port, directory=args.directory)
+    print(f"指标接口: http://127.0.0.1:{httpd.server_address[1]}/metrics")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        httpd.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+热点路径计时
+各模块用register()登记需要计时的函数或方法（出牌、抽牌、换边、AI决策、牌堆认知钩子、日志渲染等），登记本身不改动任何东西；
+enable()时才把这些属性替换为计时包装，disable()时换回原函数，因此关闭时没有任何额外开销。
+每个条目记录调用次数、累计耗时（含子调用）、自身耗时（扣除其中其他被计时函数的耗时）与单次最大耗时。
+
+用法：
+    python headless.py --games 200 --profile             # 结束后输出汇总
+    python headless.py --games 200 --profile prof.json   # 同时写出JSON
+    python main.py --profile                             # 图形界面：Shift+右键 [退出游戏] 开关计时，F9 打开汇总面板
+"""
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from functools import wraps
+
+
+@dataclass
+class TimingStat:
+    name: str
+    calls: int = 0
+    total: float = 0.0  # 累计耗时（秒，含子调用）
+    own: float = 0.0  # 自身耗时（秒）
+    max: float = 0.0  # 单次最大耗时（秒）
+
+    @property
+    def mean(self):
+        return self.total / self.calls if self.calls else 0.0
+
+
+class Profiler:
+    """登记的计时目标与计时结果"""
+
+    def __init__(self):
+        self._targets = []  # (显示名, 所属对象, 属性名)
+        self._originals = {}  # (所属对象, 属性名) -> 替换前__dict__中的值（None表示原本是继承来的）
+        self._stats = {}
+        self._lock = threading.Lock()  # AI决策可能在服务器的线程池中执行
+        self._local = threading.local()
+        self.games = 0  # 计时期间结束的对局数，用于按局平均
+        self.started = None
+        self.elapsed = 0.0  # 已关闭的计时时段总长
+
+    @property
+    def enabled(self):
+        return bool(self._originals)
+
+    def register(self, owner, *names):
+        """登记owner（类或模块）上的函数；已开启时立即生效"""
+        label = getattr(owner, "__name__", type(owner).__name__)
+        for name in names:
+            self._targets.append((f"{label}.{name}", owner, name))
+            if self.enabled:
+                self._patch(f"{label}.{name}", owner, name)
+
+    def enable(self):
+        if self.enabled:
+            return
+        for label, owner, name in self._targets:
+            self._patch(label, owner, name)
+        self.started = time.perf_counter()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        for (owner, name), original in self._originals.items():
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._originals.clear()
+        self.elapsed += time.perf_counter() - self.started
+        self.started = None
+
+    def toggle(self):
+        self.disable() if self.enabled else self.enable()
+        return self.enabled
+
+    def reset(self):
+        with self._lock:
+            for stat in self._stats.values():  # 包装函数持有各自的TimingStat，原地清零
+                stat.calls, stat.total, stat.own, stat.max = 0, 0.0, 0.0, 0.0
+            self.games = 0
+            self.elapsed = 0.0
+            if self.started is not None:
+                self.started = time.perf_counter()
+
+    def note_game(self):
+        if self.enabled:
+            self.games += 1
+
+    def _patch(self, label, owner, name):
+        if (owner, name) in self._originals:
+            return
+        self._originals[(owner, name)] = vars(owner).get(name)
+        setattr(owner, name, self._wrap(label, getattr(owner, name)))
+
+    def _wrap(self, label, func):
+        stat = self._stats.get(label)
+        if stat is None:
+            stat = self._stats[label] = TimingStat(label)
+        local = self._local
+        lock = self._lock
+        perf_counter = time.perf_counter
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            stack = getattr(local, "stack", None)
+            if stack is None:
+                stack = local.stack = []
+            stack.append(0.0)  # 本次调用中被计时的子调用耗时
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with lock:
+                    stat.calls += 1
+                    stat.total += elapsed
+                    stat.own += elapsed - children
+                    if elapsed > stat.max:
+                        stat.max = elapsed
+
+        return timed
+
+    @property
+    def wall_time(self):
+        """开启计时的总时长（秒）"""
+        return self.elapsed + (time.perf_counter() - self.started if self.started is not None else 0.0)
+
+    def stats(self):
+        """按自身耗时从高到低排列的计时结果（不含未被调用的条目）"""
+        with self._lock:
+            stats = [TimingStat(**asdict(s)) for s in self._stats.values() if s.calls]
+        return sorted(stats, key=lambda s: s.own, reverse=True)
+
+    def report(self):
+        """汇总表的文字行"""
+        stats = self.stats()
+        wall = self.wall_time
+        games = max(1, self.games)
+        lines = [f"计时 {wall:.2f}s | 对局 {self.games}",
+                 f"{'函数':<36}{'调用':>10}{'累计ms':>11}{'自身ms':>11}{'平均ms':>9}{'最大ms':>9}{'每局ms':>9}{'占比':>7}"]
+        for s in stats:
+            lines.append(f"{s.name:<36}{s.calls:>10}{s.total * 1e3:>11.1f}{s.own * 1e3:>11.1f}{s.mean * 1e3:>9.3f}"
+                         f"{s.max * 1e3:>9.2f}{s.own * 1e3 / games:>9.2f}{s.own / wall if wall else 0.0:>7.1%}")
+        return lines
+
+    def dump(self, path):
+        """写出JSON：每个条目的次数与耗时（秒），以及按局平均"""
+        games = max(1, self.games)
+        data = {
+            "wall_time": self.wall_time,
+            "games": self.games,
+            "stats": [{**asdict(s), "mean": s.mean, "own_per_game": s.own / games} for s in self.stats()],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+
+
+PROFILER = Profiler()  # 进程内共用的计时器
+register = PROFILER.register
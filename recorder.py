@@ -0,0 +1,215 @@
+"""
+对局档案
+GameRecorder订阅Game的事件流，把每局的种子与事件以紧凑的JSON Lines追加写入磁盘，供平衡性分析与问题复现。
+每局以一行["Game", {种子、难度等}]开头，之后每个事件一行：[事件类名, 字段值...]（按dataclass字段顺序）。
+写入经过缓冲；文件超过大小上限时在对局之间切换到新文件，可选gzip压缩。
+
+用法：
+    python headless.py --games 1000 --record records --compress
+    python recorder.py records          # 统计档案
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field, fields
+
+import events as game_events
+from events import DebugReasoning, GameEvent, GameOver
+
+
+ARCHIVE_VERSION = 1
+MAX_ARCHIVE_BYTES = 64 * 1024 * 1024  # 单个档案文件的大小上限，超过后切换到新文件
+WRITE_BUFFER_BYTES = 256 * 1024
+
+_EVENT_TYPES = {cls.__name__: cls for cls in vars(game_events).values()
+                if isinstance(cls, type) and issubclass(cls, GameEvent) and cls is not GameEvent}
+_FIELD_NAMES = {}
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))  # 复用编码器，json.dumps带参数时每次都会新建
+
+
+def encode_event(event):
+    """事件 -> [类名, 字段值...]"""
+    cls = type(event)
+    names = _FIELD_NAMES.get(cls)
+    if names is None:
+        names = _FIELD_NAMES[cls] = tuple(f.name for f in fields(cls))
+    return [cls.__name__, *(getattr(event, name) for name in names)]
+
+
+def decode_event(row):
+    """[类名, 字段值...] -> 事件；未知的事件类型返回None"""
+    cls = _EVENT_TYPES.get(row[0])
+    if cls is None:
+        return None
+    return cls(*[tuple(value) if value.__class__ is list else value for value in row[1:]])
+
+
+@dataclass
+class RecordedGame:
+    """档案中的一局"""
+    meta: dict
+    events: list = field(default_factory=list)
+
+    @property
+    def seed(self):
+        return self.meta["seed"]
+
+    @property
+    def finished(self):
+        return bool(self.events) and isinstance(self.events[-1], GameOver)
+
+
+class GameRecorder:
+    """
+    对局档案记录器
+    attach(game)后自动记录该局的全部事件（AI的调试说明除外）；同一个记录器可依次记录多局。
+    """
+
+    def __init__(self, directory, prefix="games", max_bytes=MAX_ARCHIVE_BYTES, compress=False,
+                 buffer_size=WRITE_BUFFER_BYTES):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.games_recorded = 0
+        self._raw = None
+        self._stream = None
+        self._game = None
+        self._callback = None
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._last_index()
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= max_bytes:
+            self._index += 1
+        self._open()
+
+    def _suffix(self):
+        return ".jsonl.gz" if self.compress else ".jsonl"
+
+    def _path(self, index):
+        return os.path.join(self.directory, f"{self.prefix}-{index:04d}{self._suffix()}")
+
+    def _last_index(self):
+        """沿用编号最大的已有文件（追加写入），不存在时从0开始"""
+        pattern = re.compile(rf"^{re.escape(self.prefix)}-(\d+){re.escape(self._suffix())}$")
+        indexes = [int(m.group(1)) for name in os.listdir(self.directory) if (m := pattern.match(name))]
+        return max(indexes, default=0)
+
+    def _open(self):
+        path = self._path(self._index)
+        self._raw = open(path, "ab", buffering=self.buffer_size)
+        # gzip以追加方式写入时每次打开形成一个新的gzip成员，读取时透明拼接
+        self._stream = gzip.GzipFile(fileobj=self._raw, mode="ab") if self.compress else self._raw
+
+    def _close_stream(self):
+        if self._stream is not self._raw:
+            self._stream.close()  # 写出gzip尾部，不关闭底层文件
+        self._raw.close()
+        self._stream = self._raw = None
+
+    @property
+    def path(self):
+        """当前写入的文件"""
+        return self._path(self._index)
+
+    def attach(self, game, **meta):
+        """
+        开始记录一局：写入对局头并订阅事件。应在game.start()之前调用；
+        读档继续的对局在restore()之后调用，并以snapshot=存档快照写入对局头，重放时从该快照开始
+        """
+        self.detach()
+        header = {"version": ARCHIVE_VERSION, "seed": game.seed, "difficulty": game.difficulty.key,
+                  "decks": game.decks, "seats": list(game.seats), "time": round(time.time(), 3), **meta}
+        self._write(["Game", header])
+        self._game = game
+        self._callback = game.events.subscribe(self._on_event)
+
+    def detach(self):
+        """停止记录当前对局（未结束的对局在档案中没有GameOver事件）"""
+        if self._game is not None:
+            self._game.events.unsubscribe(self._callback)
+            self._game = self._callback = None
+
+    def _on_event(self, event):
+        if isinstance(event, DebugReasoning):
+            return
+        self._write(encode_event(event))
+        if isinstance(event, GameOver):
+            self.detach()
+            self.games_recorded += 1
+            self._maybe_rotate()
+
+    def _write(self, row):
+        self._stream.write((_ENCODER.encode(row) + "\n").encode("utf-8"))
+
+    def _maybe_rotate(self):
+        """只在对局之间检查大小，保证一局不会跨文件"""
+        if self._raw.tell() >= self.max_bytes:
+            self._close_stream()
+            self._index += 1
+            self._open()
+
+    def flush(self):
+        self._stream.flush()
+        if self._stream is not self._raw:
+            self._raw.flush()
+
+    def close(self):
+        if self._raw is not None:
+            self.detach()
+            self._close_stream()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def archive_files(path):
+    """档案路径（文件或目录）包含的文件，按编号顺序"""
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.endswith((".jsonl", ".jsonl.gz")))
+        return [os.path.join(path, name) for name in names]
+    return [path]
+
+
+def read_games(path):
+    """逐局读取档案，返回RecordedGame的生成器"""
+    for file_path in archive_files(path):
+        opener = gzip.open if file_path.endswith(".gz") else open
+        with opener(file_path, "rt", encoding="utf-8") as f:
+            game = None
+            for line in f:
+                row = json.loads(line)
+                if row[0] == "Game":
+                    if game is not None:
+                        yield game
+                    game = RecordedGame(row[1])
+                elif game is not None and (event := decode_event(row)) is not None:
+                    game.events.append(event)
+            if game is not None:
+                yield game
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BombCat 对局档案统计")
+    parser.add_argument("path", help="档案文件或目录")
+    args = parser.parse_args(argv)
+
+    games = finished = ai_wins = 0  # AI胜局：获胜座位为AI（多人对局中任一AI获胜均计入）
+    event_count = 0
+    for game in read_games(args.path):
+        games += 1
+        event_count += len(game.events)
+        if game.finished:
+            finished += 1
+            ai_wins += game.events[-1].winner.startswith("ai")
+    print(f"对局: {games}（完整 {finished}） | 事件: {event_count} | AI胜率: {ai_wins / max(1, finished):.1%}")
+
+
+if __name__ == "__main__":
+    main()
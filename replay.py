@@ -0,0 +1,248 @@
+"""
+确定性重放
+用对局档案中的种子与行动序列（ActionTaken / DecisionAnswered）重新驱动Game，逐事件重现整局对局。
+重放时每隔keyframe_interval个回合保存一次状态快照（关键帧），跳转到第N回合时从不晚于N的最近关键帧继续，
+不必从头重放；批量校验把重放产生的事件流与档案逐条比较，用于发现引擎行为漂移。
+
+用法：
+    python replay.py verify records            # 批量重放校验
+    python replay.py view records --game 3     # 图形界面逐回合查看第3局
+"""
+import argparse
+import time
+import tkinter as tk
+from dataclasses import dataclass
+from tkinter import ttk
+
+from events import ActionTaken, DecisionAnswered, TurnStarted
+from headless import HeadlessGUI
+from main import DEFAULT_SEATS, Game, TurnPhase
+from recorder import read_games
+
+
+KEYFRAME_INTERVAL = 8  # 每隔多少个回合保存一个关键帧
+
+
+class ReplayDivergence(Exception):
+    """重放结果与档案不一致：行动在重放的对局中不合法，或产生的事件不同"""
+
+
+@dataclass
+class Keyframe:
+    turn: int  # 第几个回合开始前（上一回合换边之前）的状态（从1计数）
+    cursor: int  # 此时已消耗的行动数
+    snapshot: dict
+
+
+class _ReplayFrontend(HeadlessGUI):
+    """重放时代替GUI：收集输出文字（附所在回合）"""
+
+    def __init__(self, replay):
+        super().__init__()
+        self.replay = replay
+        self.lines = []  # (回合, 文字)
+
+    def set_game(self, game):
+        self.game = game
+
+    def print(self, message, debug=False, scroll='end', delay=0.2):
+        if message and not debug and self.replay.capture:
+            self.lines.extend((self.replay.turn, line) for line in message.splitlines())
+
+
+class GameReplay:
+    """一局档案的重放器；game属性为当前重放到的Game"""
+
+    def __init__(self, recorded, keyframe_interval=KEYFRAME_INTERVAL, capture=False):
+        self.recorded = recorded
+        self.actions = [e for e in recorded.events if isinstance(e, (ActionTaken, DecisionAnswered))]
+        self.total_turns = sum(isinstance(e, TurnStarted) for e in recorded.events)
+        if "snapshot" in recorded.meta:
+            self.total_turns += 1  # 读档继续的对局：存档快照所在的回合算作第1回合
+        self.keyframe_interval = keyframe_interval
+        self.keyframes = []
+        self.capture = capture  # 是否收集输出文字（查看器使用）
+        self.frontend = None
+        self.game = None
+        self.turn = 0  # 已开始的回合数
+        self.emitted = []  # 当前Game发出的事件
+        self._cursor = 0
+        self._turn_cursor = 0  # 当前回合开始时已消耗的行动数
+        self._load()
+
+    def _load(self, keyframe=None):
+        """新建Game：从头开始，或从关键帧恢复"""
+        self.frontend = _ReplayFrontend(self)
+        meta = self.recorded.meta
+        self.game = Game(gui=self.frontend, difficulty=meta.get("difficulty"), seed=self.recorded.seed,
+                         decks=meta.get("decks", 1), seats=tuple(meta.get("seats", DEFAULT_SEATS)))
+        self.game.events.subscribe(self._on_event)
+        self.emitted = []
+        if keyframe is None:
+            self._cursor = self._turn_cursor = 0
+            if "snapshot" in meta:
+                self.game.restore(meta["snapshot"])
+                self.turn = 1
+            else:
+                self.turn = 0
+                self.game.start()
+        else:
+            self.game.restore(keyframe.snapshot)  # 换边之前的状态，继续推进时重新输出这个回合的开场文字
+            self.turn = keyframe.turn - 1
+            self._cursor = self._turn_cursor = keyframe.cursor
+
+    def _on_event(self, event):
+        if isinstance(event, TurnStarted):
+            self.turn += 1
+            self._turn_cursor = self._cursor
+        self.emitted.append(event)
+
+    @property
+    def finished(self):
+        return self.game.phase is TurnPhase.GAME_OVER
+
+    def run(self):
+        """重放到档案结束"""
+        self._advance()
+        return self
+
+    def seek(self, turn):
+        """跳转到第turn个回合开始时（1 ~ total_turns），返回当前Game"""
+        turn = max(1, min(turn, self.total_turns))
+        keyframe = next((k for k in reversed(self.keyframes) if k.turn <= turn), None)
+        passed = turn < self.turn or (turn == self.turn and self._cursor > self._turn_cursor)
+        if passed or (keyframe is not None and keyframe.turn > self.turn):
+            self._load(keyframe)
+        self._advance(until_turn=turn)
+        return self.game
+
+    def _advance(self, until_turn=None):
+        """推进到第until_turn个回合开始；None表示推进到对局结束。档案中的行动用尽时返回False"""
+        game = self.game
+        while game.phase is not TurnPhase.GAME_OVER:
+            if game.phase is TurnPhase.SWITCHING_TURN:
+                self._maybe_keyframe()
+                game.step()
+                continue
+            if game.phase is TurnPhase.AWAITING_ACTION:
+                if until_turn is not None and self.turn >= until_turn:
+                    return True
+            if self._cursor >= len(self.actions):
+                return False  # 档案记录的是一局未结束的对局
+            action = self.actions[self._cursor]
+            if not game.apply_action(action):
+                raise ReplayDivergence(f"第{self._cursor}个行动 {action} 在重放的对局中不合法（阶段 {game.phase.value}）")
+            self._cursor += 1
+        return True
+
+    def _maybe_keyframe(self):
+        """在换边之前保存下一个回合的关键帧，这样从关键帧恢复时该回合的开场输出不会丢失"""
+        turn = self.turn + 1
+        if turn % self.keyframe_interval == 0 and turn > (self.keyframes[-1].turn if self.keyframes else 0):
+            self.keyframes.append(Keyframe(turn, self._cursor, self.game.snapshot()))
+
+    def turn_log(self, turn):
+        """第turn个回合的内容：(回合开始时的状态摘要, 该回合输出的文字)，之后停在下一个回合开始"""
+        if not self.capture:
+            self.capture = True
+            self._load()  # 从头重放以收集每个回合的文字
+        game = self.seek(turn)
+        summary = [
+            *(f"{p.name}手牌({len(p.hand)}): {p.hand_text()}" + ("" if p.alive else "（已出局）") for p in game.players),
+            f"牌堆剩余: {len(game.deck.cards)}张 | 剩余回合: {game.remaining_turns}",
+        ]
+        self._advance(until_turn=turn + 1)
+        return summary, [line for n, line in self.frontend.lines if n == turn]
+
+
+def verify_game(recorded):
+    """完整重放一局并与档案逐事件比较，不一致时抛出ReplayDivergence"""
+    replay = GameReplay(recorded).run()
+    for index, (expected, actual) in enumerate(zip(recorded.events, replay.emitted)):
+        if expected != actual:
+            raise ReplayDivergence(f"第{index}个事件不一致：档案为{expected}，重放为{actual}")
+    if len(replay.emitted) != len(recorded.events):
+        raise ReplayDivergence(f"事件数不一致：档案{len(recorded.events)}个，重放{len(replay.emitted)}个")
+    return replay
+
+
+class ReplayViewer:
+    """逐回合查看一局档案：左右翻页，可直接跳到指定回合"""
+
+    def __init__(self, root, replay):
+        self.root = root
+        self.replay = replay
+        self.turn = 1
+        root.title(f"BombCat 回放 - 种子 {replay.recorded.seed}")
+        root.geometry("720x600")
+
+        frame = ttk.Frame(root, padding="10")
+        frame.pack(fill="both", expand=True)
+        self.title_label = ttk.Label(frame, font=("Microsoft YaHei", 12, "bold"))
+        self.title_label.pack(fill="x", pady=5)
+        self.text = tk.Text(frame, wrap="word", font=("Microsoft YaHei", 11), state="disabled")
+        self.text.pack(fill="both", expand=True)
+        self.text.tag_configure("summary", foreground="#5A4A14", background="#FFF9D6")
+
+        controls = ttk.Frame(frame)
+        controls.pack(fill="x", pady=5)
+        ttk.Button(controls, text="◀ 上一回合", command=lambda: self.show(self.turn - 1)).pack(side="left", padx=5)
+        ttk.Button(controls, text="下一回合 ▶", command=lambda: self.show(self.turn + 1)).pack(side="left", padx=5)
+        self.jump_var = tk.StringVar()
+        entry = ttk.Entry(controls, textvariable=self.jump_var, width=6)
+        entry.pack(side="right", padx=5)
+        entry.bind("<Return>", lambda e: self.jump())
+        ttk.Label(controls, text="跳到回合").pack(side="right")
+        root.bind("<Left>", lambda e: self.show(self.turn - 1))
+        root.bind("<Right>", lambda e: self.show(self.turn + 1))
+        self.show(1)
+
+    def jump(self):
+        if self.jump_var.get().strip().isdigit():
+            self.show(int(self.jump_var.get()))
+
+    def show(self, turn):
+        total = self.replay.total_turns
+        if total == 0:
+            return
+        self.turn = max(1, min(turn, total))
+        summary, lines = self.replay.turn_log(self.turn)
+        game = self.replay.game
+        self.title_label.config(text=f"第 {self.turn} / {total} 回合" + (" · 已结束" if game.phase is TurnPhase.GAME_OVER else ""))
+        self.text.config(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.insert("end", "\n".join(summary) + "\n\n", "summary")
+        self.text.insert("end", "\n".join(lines) + "\n")
+        self.text.config(state="disabled")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BombCat 对局重放")
+    parser.add_argument("command", choices=["verify", "view"], help="verify：批量重放校验；view：图形界面查看")
+    parser.add_argument("path", help="档案文件或目录")
+    parser.add_argument("--game", type=int, default=0, help="view：查看第几局（从0计数，负数从末尾计数）")
+    args = parser.parse_args(argv)
+
+    if args.command == "view":
+        games = list(read_games(args.path))
+        root = tk.Tk()
+        ReplayViewer(root, GameReplay(games[args.game]))
+        root.mainloop()
+        return
+
+    started = time.perf_counter()
+    total = failed = 0
+    for recorded in read_games(args.path):
+        total += 1
+        try:
+            verify_game(recorded)
+        except ReplayDivergence as exc:
+            failed += 1
+            if failed <= 10:
+                print(f"第{total - 1}局（种子 {recorded.seed}）: {exc}")
+    elapsed = time.perf_counter() - started
+    print(f"校验: {total}局 | 不一致: {failed} | {total / max(elapsed, 1e-9):.0f}局/秒")
+
+
+if __name__ == "__main__":
+    main()
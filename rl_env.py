@@ -0,0 +1,160 @@
+"""
+强化学习/实验用环境接口
+以Gym风格的reset/step封装Game：外部智能体控制AI座位，玩家座位由headless的基线策略代打。
+观测为紧凑的NumPy向量，并附带由手牌与手牌上限得出的动作掩码；VectorBombCatEnv一次推进多局。
+
+动作编号：0 = 抽牌，1 + i = 打出一张CARD_TYPES[i]类型的牌。
+"""
+import numpy as np
+
+import ai_player as ai_behavior
+from cards import CARD_TYPES, BombCatCard, DefuseCard, NopeCard
+from headless import HeadlessGUI, baseline_policy
+from main import Game, TurnPhase
+
+
+KNOWN_TOP_SLOTS = 5  # 观测中包含的AI已知堆顶位置数
+NUM_TYPES = len(CARD_TYPES)
+NUM_ACTIONS = 1 + NUM_TYPES
+OBS_SIZE = NUM_TYPES * 2 + KNOWN_TOP_SLOTS + 9
+
+_TYPE_INDEX = {cls: i for i, cls in enumerate(CARD_TYPES)}
+
+
+class BombCatEnv:
+    """单局环境：智能体操作AI座位"""
+
+    def __init__(self, difficulty=None, opponent_policy=baseline_policy, max_steps=500):
+        self.difficulty = difficulty
+        self.opponent_policy = opponent_policy
+        self.max_steps = max_steps
+        self.gui = None
+        self.game = None
+        self.steps = 0
+        self.played_this_turn = 0
+
+    def reset(self, seed=None):
+        """开始新的一局，返回(observation, info)；seed决定这局的牌堆与AI随机源，不改动全局random的状态"""
+        self.gui = HeadlessGUI()
+        self.game = Game(gui=self.gui, difficulty=self.difficulty, seed=seed)
+        self.game.start()
+        self.steps = 0
+        self.played_this_turn = 0
+        self._advance_to_agent()
+        return self.observation(), {"action_mask": self.action_mask()}
+
+    def step(self, action):
+        """执行智能体动作，推进到下一次需要智能体决策或对局结束"""
+        action = int(action)
+        if not self.action_mask()[action]:
+            raise ValueError(f"非法动作: {action}")
+
+        game = self.game
+        self.steps += 1
+        turn_before = game.turns_played
+        if action == 0:
+            game.draw_card(game.ai)
+        else:
+            card_cls = CARD_TYPES[action - 1]
+            card = game.ai.hand.first(card_cls)
+            game.play_card(game.ai, card)
+
+        self._advance_to_agent()
+        self.played_this_turn = 0 if game.turns_played != turn_before else self.played_this_turn + 1
+        terminated = not game.game_running
+        truncated = not terminated and self.steps >= self.max_steps
+        reward = 0.0
+        if terminated:
+            reward = 1.0 if game.ai.alive else -1.0
+        return self.observation(), reward, terminated, truncated, {"action_mask": self.action_mask()}
+
+    def _advance_to_agent(self):
+        """推进状态机并让对手行动，直到等待AI座位行动或对局结束"""
+        game = self.game
+        while game.phase is not TurnPhase.GAME_OVER:
+            if game.phase is not TurnPhase.AWAITING_ACTION:
+                game.step()
+            elif game.current_player is game.player:
+                self.opponent_policy(game, game.player)
+            else:
+                return
+
+    def action_mask(self):
+        """可执行动作的布尔掩码"""
+        game = self.game
+        mask = np.zeros(NUM_ACTIONS, dtype=bool)
+        if not game.game_running or not game.current_player.is_ai:
+            return mask
+        mask[0] = game.can_draw(game.ai)
+        for card in game.ai.get_specific_cards("playable"):
+            mask[1 + _TYPE_INDEX[type(card)]] = True
+        if game.noped == game.player:
+            mask[1 + _TYPE_INDEX[NopeCard]] = False  # 拒绝卡不能重复打出
+        return mask
+
+    def observation(self):
+        """AI视角的观测：手牌、公开弃牌堆、AI对堆顶的认知与回合状态"""
+        game = self.game
+        obs = np.zeros(OBS_SIZE, dtype=np.float32)
+        for cls, count in game.ai.hand.type_counts():
+            obs[_TYPE_INDEX[cls]] += count
+        for cls, count in game.deck.discard_pile.counts.items():
+            obs[NUM_TYPES + _TYPE_INDEX[cls]] += count
+
+        # 已知堆顶的类型编号（1起，0表示未知）
+        offset = NUM_TYPES * 2
+        for i in range(min(KNOWN_TOP_SLOTS, len(game.ai_known))):
+            known = game.ai_known.known(-1 - i, game.ai.knowledge_bit)
+            if known is not None:
+                obs[offset + i] = 1 + _TYPE_INDEX[type(known)]
+
+        offset += KNOWN_TOP_SLOTS
+        obs[offset:offset + 9] = (
+            ai_behavior.card_probability_at(game, -1, BombCatCard),
+            ai_behavior.card_probability_at(game, 0, BombCatCard),
+            ai_behavior.card_probability_at(game, -1, DefuseCard),
+            len(game.deck.cards),
+            len(game.player.hand),
+            game.remaining_turns,
+            1.0 if game.noped == game.ai else 0.0,
+            1.0 if game.noped == game.player else 0.0,
+            self.played_this_turn,
+        )
+        return obs
+
+
+class VectorBombCatEnv:
+    """并行推进多局独立对局的向量化环境，结束的对局自动重开"""
+
+    def __init__(self, num_envs, difficulty=None, opponent_policy=baseline_policy, max_steps=500):
+        self.envs = [BombCatEnv(difficulty, opponent_policy, max_steps) for _ in range(num_envs)]
+        self.num_envs = num_envs
+
+    def reset(self, seed=None):
+        observations = []
+        masks = []
+        for i, env in enumerate(self.envs):
+            obs, info = env.reset(seed=None if seed is None else seed + i)
+            observations.append(obs)
+            masks.append(info["action_mask"])
+        return np.stack(observations), {"action_mask": np.stack(masks)}
+
+    def step(self, actions):
+        """actions为长度num_envs的动作数组；返回批量(obs, rewards, terminated, truncated, infos)"""
+        observations = np.zeros((self.num_envs, OBS_SIZE), dtype=np.float32)
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        masks = np.zeros((self.num_envs, NUM_ACTIONS), dtype=bool)
+        final_observations = {}
+
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            obs, rewards[i], terminated[i], truncated[i], info = env.step(action)
+            if terminated[i] or truncated[i]:
+                final_observations[i] = obs
+                obs, info = env.reset()
+            observations[i] = obs
+            masks[i] = info["action_mask"]
+
+        infos = {"action_mask": masks, "final_observation": final_observations}
+        return observations, rewards, terminated, truncated, infos
@@ -0,0 +1,589 @@
+"""
+多桌对局服务器
+一个进程内用asyncio同时运行多张牌桌（无界面的Game），客户端通过TCP或Unix套接字按行收发JSON消息。
+每张牌桌由一个协程推进状态机：换边、决策分发等轻量步骤直接在事件循环中执行，
+AI决策交给线程池执行器，单步耗时受难度的计算预算约束，慢的AI不会卡住其他牌桌；
+等待人类座位出牌或回答决策（炸弹放回位置、改变未来的排列）时协程挂起，不占用任何线程。
+
+协议（每行一个JSON对象）：
+  客户端 -> 服务器
+    {"op": "create", "seats": ["player", "ai"], "difficulty": "easy", "seed": 1, "decks": 1, "seat": "player"}
+    {"op": "join", "table": 3, "seat": "player"}         # 不带seat时等同watch
+    {"op": "watch", "table": 3, "policy": "coalesce"}    # 观战，policy为coalesce或drop（见spectators.py）
+    {"op": "unwatch", "table": 3}
+    {"op": "play", "table": 3, "hand_index": 2}
+    {"op": "draw", "table": 3}
+    {"op": "answer", "table": 3, "value": [2, 0, 1]}     # 决策的回答（DecisionRequest.encode的形式），null为放弃选择
+    {"op": "leave", "table": 3}
+    {"op": "tables"} / {"op": "ping", "id": 7}
+  服务器 -> 客户端
+    {"op": "created" / "joined" / "left", "table": 3, ...}
+    {"op": "event", "table": 3, "event": ["CardPlayed", "ai", "AttackCard", "⚔️攻击", false]}
+    {"op": "snapshot" / "event" / "gap", "table": 3, "seq": 120, ...}   # 观战消息，带序号
+    {"op": "your_turn", "table": 3, "seat": "player", "hand": [[类名, 牌名], ...], "playable": [下标...], ...}
+    {"op": "decision", "table": 3, "seat": "player", "kind": "choose_order", "cards": [...]} / "max_pos"
+    {"op": "error", "message": "..."} / {"op": "pong", "id": 7}
+其他座位抽到的牌在事件中隐去类型（炸弹猫除外），他人放回炸弹的位置隐去。
+
+用法：
+    python server.py serve --port 8765
+    python server.py serve --unix /tmp/bombcat.sock
+    python server.py load --tables 2000             # 本进程内启动服务器并用本地客户端压测
+    python server.py serve --metrics-dir metrics --metrics-port 9464   # 运行指标（见metrics.py）
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cards import NopeCard
+from decisions import CHOOSE_ORDER
+from events import ActionTaken, DecisionAnswered, GameOver
+from headless import HeadlessGUI
+from main import DEFAULT_SEATS, Game, TurnPhase
+import metrics as run_metrics
+from spectators import COALESCE, EventFeed, public_event_row, public_state
+
+
+MAX_LINE_BYTES = 64 * 1024  # 单条消息的长度上限
+MAX_PENDING_BYTES = 1024 * 1024  # 单个连接未发出的数据上限，超过时断开（客户端不再读取）
+MAX_TABLES = 10000
+SPECTATOR_INTERVAL = 0.05  # 观众两次发送之间的最短间隔：事件再密集，每个观众每秒最多唤醒20次
+MAX_ACTIVE_TABLES = 64  # 同时推进的牌桌数上限：每轮事件循环的工作量有界，消息的处理延迟不随牌桌总数增长
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+class ProtocolError(Exception):
+    """客户端消息不合法，回复error后继续处理后续消息"""
+
+
+class Connection:
+    """
+    一个客户端连接：按行写出JSON，记录加入的牌桌
+    同一轮事件循环内发往该连接的消息先攒起来，在本轮末尾合并为一次写入，避免每条消息一次系统调用。
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.tables = {}  # 牌桌编号 -> Table
+        self.closed = False
+        self._pending = []
+
+    def send(self, message):
+        if self.closed:
+            return
+        if not self._pending:
+            asyncio.get_running_loop().call_soon(self._write_pending)
+        self._pending.append(_ENCODER.encode(message))
+
+    async def drain(self):
+        """立即写出攒下的消息并等待发送缓冲排空（观战按客户端的接收速度推进）"""
+        self._write_pending()
+        if not self.closed:
+            await self.writer.drain()
+
+    def _write_pending(self):
+        if self.closed or not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        lines.append("")
+        self.writer.write("\n".join(lines).encode("utf-8"))
+        if self.writer.transport.get_write_buffer_size() > MAX_PENDING_BYTES:
+            self.close()  # 不读取消息的客户端不能让服务器无限缓存
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._pending = []
+            self.writer.close()
+
+
+class _TableFrontend(HeadlessGUI):
+    """牌桌的无界面前端：决策请求留给座位上的客户端回答"""
+
+    def request_decision(self, request):
+        pass
+
+
+def _hand_message(table, player):
+    game = table.game
+    hand = player.hand
+    playable = [card for card in player.get_specific_cards("playable")
+                if not (isinstance(card, NopeCard) and game.noped is game.get_other(player))]
+    playable_ids = set(map(id, playable))
+    return {
+        "op": "your_turn", "table": table.id, "seat": player.seat,
+        "hand": [[type(card).__name__, card.name] for card in hand],
+        "playable": [i for i, card in enumerate(hand) if id(card) in playable_ids],
+        "can_draw": game.can_draw(player),
+        "remaining_turns": game.remaining_turns,
+        "deck": len(game.deck.cards),
+    }
+
+
+def _decision_message(table, request):
+    message = {"op": "decision", "table": table.id, "seat": request.player.seat, "kind": request.kind}
+    if request.kind == CHOOSE_ORDER:
+        message["cards"] = [[type(card).__name__, card.name] for card in request.cards]
+    else:
+        message["max_pos"] = request.max_pos
+    return message
+
+
+class Table:
+    """一张牌桌：一局Game、座位上的连接、观众与推进它的协程"""
+
+    def __init__(self, server, table_id, seats=DEFAULT_SEATS, difficulty=None, seed=None, decks=1):
+        self.server = server
+        self.id = table_id
+        self.game = Game(gui=_TableFrontend(), difficulty=difficulty, seed=seed, decks=decks, seats=seats)
+        if server.metrics is not None:
+            server.metrics.attach(self.game)
+        self.members = {}  # Connection -> 座位
+        self.feed = EventFeed()  # 观战事件流
+        self.watchers = {}  # Connection -> 推送观战消息的任务
+        self._outbox = []  # 上一次推进后产生、尚未发出的事件
+        self.game.events.subscribe(self._outbox.append)
+        self._wake = asyncio.Event()
+        self._busy = False  # AI决策正在执行器中运行
+        self.task = None
+
+    # 座位
+    def seat_holder(self, seat):
+        return next((conn for conn, held in self.members.items() if held == seat), None)
+
+    def join(self, conn, seat):
+        player = self.game.by_seat.get(seat)
+        if player is None or player.is_ai:
+            raise ProtocolError(f"没有可加入的人类座位 {seat}")
+        if self.seat_holder(seat) not in (None, conn):
+            raise ProtocolError(f"座位 {seat} 已有人")
+        self.members[conn] = seat
+        conn.tables[self.id] = self
+        self._wake.set()  # 新加入的座位需要收到当前的提示
+
+    def watch(self, conn, policy=COALESCE):
+        """观战：先收到当前局面快照，之后按序收到公开事件"""
+        if conn in self.watchers:
+            raise ProtocolError("已在观战")
+        try:
+            spectator = self.feed.subscribe(policy)
+        except ValueError as exc:
+            raise ProtocolError(str(exc)) from None
+        if not self._busy and (self.feed.state is None or self.feed.state_seq != self.feed.head):
+            self.feed.publish((), public_state(self.game))  # AI思考中时由下一次推进发布快照
+        self.watchers[conn] = asyncio.get_running_loop().create_task(self._stream(conn, spectator))
+        conn.tables[self.id] = self
+
+    async def _stream(self, conn, spectator):
+        try:
+            while not conn.closed:
+                batch = await spectator.next_batch()
+                if not batch:
+                    break
+                for message in batch:
+                    message["table"] = self.id
+                    conn.send(message)
+                await conn.drain()
+                await asyncio.sleep(SPECTATOR_INTERVAL)
+        except ConnectionError:
+            pass
+        finally:
+            spectator.close()
+
+    def unwatch(self, conn):
+        task = self.watchers.pop(conn, None)
+        if task is None:
+            raise ProtocolError("没有在观战")
+        task.cancel()
+        self._release(conn)
+
+    def leave(self, conn):
+        self.members.pop(conn, None)
+        task = self.watchers.pop(conn, None)
+        if task is not None:
+            task.cancel()
+        self._release(conn)
+
+    def _release(self, conn):
+        if conn not in self.members and conn not in self.watchers:
+            conn.tables.pop(self.id, None)
+        if not self.members and not self.watchers:
+            self.close()  # 没有人关心的牌桌直接结束
+
+    def close(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        for task in self.watchers.values():
+            task.cancel()
+        self.feed.close()
+        self.server.tables.pop(self.id, None)
+
+    # 行动
+    def submit(self, conn, message):
+        """处理座位上的出牌、抽牌或决策回答，非法时抛出ProtocolError"""
+        seat = self.members.get(conn)
+        if seat is None:
+            raise ProtocolError("没有坐在这张牌桌")
+        if self._busy:
+            raise ProtocolError("还没轮到你")
+        op = message["op"]
+        game = self.game
+        if op == "answer":
+            request = game.pending_decision
+            if request is None or request.player.seat != seat:
+                raise ProtocolError("没有待回答的决策")
+            value = message.get("value")
+            try:
+                action = DecisionAnswered(seat, request.kind, tuple(value) if isinstance(value, list) else value)
+                applied = game.apply_action(action)
+            except (IndexError, TypeError):
+                applied = False
+        elif op == "draw":
+            applied = game.apply_action(ActionTaken(seat, "draw"))
+        else:
+            hand_index = message.get("hand_index")
+            applied = isinstance(hand_index, int) and game.apply_action(ActionTaken(seat, "play", hand_index))
+        if not applied:
+            raise ProtocolError(f"当前不能执行 {op}")
+        self._wake.set()
+
+    # 推进
+    async def run(self):
+        """推进对局直到结束；等待人类座位时挂起"""
+        game = self.game
+        loop = asyncio.get_running_loop()
+        try:
+            game.start()
+            while game.phase is not TurnPhase.GAME_OVER:
+                self._flush()
+                if not self._ready():
+                    self._prompt()
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                async with self.server.step_slots:
+                    if game.phase is TurnPhase.AWAITING_ACTION and game.current_player.is_ai:
+                        self._busy = True
+                        try:
+                            await loop.run_in_executor(self.server.executor, game.step)
+                        finally:
+                            self._busy = False
+                    else:
+                        game.step()
+                        await asyncio.sleep(0)  # 每推进一步让出一次，其他牌桌与连接不必等这张牌桌
+            self._flush()
+        finally:
+            self.feed.close()  # 观众读完剩余事件后结束
+            self.server.tables.pop(self.id, None)
+            for conn in list(self.members):
+                conn.tables.pop(self.id, None)
+            self.server.games_finished += game.phase is TurnPhase.GAME_OVER
+
+    def _ready(self):
+        """状态机能否不等客户端继续推进"""
+        game = self.game
+        if game.phase is TurnPhase.AWAITING_ACTION:
+            return game.current_player.is_ai
+        if game.phase is TurnPhase.AWAITING_DECISION:
+            request = game.pending_decision
+            return request.answered or not request.dispatched
+        return True
+
+    def _prompt(self):
+        """提示需要行动的座位（没有人坐时等待加入）"""
+        game = self.game
+        if game.phase is TurnPhase.AWAITING_DECISION:
+            request = game.pending_decision
+            conn = self.seat_holder(request.player.seat)
+            if conn is not None:
+                conn.send(_decision_message(self, request))
+        elif game.phase is TurnPhase.AWAITING_ACTION:
+            conn = self.seat_holder(game.current_player.seat)
+            if conn is not None:
+                conn.send(_hand_message(self, game.current_player))
+
+    def _flush(self):
+        """把新产生的事件发给座位上的连接（各自可见的部分），并发布到观战事件流"""
+        if not self._outbox:
+            return
+        events, self._outbox[:] = list(self._outbox), []
+        for conn, seat in list(self.members.items()):
+            for event in events:
+                row = public_event_row(event, seat)
+                if row is not None:
+                    conn.send({"op": "event", "table": self.id, "event": row})
+        # 观众无论多少，发布都只是一次追加；快照只在有观众时计算
+        rows = [row for row in map(public_event_row, events) if row is not None]
+        self.feed.publish(rows, public_state(self.game) if self.feed.subscribers else None)
+
+
+class GameServer:
+    """牌桌注册表与连接处理"""
+
+    def __init__(self, ai_workers=None, max_tables=MAX_TABLES, max_active=MAX_ACTIVE_TABLES, metrics=None):
+        self.tables = {}
+        self.metrics = metrics  # 不为None时每张牌桌的对局计入运行指标
+        self.max_tables = max_tables
+        self.executor = ThreadPoolExecutor(max_workers=ai_workers or min(8, os.cpu_count() or 1),
+                                           thread_name_prefix="bombcat-ai")
+        self.step_slots = asyncio.Semaphore(max_active)
+        self.connections = set()
+        self.games_finished = 0
+        self._next_id = 1
+        self._handlers = set()
+
+    async def start_tcp(self, host="127.0.0.1", port=0):
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_LINE_BYTES)
+
+    async def start_unix(self, path):
+        return await asyncio.start_unix_server(self.handle, path, limit=MAX_LINE_BYTES)
+
+    async def close(self):
+        """结束全部牌桌并断开全部连接"""
+        for table in list(self.tables.values()):
+            table.close()
+        for conn in list(self.connections):
+            conn.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.metrics is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.metrics.close)  # 最后一次写出不阻塞事件循环
+
+    def create_table(self, seats=DEFAULT_SEATS, difficulty=None, seed=None, decks=1):
+        if len(self.tables) >= self.max_tables:
+            raise ProtocolError("牌桌数量已达上限")
+        try:
+            table = Table(self, self._next_id, tuple(seats), difficulty, seed, max(1, int(decks)))
+        except (ValueError, TypeError, KeyError, AttributeError) as exc:
+            raise ProtocolError(f"无法创建牌桌: {exc}") from None
+        self._next_id += 1
+        self.tables[table.id] = table
+        return table
+
+    def _table(self, message):
+        table = self.tables.get(message.get("table"))
+        if table is None:
+            raise ProtocolError(f"牌桌 {message.get('table')} 不存在")
+        return table
+
+    async def handle(self, reader, writer):
+        conn = Connection(writer)
+        self.connections.add(conn)
+        self._handlers.add(asyncio.current_task())
+        try:
+            while not conn.closed:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # 消息过长或连接中断
+                if not line:
+                    break
+                try:
+                    self.dispatch(conn, json.loads(line))
+                except ProtocolError as exc:
+                    conn.send({"op": "error", "message": str(exc)})
+                except (ValueError, TypeError, AttributeError, KeyError):
+                    conn.send({"op": "error", "message": "消息格式错误"})
+                await asyncio.sleep(0)  # 缓冲中已有多条消息时readline不会让出，逐条让出避免一个连接独占事件循环
+        finally:
+            for table in list(conn.tables.values()):
+                table.leave(conn)
+            conn.close()
+            self.connections.discard(conn)
+            self._handlers.discard(asyncio.current_task())
+
+    def dispatch(self, conn, message):
+        """处理一条客户端消息（不等待任何IO，单条消息的处理时间与牌桌数量无关）"""
+        op = message["op"]
+        if op == "create":
+            table = self.create_table(message.get("seats", DEFAULT_SEATS), message.get("difficulty"),
+                                      message.get("seed"), message.get("decks", 1))
+            try:
+                if message.get("seat") is None:
+                    table.watch(conn, message.get("policy", COALESCE))  # 不入座的建桌者观看这局
+                else:
+                    table.join(conn, message["seat"])
+            except ProtocolError:
+                table.close()
+                raise
+            table.task = asyncio.get_running_loop().create_task(table.run())
+            conn.send({"op": "created", "table": table.id, "seats": list(table.game.seats),
+                       "seed": table.game.seed, "seat": message.get("seat")})
+        elif op == "join" and message.get("seat") is not None:
+            table = self._table(message)
+            table.join(conn, message["seat"])
+            conn.send({"op": "joined", "table": table.id, "seat": message["seat"], "seats": list(table.game.seats)})
+        elif op in ("watch", "join"):
+            table = self._table(message)
+            table.watch(conn, message.get("policy", COALESCE))
+            conn.send({"op": "watching", "table": table.id, "seats": list(table.game.seats)})
+        elif op == "unwatch":
+            self._table(message).unwatch(conn)
+            conn.send({"op": "left", "table": message["table"]})
+        elif op == "leave":
+            self._table(message).leave(conn)
+            conn.send({"op": "left", "table": message["table"]})
+        elif op in ("play", "draw", "answer"):
+            self._table(message).submit(conn, message)
+        elif op == "tables":
+            conn.send({"op": "tables", "tables": [
+                {"table": t.id, "seats": list(t.game.seats), "spectators": t.feed.subscribers, "open": [
+                    p.seat for p in t.game.players if not p.is_ai and t.seat_holder(p.seat) is None]}
+                for t in self.tables.values()]})
+        elif op == "ping":
+            conn.send({"op": "pong", "id": message.get("id")})
+        else:
+            raise ProtocolError(f"未知操作 {op}")
+
+
+# 本地压测客户端
+async def _load_client(host, port, tables, difficulty, seed):
+    """一个连接上开若干张人机牌桌，人类座位按基线策略随机出牌"""
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+    rng = random.Random(seed)
+
+    def send(message):
+        writer.write((_ENCODER.encode(message) + "\n").encode("utf-8"))
+
+    for i in range(tables):
+        send({"op": "create", "difficulty": difficulty, "seed": seed * 100003 + i, "seat": "player"})
+    finished = 0
+    while finished < tables:
+        line = await reader.readline()
+        if not line:
+            break
+        message = json.loads(line)
+        op = message["op"]
+        if op == "your_turn":
+            playable = message["playable"]
+            if playable and (not message["can_draw"] or rng.random() < 0.35):
+                send({"op": "play", "table": message["table"], "hand_index": rng.choice(playable)})
+            else:
+                send({"op": "draw", "table": message["table"]})
+        elif op == "decision":
+            send({"op": "answer", "table": message["table"], "value": None})
+        elif op == "event" and message["event"][0] == GameOver.__name__:
+            finished += 1
+    writer.close()
+
+
+async def _spectator_client(host, port, last_table, stats, slow=False):
+    """观众：所有观众依次观看同一张牌桌（热门牌桌），一局结束后换下一张；slow为读得很慢的观众"""
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+    table = 1
+    writer.write(_ENCODER.encode({"op": "watch", "table": table}).encode("utf-8") + b"\n")
+    try:
+        while table <= last_table:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            op = message["op"]
+            stats[op] = stats.get(op, 0) + 1
+            ended = op == "event" and message["event"][0] == GameOver.__name__
+            if ended or op == "error":
+                table += 1
+                writer.write(_ENCODER.encode({"op": "watch", "table": table}).encode("utf-8") + b"\n")
+            if slow:
+                await asyncio.sleep(0.01)
+    finally:
+        writer.close()
+
+
+async def _latency_probe(host, port, latencies, interval=0.01):
+    """单独的连接每隔interval发一次ping，测量满载时服务器处理一条消息的往返延迟"""
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+    try:
+        while True:
+            sent = time.perf_counter()
+            writer.write(b'{"op":"ping"}\n')
+            await reader.readline()
+            latencies.append(time.perf_counter() - sent)
+            await asyncio.sleep(interval)
+    finally:
+        writer.close()
+
+
+def _start_metrics(args):
+    """按命令行参数创建运行指标，需要时在本机提供文本接口"""
+    if not args.metrics_dir and args.metrics_port is None:
+        return None
+    metrics = run_metrics.GameMetrics(args.metrics_dir)
+    if args.metrics_port is not None:
+        httpd = run_metrics.serve(args.metrics_port, metrics)
+        print(f"指标接口: http://127.0.0.1:{httpd.server_address[1]}/metrics")
+    return metrics
+
+
+async def _load_test(args):
+    server = GameServer(ai_workers=args.workers, metrics=_start_metrics(args))
+    listener = await server.start_tcp("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    per_client = max(1, args.tables // args.clients)
+    latencies = []
+    started = time.perf_counter()
+    probe = asyncio.create_task(_latency_probe("127.0.0.1", port, latencies))
+    spectator_stats = {}
+    spectators = [asyncio.create_task(_spectator_client("127.0.0.1", port, per_client * args.clients,
+                                                        spectator_stats, slow=i % 4 == 0))
+                  for i in range(args.spectators)]
+    await asyncio.gather(*(_load_client("127.0.0.1", port, per_client, args.difficulty, args.seed + i)
+                           for i in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    probe.cancel()
+    for task in spectators:
+        task.cancel()
+    listener.close()
+    await server.close()
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000.0 if latencies else 0.0
+
+    print(f"牌桌: {per_client * args.clients} | 完成: {server.games_finished} | 用时: {elapsed:.1f}s | "
+          f"{server.games_finished / max(elapsed, 1e-9):.0f}局/秒")
+    print(f"消息往返: p50 {percentile(0.5):.1f}ms | p99 {percentile(0.99):.1f}ms | 最大 {percentile(1.0):.1f}ms")
+    if args.spectators:
+        print(f"观众: {args.spectators} | 事件 {spectator_stats.get('event', 0)} | "
+              f"快照 {spectator_stats.get('snapshot', 0)} | 跳过 {spectator_stats.get('gap', 0)}")
+
+
+async def _serve(args):
+    server = GameServer(ai_workers=args.workers, metrics=_start_metrics(args))
+    listener = await (server.start_unix(args.unix) if args.unix else server.start_tcp(args.host, args.port))
+    print(f"BombCat 服务器已启动: {args.unix or '%s:%d' % listener.sockets[0].getsockname()[:2]}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BombCat 多桌对局服务器")
+    parser.add_argument("command", choices=["serve", "load"], help="serve：启动服务器；load：本地压测")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", default=None, help="改用Unix套接字")
+    parser.add_argument("--workers", type=int, default=None, help="AI决策线程数")
+    parser.add_argument("--metrics-dir", metavar="DIR", default=None, help="定期把运行指标写入目录（多个进程可共用）")
+    parser.add_argument("--metrics-port", type=int, default=None, help="在本机该端口提供Prometheus文本接口")
+    parser.add_argument("--tables", type=int, default=1000, help="load：牌桌总数")
+    parser.add_argument("--clients", type=int, default=50, help="load：客户端连接数")
+    parser.add_argument("--spectators", type=int, default=0, help="load：同时观看热门牌桌的观众数")
+    parser.add_argument("--difficulty", default="easy", help="load：AI难度")
+    parser.add_argument("--seed", type=int, default=1, help="load：随机种子")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_load_test(args) if args.command == "load" else _serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+观战事件流
+每张牌桌一个EventFeed：对局事件（去掉私密信息后）按序号追加到共享的有界日志，发布一次是O(1)，与观众人数无关；
+每个观众（Spectator）只持有自己读到的序号，在自己的协程里按批读取，唤醒每轮事件循环最多一次。
+落后太多的观众按策略处理：coalesce丢弃积压、改发一份当前局面快照后继续；drop跳过积压并告知漏掉的条数。
+加入时先收到一份快照，不必从开局重放。
+
+进程内使用：
+    async for message in feed.subscribe():
+        ...
+"""
+import asyncio
+
+from cards import BombCatCard
+from events import ActionTaken, BombDefused, CardDrawn, DebugReasoning, DecisionAnswered
+from recorder import encode_event
+
+
+FEED_WINDOW = 1024  # 共享日志保留的最近事件数
+MAX_LAG = 256  # 观众最多落后多少条，超过时按策略处理
+COALESCE = "coalesce"
+DROP = "drop"
+POLICIES = (COALESCE, DROP)
+
+_PRIVATE_EVENTS = (ActionTaken, DecisionAnswered, DebugReasoning)  # 行动记录含手牌下标与决策回答，不对外公开
+
+
+def public_event_row(event, seat=None):
+    """
+    事件 -> 座位seat（None为观众）可见的编码行；不可见的事件返回None
+    他人抽到的牌隐去类型（炸弹猫公开），他人放回炸弹的位置隐去。
+    """
+    if isinstance(event, _PRIVATE_EVENTS):
+        return None
+    row = encode_event(event)
+    if isinstance(event, CardDrawn) and event.seat != seat and event.card_type != BombCatCard.__name__:
+        row[2:4] = [None, None]
+    elif isinstance(event, BombDefused) and event.seat != seat:
+        row[2] = None
+    return row
+
+
+def public_state(game):
+    """当前局面的公开信息：座位、手牌张数、牌堆与弃牌堆、回合"""
+    return {
+        "seats": [{"seat": p.seat, "name": p.name, "ai": p.is_ai, "alive": p.alive, "hand": len(p.hand)}
+                  for p in game.players],
+        "current": game.current_player.seat,
+        "remaining_turns": game.remaining_turns,
+        "turns": game.turns_played,
+        "phase": game.phase.value,
+        "deck": len(game.deck.cards),
+        "bombs": game.deck.bomb_count,
+        "discard": {cls.__name__: count for cls, count in game.deck.discard_pile.counts.items() if count},
+    }
+
+
+class EventFeed:
+    """一张牌桌的公开事件日志"""
+
+    def __init__(self, window=FEED_WINDOW):
+        self.window = window
+        self.head = 0  # 下一条事件的序号
+        self.state = None  # 最近一次发布时的局面快照
+        self.state_seq = 0  # 快照对应的序号（快照已包含此前的全部事件）
+        self.closed = False
+        self.subscribers = 0
+        self._log = []
+        self._base = 0  # _log[0]的序号
+        self._changed = asyncio.Event()
+        self._notify_scheduled = False
+
+    @property
+    def tail(self):
+        """仍保留在日志中的最早序号"""
+        return self._base
+
+    def publish(self, rows, state=None):
+        """追加一批公开事件行；state为发布后的局面快照（没有观众时可省略）"""
+        if rows:
+            self._log.extend(rows)
+            self.head += len(rows)
+            if len(self._log) > 2 * self.window:
+                drop = len(self._log) - self.window
+                del self._log[:drop]  # 成批裁剪，均摊O(1)
+                self._base += drop
+        if state is not None:
+            self.state, self.state_seq = state, self.head
+        self._schedule_notify()
+
+    def close(self):
+        self.closed = True
+        self._schedule_notify()
+
+    def _schedule_notify(self):
+        # 同一轮事件循环内的多次发布只唤醒观众一次
+        if not self._notify_scheduled:
+            self._notify_scheduled = True
+            asyncio.get_running_loop().call_soon(self._notify)
+
+    def _notify(self):
+        self._notify_scheduled = False
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self):
+        await self._changed.wait()
+
+    def read(self, start, limit):
+        """序号start起最多limit条"""
+        offset = start - self._base
+        return self._log[offset:offset + limit]
+
+    def subscribe(self, policy=COALESCE, max_lag=MAX_LAG):
+        return Spectator(self, policy, max_lag)
+
+
+class Spectator:
+    """
+    一个观众的读取游标，异步迭代得到消息：
+    {"op": "snapshot", "seq", "state"}、{"op": "event", "seq", "event"}、{"op": "gap", "seq", "missed"}
+    """
+
+    def __init__(self, feed, policy=COALESCE, max_lag=MAX_LAG):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的观战策略: {policy}（可选: {', '.join(POLICIES)}）")
+        self.feed = feed
+        self.policy = policy
+        self.max_lag = min(max_lag, feed.window)
+        self.cursor = None  # None表示下一条应为快照
+        self.dropped = 0  # 因落后被丢弃的事件数
+        self.closed = False
+        feed.subscribers += 1
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.feed.subscribers -= 1
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        batch = await self.next_batch(1)
+        if not batch:
+            raise StopAsyncIteration
+        return batch[0]
+
+    async def next_batch(self, limit=MAX_LAG):
+        """等到有新内容后取出最多limit条消息；观战结束时返回空列表"""
+        feed = self.feed
+        while not self.closed:
+            if self.cursor is None and feed.state is not None:
+                self.cursor = feed.state_seq
+                return [{"op": "snapshot", "seq": feed.state_seq, "state": feed.state}]
+            if self.cursor is not None:
+                lag = feed.head - self.cursor
+                if lag > self.max_lag or self.cursor < feed.tail:
+                    return [self._catch_up()]
+                if lag:
+                    rows = feed.read(self.cursor, limit)
+                    start, self.cursor = self.cursor, self.cursor + len(rows)
+                    return [{"op": "event", "seq": start + i, "event": row} for i, row in enumerate(rows)]
+            if feed.closed:
+                break
+            await feed.wait()
+        self.close()
+        return []
+
+    def _catch_up(self):
+        """落后超过上限：coalesce改发当前快照，drop跳到最新并告知漏掉的条数"""
+        feed = self.feed
+        missed = feed.head - self.cursor
+        self.dropped += missed
+        if self.policy == COALESCE and feed.state is not None and feed.state_seq == feed.head:
+            self.cursor = feed.head
+            return {"op": "snapshot", "seq": feed.head, "state": feed.state, "missed": missed}
+        self.cursor = feed.head
+        return {"op": "gap", "seq": feed.head, "missed": missed}
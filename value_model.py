@@ -0,0 +1,214 @@
+"""
+AI价值函数模块
+将对局状态与候选行动编码为特征矩阵，用离线自我对弈数据训练的线性/小型MLP模型估计AI胜率。
+决策时所有候选行动组成一个矩阵，一次矩阵乘法完成打分。
+
+训练：
+    python value_model.py --games 3000 --hidden 16
+"""
+import argparse
+import os
+
+import numpy as np
+
+from cards import CARD_TYPES
+
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai_value_model.npz")
+
+_TYPE_INDEX = {cls: i for i, cls in enumerate(CARD_TYPES)}
+STATE_FEATURES = (
+    "top_bomb", "top_defuse", "bottom_bomb", "bottom_defuse", "deck_bomb_density",
+    "remaining_turns", "ai_is_noped", "opponent_is_noped", "deck_size", "opponent_hand_size",
+    "played_this_turn", "has_defuse",
+)
+FEATURE_NAMES = (
+    *(f"hand_{cls.__name__}" for cls in CARD_TYPES),
+    *STATE_FEATURES,
+    "action_draw",
+    *(f"play_{cls.__name__}" for cls in CARD_TYPES),
+)
+_HAND_OFFSET = 0
+_STATE_OFFSET = len(CARD_TYPES)
+_ACTION_OFFSET = _STATE_OFFSET + len(STATE_FEATURES)
+
+
+def encode_actions(game, state, actions, me=None):
+    """把AI（me，默认第一个AI）视角的当前状态和每个候选行动编码为特征矩阵（每行一个行动，出牌行动已扣除该牌）。"""
+    me = me or game.ai
+    base = np.zeros(len(FEATURE_NAMES), dtype=np.float64)
+    for cls, count in me.hand.type_counts():
+        base[_HAND_OFFSET + _TYPE_INDEX[cls]] += count
+
+    deck_size = len(game.deck.cards)
+    bombs = game.deck.bomb_count
+    base[_STATE_OFFSET:_ACTION_OFFSET] = (
+        state["top_bomb"], state["top_defuse"], state["bottom_bomb"], state["bottom_defuse"],
+        bombs / deck_size if deck_size else 0.0,
+        state["remaining_turns"],
+        1.0 if state["ai_is_noped"] else 0.0,
+        0.0 if state["can_play_nope"] else 1.0,
+        deck_size,
+        len(game.get_other(me).hand),
+        state["played_this_turn"],
+        1.0 if state["has_defuse"] else 0.0,
+    )
+
+    features = np.tile(base, (len(actions), 1))
+    rows = np.arange(len(actions))
+    action_cols = np.full(len(actions), _ACTION_OFFSET)
+    played_cols = []
+    played_rows = []
+    for i, (kind, card) in enumerate(actions):
+        if kind == "play":
+            type_index = _TYPE_INDEX[type(card)]
+            action_cols[i] = _ACTION_OFFSET + 1 + type_index
+            played_rows.append(i)
+            played_cols.append(_HAND_OFFSET + type_index)
+    features[rows, action_cols] = 1.0
+    if played_rows:
+        features[played_rows, played_cols] -= 1.0
+    return features
+
+
+class ValueModel:
+    """线性（hidden=0）或单隐层MLP价值模型，输出AI获胜概率"""
+
+    def __init__(self, mean, std, w1, b1, w2=None, b2=None):
+        self.mean = mean
+        self.std = std
+        self.w1 = w1
+        self.b1 = b1
+        self.w2 = w2
+        self.b2 = b2
+
+    def _logits(self, features):
+        z = (features - self.mean) / self.std
+        if self.w2 is None:
+            return z @ self.w1 + self.b1
+        hidden = np.maximum(z @ self.w1 + self.b1, 0.0)
+        return hidden @ self.w2 + self.b2
+
+    def predict(self, features):
+        """批量预测每一行的获胜概率"""
+        return 1.0 / (1.0 + np.exp(-self._logits(features).ravel()))
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        arrays = {"mean": self.mean, "std": self.std, "w1": self.w1, "b1": self.b1,
+                  "feature_names": np.array(FEATURE_NAMES)}
+        if self.w2 is not None:
+            arrays.update(w2=self.w2, b2=self.b2)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH):
+        """加载模型；特征定义与当前编码器不一致时返回None"""
+        with np.load(path) as data:
+            if tuple(data["feature_names"]) != FEATURE_NAMES:
+                return None
+            w2 = data["w2"] if "w2" in data else None
+            b2 = data["b2"] if "b2" in data else None
+            return cls(data["mean"], data["std"], data["w1"], data["b1"], w2, b2)
+
+
+_default_model = None
+_default_model_loaded = False
+
+
+def load_default_model():
+    """惰性加载随仓库发布的默认模型，不存在时返回None"""
+    global _default_model, _default_model_loaded
+    if not _default_model_loaded:
+        _default_model_loaded = True
+        if os.path.exists(DEFAULT_MODEL_PATH):
+            _default_model = ValueModel.load(DEFAULT_MODEL_PATH)
+    return _default_model
+
+
+def collect_self_play(games, difficulty="normal", seed=None, explore=0.15):
+    """用无界面对局收集训练数据：AI每次决策所选行动的特征，标签为该局AI是否获胜。"""
+    import headless  # 延迟导入，避免与ai_player循环依赖
+
+    rows = []
+    labels = []
+    for i in range(games):
+        samples = []
+
+        def setup(game):
+            game.value_samples = samples
+            game.value_explore = explore
+
+        result = headless.run_game(difficulty=difficulty, seed=None if seed is None else seed + i, setup=setup)
+        if result.winner == "draw" or not samples:
+            continue
+        rows.extend(samples)
+        labels.extend([1.0 if result.winner == "ai" else 0.0] * len(samples))
+    return np.array(rows), np.array(labels)
+
+
+def train(features, labels, hidden=16, epochs=400, lr=0.01, l2=1e-4, seed=0):
+    """以逻辑回归损失全批量Adam训练价值模型。"""
+    rng = np.random.default_rng(seed)
+    mean = features.mean(axis=0)
+    std = features.std(axis=0)
+    std[std < 1e-6] = 1.0
+    z = (features - mean) / std
+    y = labels.reshape(-1, 1)
+    n, dim = z.shape
+
+    if hidden:
+        params = [rng.normal(0, 1 / np.sqrt(dim), (dim, hidden)), np.zeros(hidden),
+                  rng.normal(0, 1 / np.sqrt(hidden), (hidden, 1)), np.zeros(1)]
+    else:
+        params = [np.zeros((dim, 1)), np.zeros(1)]
+    moments = [np.zeros_like(p) for p in params]
+    velocities = [np.zeros_like(p) for p in params]
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+    for step in range(1, epochs + 1):
+        if hidden:
+            w1, b1, w2, b2 = params
+            pre = z @ w1 + b1
+            h = np.maximum(pre, 0.0)
+            prob = 1.0 / (1.0 + np.exp(-(h @ w2 + b2)))
+            d_logits = (prob - y) / n
+            d_h = (d_logits @ w2.T) * (pre > 0)
+            grads = [z.T @ d_h + l2 * w1, d_h.sum(axis=0), h.T @ d_logits + l2 * w2, d_logits.sum(axis=0)]
+        else:
+            w1, b1 = params
+            prob = 1.0 / (1.0 + np.exp(-(z @ w1 + b1)))
+            d_logits = (prob - y) / n
+            grads = [z.T @ d_logits + l2 * w1, d_logits.sum(axis=0)]
+
+        for p, g, m, v in zip(params, grads, moments, velocities):
+            m *= beta1
+            m += (1 - beta1) * g
+            v *= beta2
+            v += (1 - beta2) * g * g
+            p -= lr * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+
+    return ValueModel(mean, std, *params)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用无界面自我对弈数据训练AI价值模型")
+    parser.add_argument("--games", type=int, default=3000, help="自我对弈局数")
+    parser.add_argument("--difficulty", default="normal", help="收集数据时AI使用的难度")
+    parser.add_argument("--hidden", type=int, default=16, help="隐层宽度，0为线性模型")
+    parser.add_argument("--epochs", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH, help="模型输出路径")
+    args = parser.parse_args(argv)
+
+    features, labels = collect_self_play(args.games, difficulty=args.difficulty, seed=args.seed)
+    print(f"样本: {len(labels)} | AI获胜样本占比: {labels.mean():.1%}")
+    model = train(features, labels, hidden=args.hidden, epochs=args.epochs, seed=args.seed)
+    prob = model.predict(features)
+    loss = -np.mean(labels * np.log(prob + 1e-9) + (1 - labels) * np.log(1 - prob + 1e-9))
+    print(f"训练集对数损失: {loss:.4f}")
+    model.save(args.out)
+    print(f"模型已保存: {args.out}")
+
+
+if __name__ == "__main__":
+    main()